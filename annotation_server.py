@@ -0,0 +1,387 @@
+"""
+Live Annotation Server
+Local ingestion service for mkv-annotation-tool.html
+
+Annotators open the page from this server and every mark is POSTed as it
+is made (requests from pages of other origins are refused). Each session
+keeps an append-only journal (annotations/session_<id>.jsonl) that is
+replayed on restart, plus a per-entity sorted index so a new, edited or
+deleted mark only updates its own inter-arrival time and its successor's.
+All annotators of a session see the merged view by polling.
+
+Committing a session (POST .../commit, or stopping the server for every
+session changed since its last commit) writes
+session_<id>_combined.csv in the merge_session_data.py layout, ready for
+combine_all_sessions.py, and optionally updates a partitioned event
+store dataset (event_store.py).
+
+API (JSON unless noted):
+    POST /api/sessions/<id>/marks      {op: add|update|delete, key, annotator,
+                                        time, entity, type, service_time,
+                                        period_type, day_of_week}
+    GET  /api/sessions/<id>/changes?since=<seq>   marks changed after seq
+    GET  /api/sessions/<id>/summary               counts by entity/annotator
+    GET  /api/sessions/<id>/merged.csv            merged SIMUL8 CSV
+    POST /api/sessions/<id>/commit                write session file/dataset
+    GET  /api/sessions                            known sessions
+"""
+
+import argparse
+import bisect
+import json
+import math
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from event_store import to_canonical, write_dataset
+
+TOOL_PAGE = Path(__file__).with_name('mkv-annotation-tool.html')
+EXPORT_COLUMNS = ['ID', 'Session_ID', 'Period_Type', 'Day_of_Week', 'Time (s)', 'Entity',
+                  'Type/Dir', 'Inter-Arrival (s)', 'Service Time (s)', 'Annotator']
+ENTITIES = ['EB Vehicles', 'WB Vehicles', 'Crossers', 'Posers']
+OPS = ('add', 'update', 'delete')
+
+
+def parse_mark(record):
+    """Mark for an add/update record; raises ValueError if any field is invalid"""
+    if not record.get('entity'):
+        raise ValueError("entity is required")
+    time = float(record['time'])
+    service = record.get('service_time')
+    service = None if service in (None, '', '-') else float(service)
+    if not math.isfinite(time) or (service is not None and not math.isfinite(service)):
+        raise ValueError("time and service_time must be finite numbers")
+    return {
+        'key': record['key'],
+        'annotator': record.get('annotator', 'unknown'),
+        'time': round(time, 1),
+        'entity': record['entity'],
+        'type': record.get('type', ''),
+        'service_time': None if service is None else round(service, 1)
+    }
+
+
+class SessionLog:
+    """All marks of one session: journal on disk, sorted per-entity index in memory"""
+
+    def __init__(self, session_id, journal_dir):
+        self.session_id = session_id
+        self.period_type = 'Unknown'
+        self.day_of_week = 'Unknown'
+        self.journal_path = Path(journal_dir) / f"session_{session_id}.jsonl"
+        self.lock = threading.Lock()
+
+        self.marks = {}                                # key -> mark
+        self.index = {entity: [] for entity in ENTITIES}  # entity -> sorted [(time, key)]
+        self.changes = []                              # (seq, key) in change order
+        self.seq = 0
+        self.dirty = False                             # changed since the last commit
+
+        if self.journal_path.exists():
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        try:
+                            self._apply(json.loads(line))
+                        except ValueError:
+                            pass  # Invalid record journaled by an older server
+
+    def apply(self, record):
+        """Validate, apply and journal one operation; returns the affected marks
+
+        An invalid record raises ValueError before anything is changed.
+        """
+        with self.lock:
+            changed = self._apply(record)
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+            self.dirty = True
+            return [self.marks.get(key, {'key': key, 'deleted': True}) for key in changed]
+
+    def _apply(self, record):
+        op, key = record.get('op'), record.get('key')
+        if op not in OPS or not key:
+            raise ValueError("op must be add/update/delete and key is required")
+        try:
+            mark = parse_mark(record) if op != 'delete' else None
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"invalid mark: {e!r}") from e
+
+        if record.get('period_type') and self.period_type == 'Unknown':
+            self.period_type = record['period_type']
+        if record.get('day_of_week') and self.day_of_week == 'Unknown':
+            self.day_of_week = record['day_of_week']
+
+        # A repeated add (e.g. a client resending after reconnecting) replaces the mark
+        changed = []
+        if key in self.marks:
+            changed += self._remove(key)
+        if mark is not None:
+            changed += self._insert(mark)
+
+        for changed_key in dict.fromkeys(changed):
+            self.seq += 1
+            self.changes.append((self.seq, changed_key))
+        return list(dict.fromkeys(changed))
+
+    def _insert(self, mark):
+        entity = mark['entity']
+        if entity not in self.index:
+            self.index[entity] = []
+        self.marks[mark['key']] = mark
+
+        times = self.index[entity]
+        position = bisect.bisect(times, (mark['time'], mark['key']))
+        times.insert(position, (mark['time'], mark['key']))
+        return [mark['key']] + self._refresh(entity, position, position + 1)
+
+    def _remove(self, key):
+        mark = self.marks.pop(key)
+        times = self.index[mark['entity']]
+        position = bisect.bisect_left(times, (mark['time'], key))
+        del times[position]
+        return [key] + self._refresh(mark['entity'], position)
+
+    def _refresh(self, entity, *positions):
+        """Recompute inter-arrival at the given index positions"""
+        times = self.index[entity]
+        changed = []
+        for position in positions:
+            if position >= len(times):
+                continue
+            time, key = times[position]
+            inter_arrival = round(time - times[position - 1][0], 1) if position > 0 else 0.0
+            if self.marks[key].get('inter_arrival') != inter_arrival:
+                self.marks[key]['inter_arrival'] = inter_arrival
+                changed.append(key)
+        return changed
+
+    def changes_since(self, since):
+        """Current state of every mark changed after sequence number since"""
+        with self.lock:
+            start = bisect.bisect_right(self.changes, (since, chr(0x10FFFF)))
+            keys = dict.fromkeys(key for _, key in self.changes[start:])
+            marks = [self.marks.get(key, {'key': key, 'deleted': True}) for key in keys]
+            return {'seq': self.seq, 'marks': marks}
+
+    def summary(self):
+        """Counts by entity and annotator"""
+        with self.lock:
+            by_entity = {entity: len(times) for entity, times in self.index.items()}
+            by_annotator = {}
+            for mark in self.marks.values():
+                by_annotator[mark['annotator']] = by_annotator.get(mark['annotator'], 0) + 1
+            return {'session_id': self.session_id, 'period_type': self.period_type,
+                    'day_of_week': self.day_of_week, 'total': len(self.marks), 'seq': self.seq,
+                    'entities': by_entity, 'annotators': by_annotator}
+
+    def merged(self):
+        """Merged, time-ordered session in the merge_session_data.py layout"""
+        with self.lock:
+            marks = sorted(self.marks.values(), key=lambda m: (m['time'], m['key']))
+            rows = [{
+                'Session_ID': self.session_id,
+                'Period_Type': self.period_type,
+                'Day_of_Week': self.day_of_week,
+                'Time (s)': m['time'],
+                'Entity': m['entity'],
+                'Type/Dir': m['type'],
+                'Inter-Arrival (s)': m.get('inter_arrival', 0.0),
+                'Service Time (s)': '-' if m['service_time'] is None else m['service_time'],
+                'Annotator': m['annotator']
+            } for m in marks]
+
+        df = pd.DataFrame(rows, columns=EXPORT_COLUMNS[1:])
+        df.insert(0, 'ID', range(1, len(df) + 1))
+        return df
+
+
+class AnnotationServer(ThreadingHTTPServer):
+    """HTTP server holding the session logs"""
+
+    daemon_threads = True
+
+    def __init__(self, address, journal_dir, output_dir, dataset_dir=None):
+        super().__init__(address, AnnotationHandler)
+        self.journal_dir = Path(journal_dir)
+        self.output_dir = Path(output_dir)
+        self.dataset_dir = dataset_dir
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self.sessions = {}
+        self.sessions_lock = threading.Lock()
+
+        for journal in sorted(self.journal_dir.glob('session_*.jsonl')):
+            session_id = journal.stem[len('session_'):]
+            session = SessionLog(session_id, self.journal_dir)
+            # Journaled marks not yet in a committed file (e.g. after a crash)
+            output_file = self.output_file(session_id)
+            session.dirty = not output_file.exists() or output_file.stat().st_mtime < journal.stat().st_mtime
+            self.sessions[session_id] = session
+
+    def output_file(self, session_id):
+        return self.output_dir / f"session_{session_id}_combined.csv"
+
+    def session(self, session_id, create=False):
+        """Log of a session; None if unknown (only POSTed marks create sessions)"""
+        with self.sessions_lock:
+            if session_id not in self.sessions and create:
+                self.sessions[session_id] = SessionLog(session_id, self.journal_dir)
+            return self.sessions.get(session_id)
+
+    def commit(self, session_id):
+        """Write the merged session file (and dataset partitions)"""
+        session = self.session(session_id)
+        with session.lock:
+            session.dirty = False
+        df = session.merged()
+        output_file = self.output_file(session_id)
+        df.to_csv(output_file, index=False)
+
+        if self.dataset_dir and len(df):
+            canonical = to_canonical(df.drop(columns='Annotator'))
+            write_dataset(canonical, self.dataset_dir)
+
+        return {'file': str(output_file), 'rows': len(df), 'dataset': self.dataset_dir}
+
+
+class AnnotationHandler(BaseHTTPRequestHandler):
+    """Routes for the annotation API"""
+
+    SESSION_ROUTE = re.compile(r'^/api/sessions/([A-Za-z0-9_-]+)/(marks|changes|summary|merged\.csv|commit)$')
+
+    def log_message(self, format, *args):
+        pass  # Keep the console for session events
+
+    def _send(self, status, body, content_type='application/json'):
+        data = body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _same_origin(self):
+        """Browsers send Origin on cross-site POSTs; only the tool page itself may write"""
+        origin = self.headers.get('Origin')
+        return origin is None or urlparse(origin).netloc == self.headers.get('Host')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path in ('/', '/index.html', f"/{TOOL_PAGE.name}"):
+            return self._send(200, TOOL_PAGE.read_bytes(), 'text/html; charset=utf-8')
+        if url.path == '/api/sessions':
+            return self._send(200, {'sessions': sorted(self.server.sessions)})
+
+        match = self.SESSION_ROUTE.match(url.path)
+        if not match:
+            return self._send(404, {'error': 'not found'})
+
+        session = self.server.session(match.group(1))
+        if session is None:
+            return self._send(404, {'error': f"unknown session: {match.group(1)}"})
+        route = match.group(2)
+        if route == 'changes':
+            try:
+                since = int(parse_qs(url.query).get('since', ['0'])[0])
+            except ValueError:
+                return self._send(400, {'error': 'since must be an integer'})
+            return self._send(200, session.changes_since(since))
+        if route == 'summary':
+            return self._send(200, session.summary())
+        if route == 'merged.csv':
+            return self._send(200, session.merged().to_csv(index=False).encode('utf-8'), 'text/csv')
+        return self._send(405, {'error': 'use POST'})
+
+    def do_POST(self):
+        if not self._same_origin():
+            return self._send(403, {'error': 'cross-origin requests are not accepted'})
+        match = self.SESSION_ROUTE.match(urlparse(self.path).path)
+        if not match or match.group(2) not in ('marks', 'commit'):
+            return self._send(404, {'error': 'not found'})
+
+        session_id = match.group(1)
+        if match.group(2) == 'commit':
+            if self.server.session(session_id) is None:
+                return self._send(404, {'error': f"unknown session: {session_id}"})
+            result = self.server.commit(session_id)
+            print(f"✓ Session {session_id} committed: {result['rows']} marks -> {result['file']}")
+            return self._send(200, result)
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            record = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(record, dict):
+                raise ValueError("expected a JSON object")
+            if record.get('op') not in OPS or not record.get('key'):
+                raise ValueError("op must be add/update/delete and key is required")
+            if record['op'] != 'delete':
+                parse_mark(record)
+        except (ValueError, KeyError, TypeError) as e:
+            return self._send(400, {'error': str(e)})
+
+        session = self.server.session(session_id, create=True)
+        try:
+            changed = session.apply(record)
+        except ValueError as e:
+            return self._send(400, {'error': str(e)})
+        return self._send(200, {'seq': session.seq, 'marks': changed})
+
+
+def main():
+    """Main function with CLI"""
+    parser = argparse.ArgumentParser(
+        description='Live Annotation Server - Collect marks from mkv-annotation-tool.html as they are made',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Serve the tool on http://localhost:8765 (annotators on the LAN use your IP)
+  python annotation_server.py
+
+  # Also keep a partitioned event store dataset up to date on commit
+  python annotation_server.py --host 0.0.0.0 --dataset study_dataset
+        """
+    )
+    parser.add_argument('--host', type=str, default='127.0.0.1',
+                       help='Interface to listen on (default: 127.0.0.1, use 0.0.0.0 for a team)')
+    parser.add_argument('--port', type=int, default=8765,
+                       help='Port (default: 8765)')
+    parser.add_argument('--journal-dir', type=str, default='annotations',
+                       help='Directory for the per-session journals (default: annotations)')
+    parser.add_argument('--output-dir', '-o', type=str, default='.',
+                       help='Where committed session_<id>_combined.csv files go (default: .)')
+    parser.add_argument('--dataset', type=str, default=None,
+                       help='Partitioned event store dataset to update on commit')
+
+    args = parser.parse_args()
+
+    server = AnnotationServer((args.host, args.port), args.journal_dir, args.output_dir, args.dataset)
+
+    print("="*70)
+    print("LIVE ANNOTATION SERVER")
+    print("="*70)
+    print(f"Tool:     http://{args.host}:{args.port}/")
+    print(f"Journals: {args.journal_dir}/ ({len(server.sessions)} session(s) restored)")
+    for session_id, session in sorted(server.sessions.items()):
+        print(f"  Session {session_id}: {len(session.marks)} marks")
+    print("Press Ctrl+C to stop (changed sessions are committed on exit)")
+    print("="*70)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        server.server_close()
+        for session_id, session in sorted(server.sessions.items()):
+            if session.dirty and session.marks:
+                result = server.commit(session_id)
+                print(f"✓ Session {session_id}: {result['rows']} marks -> {result['file']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Batch ML Validation Tool
+Validates many manual/ML annotation pairs in parallel and pools the results
+
+Manifest format (CSV, paths relative to the manifest file):
+    Session_ID,Period_Type,Manual_CSV,ML_CSV
+    01,Morning Peak,session_01_manual.csv,session_01_ml.csv
+    02,Weekend,session_02_manual.csv,session_02_ml.csv
+
+Outputs per-session metrics by entity, and pooled totals by entity and
+Period_Type with Wilson confidence intervals for precision and recall.
+"""
+
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from scipy import stats
+
+from validate_ml import match_times
+
+
+def validate_session(session, tolerance):
+    """Match one manual/ML pair and return per-entity counts"""
+    manual = pd.read_csv(session['Manual_CSV'])
+    ml = pd.read_csv(session['ML_CSV'])
+
+    rows = []
+    for entity in sorted(set(manual['Entity'].unique()) | set(ml['Entity'].unique())):
+        manual_times = manual.loc[manual['Entity'] == entity, 'Time (s)'].to_numpy(dtype=float)
+        ml_times = ml.loc[ml['Entity'] == entity, 'Time (s)'].to_numpy(dtype=float)
+
+        manual_idx, ml_idx = match_times(manual_times, ml_times, tolerance)
+        errors = ml_times[ml_idx] - manual_times[manual_idx]
+
+        rows.append({
+            'Session_ID': session['Session_ID'],
+            'Period_Type': session.get('Period_Type', 'All'),
+            'Entity': entity,
+            'Manual': len(manual_times),
+            'ML': len(ml_times),
+            'Matched': len(manual_idx),
+            'Abs_Error_Sum': float(np.abs(errors).sum())
+        })
+
+    return rows
+
+
+def add_rates(df, confidence=0.95):
+    """Add precision/recall/F1 (percent) and Wilson CIs to a counts table"""
+    df = df.copy()
+    df['Precision'] = np.where(df['ML'] > 0, df['Matched'] / df['ML'].where(df['ML'] > 0) * 100, 0.0)
+    df['Recall'] = np.where(df['Manual'] > 0, df['Matched'] / df['Manual'].where(df['Manual'] > 0) * 100, 0.0)
+    denom = df['Precision'] + df['Recall']
+    df['F1'] = np.where(denom > 0, 2 * df['Precision'] * df['Recall'] / denom.where(denom > 0), 0.0)
+    df['MAE (s)'] = np.where(df['Matched'] > 0,
+                             df['Abs_Error_Sum'] / df['Matched'].where(df['Matched'] > 0), np.nan)
+
+    for name, total in [('Precision', 'ML'), ('Recall', 'Manual')]:
+        low, high = wilson_interval(df['Matched'].to_numpy(), df[total].to_numpy(), confidence)
+        df[f'{name}_CI_Low'] = low * 100
+        df[f'{name}_CI_High'] = high * 100
+
+    return df.drop(columns=['Abs_Error_Sum'])
+
+
+def wilson_interval(successes, trials, confidence=0.95):
+    """Wilson score interval for a binomial proportion (vectorised)"""
+    successes = np.asarray(successes, dtype=float)
+    trials = np.asarray(trials, dtype=float)
+    z = stats.norm.ppf(0.5 + confidence / 2)
+
+    safe_trials = np.where(trials > 0, trials, 1)
+    p = successes / safe_trials
+    denom = 1 + z**2 / safe_trials
+    centre = (p + z**2 / (2 * safe_trials)) / denom
+    half = z * np.sqrt(p * (1 - p) / safe_trials + z**2 / (4 * safe_trials**2)) / denom
+
+    low = np.where(trials > 0, np.clip(centre - half, 0, 1), np.nan)
+    high = np.where(trials > 0, np.clip(centre + half, 0, 1), np.nan)
+    return low, high
+
+
+def pool_results(session_df, confidence=0.95):
+    """Pooled totals by entity, by Period_Type and entity, and overall"""
+    counts = ['Manual', 'ML', 'Matched', 'Abs_Error_Sum']
+
+    by_entity = session_df.groupby('Entity', as_index=False)[counts].sum()
+    by_entity.insert(0, 'Period_Type', 'All')
+
+    by_period = session_df.groupby(['Period_Type', 'Entity'], as_index=False)[counts].sum()
+
+    overall = session_df[counts].sum().to_frame().T
+    overall.insert(0, 'Entity', 'OVERALL')
+    overall.insert(0, 'Period_Type', 'All')
+
+    pooled = pd.concat([by_period, by_entity, overall], ignore_index=True)
+    pooled[counts[:3]] = pooled[counts[:3]].astype(int)
+    return add_rates(pooled, confidence)
+
+
+def load_manifest(manifest_path):
+    """Read the manifest and resolve paths relative to it"""
+    manifest = pd.read_csv(manifest_path, dtype={'Session_ID': str})
+
+    required = ['Session_ID', 'Manual_CSV', 'ML_CSV']
+    missing = [col for col in required if col not in manifest.columns]
+    if missing:
+        raise ValueError(f"Manifest missing required columns: {missing}")
+
+    if 'Period_Type' not in manifest.columns:
+        manifest['Period_Type'] = 'All'
+    # Blank cells read as NaN, which groupby would silently drop
+    manifest['Period_Type'] = manifest['Period_Type'].fillna('All')
+
+    base = Path(manifest_path).parent
+    for col in ['Manual_CSV', 'ML_CSV']:
+        manifest[col] = [str(base / path) for path in manifest[col]]
+
+    return manifest
+
+
+def batch_validate(manifest_path, tolerance=1.0, workers=None, confidence=0.95):
+    """
+    Validate every pair in a manifest
+
+    Returns (session_df, pooled_df).
+    """
+    manifest = load_manifest(manifest_path)
+    sessions = manifest.to_dict('records')
+    if not sessions:
+        raise ValueError(f"No sessions listed in manifest: {manifest_path}")
+
+    for session in sessions:
+        for col in ['Manual_CSV', 'ML_CSV']:
+            if not os.path.exists(session[col]):
+                raise FileNotFoundError(f"Session {session['Session_ID']}: file not found: {session[col]}")
+
+    workers = min(len(sessions), workers or os.cpu_count() or 1)
+    print(f"Validating {len(sessions)} sessions on {workers} workers (tolerance ±{tolerance}s)...")
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for session_rows in pool.map(validate_session, sessions, [tolerance] * len(sessions)):
+            rows.extend(session_rows)
+
+    counts_df = pd.DataFrame(rows)
+    return add_rates(counts_df, confidence), pool_results(counts_df, confidence)
+
+
+def main():
+    """Main function with CLI"""
+    parser = argparse.ArgumentParser(
+        description='Batch ML Validation - Validate many sessions and pool the results',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Validate every pair in a manifest
+  python batch_validate.py manifest.csv
+
+  # Wider tolerance, 8 workers, custom output prefix
+  python batch_validate.py manifest.csv --tolerance 2.0 --workers 8 --output study_validation
+        """
+    )
+
+    parser.add_argument('manifest', type=str, help='Manifest CSV (Session_ID, Period_Type, Manual_CSV, ML_CSV)')
+    parser.add_argument('--tolerance', '-t', type=float, default=1.0,
+                       help='Time tolerance in seconds for matching (default: 1.0)')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                       help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                       help='Confidence level for intervals (default: 0.95)')
+    parser.add_argument('--output', '-o', type=str, default='batch_validation',
+                       help='Output prefix (default: batch_validation)')
+
+    args = parser.parse_args()
+
+    if not Path(args.manifest).exists():
+        print(f"Error: Manifest not found: {args.manifest}")
+        sys.exit(1)
+
+    try:
+        session_df, pooled_df = batch_validate(args.manifest, args.tolerance,
+                                               args.workers, args.confidence)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"\nError during validation: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+
+    sessions_path = f"{args.output}_sessions.csv"
+    pooled_path = f"{args.output}_pooled.csv"
+    session_df.to_csv(sessions_path, index=False)
+    pooled_df.to_csv(pooled_path, index=False)
+
+    print("\n" + "="*70)
+    print(f"POOLED DETECTOR ACCURACY ({args.confidence:.0%} Wilson intervals)")
+    print("="*70)
+    for _, row in pooled_df.iterrows():
+        print(f"{row['Period_Type']:<16s} {row['Entity']:<13s} "
+              f"P={row['Precision']:5.1f}% [{row['Precision_CI_Low']:5.1f}, {row['Precision_CI_High']:5.1f}]  "
+              f"R={row['Recall']:5.1f}% [{row['Recall_CI_Low']:5.1f}, {row['Recall_CI_High']:5.1f}]  "
+              f"F1={row['F1']:5.1f}%")
+    print("="*70)
+
+    print(f"\n✓ Per-session metrics saved to: {sessions_path}")
+    print(f"✓ Pooled metrics saved to: {pooled_path}")
+
+
+if __name__ == "__main__":
+    main()
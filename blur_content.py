@@ -1,39 +1,254 @@
+"""
+Frame Extractor for Ethical Display
+Pulls (blurred) frames from videos at arbitrary frame indices or timestamps
+
+Requested frames are sorted and read in a single forward pass: short gaps
+are skipped with grab() (no colour conversion), and the decoder only seeks
+across large gaps. Output is one image per requested frame or a contact
+sheet; several videos are processed in parallel on a process pool.
+
+With no frame selection the original behaviour is kept: frame 28, the
+middle frame and the last frame of test_30sec.mp4 are saved as
+frame_first.jpg, frame_middle.jpg and frame_last.jpg for demo_app.py.
+"""
+
 import cv2
+import numpy as np
+import pandas as pd
+import argparse
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from blur_video import fast_blur
+
+
+def read_frames(video, frame_indices, seek_threshold):
+    """
+    Yield (frame_index, frame) for the requested indices in ascending order
+
+    Gaps up to seek_threshold frames are decoded through; larger gaps seek.
+    """
+    position = int(video.get(cv2.CAP_PROP_POS_FRAMES))
+
+    for target in sorted(set(frame_indices)):
+        gap = target - position
+        if gap < 0 or gap > seek_threshold:
+            video.set(cv2.CAP_PROP_POS_FRAMES, target)
+            position = target
+        else:
+            while position < target:
+                video.grab()
+                position += 1
+
+        ret, frame = video.read()
+        position += 1
+        if ret:
+            yield target, frame
+
+
+def requests_from_results(results_csv, fps):
+    """One request per recorded arrival in a results CSV
+
+    Each request is the full frame: the results CSV has no boxes, so nothing
+    is cropped to the arriving entity. ml_processor records Time (s) as frame_count / fps with a 1-based
+    frame_count, so the 0-based frame the arrival was detected on is one less.
+    """
+    df = pd.read_csv(results_csv)
+    requests = []
+    for arrival_id, time_s, entity in zip(df['ID'], df['Time (s)'], df['Entity']):
+        requests.append({
+            'frame': max(0, int(round(time_s * fps)) - 1),
+            'label': f"#{arrival_id} {entity} @ {time_s:.1f}s",
+            'name': f"arrival_{arrival_id}_{str(entity).replace(' ', '_')}"
+        })
+    return requests
+
+
+def make_thumbnail(image, label, thumb_width=320):
+    """Labelled thumbnail of one frame"""
+    height, width = image.shape[:2]
+    thumb = cv2.resize(image, (thumb_width, int(height * thumb_width / width)),
+                       interpolation=cv2.INTER_AREA)
+    cv2.putText(thumb, label, (5, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+    return thumb
+
+
+def make_contact_sheet(thumbs, thumb_width=320, columns=6):
+    """Tile labelled thumbnails into one image"""
+    thumb_height = max(t.shape[0] for t in thumbs)
+    blank = np.zeros((thumb_height, thumb_width, 3), dtype=np.uint8)
+    thumbs = [cv2.copyMakeBorder(t, 0, thumb_height - t.shape[0], 0, 0, cv2.BORDER_CONSTANT)
+              for t in thumbs]
+    thumbs += [blank] * (-len(thumbs) % columns)
+
+    rows = [np.hstack(thumbs[i:i + columns]) for i in range(0, len(thumbs), columns)]
+    return np.vstack(rows)
+
+
+def extract_video(video_path, requests, output_dir='.', mode='frames', blur=True,
+                  thumb_width=320, columns=6, seek_threshold=None):
+    """
+    Extract all requested frames from one video
+
+    Parameters:
+    - video_path: Video to read
+    - requests: List of {'frame', 'label', 'name'} dicts (frame is 0-based)
+    - output_dir: Where images are written
+    - mode: "frames" (one image per request) or "sheet" (one contact sheet)
+    - blur: Blur frames for ethical display
+    - seek_threshold: Largest gap decoded through instead of seeking (default: 2 s of video)
+
+    Returns the list of files written.
+    """
+    video = cv2.VideoCapture(str(video_path))
+    if not video.isOpened():
+        print(f"ERROR: Cannot open video: {video_path}")
+        return []
+
+    if seek_threshold is None:
+        seek_threshold = max(1, int(video.get(cv2.CAP_PROP_FPS) * 2))
+
+    # No upper bound from CAP_PROP_FRAME_COUNT: many containers report it
+    # wrong or as 0, so every frame is attempted and unreadable ones skipped
+    by_frame = {}
+    for request in requests:
+        if request['frame'] >= 0:
+            by_frame.setdefault(request['frame'], []).append(request)
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = Path(video_path).stem
+
+    # Sheet mode keeps only thumbnails, never the full-resolution frames
+    written, thumbs = [], []
+    for frame_idx, frame in read_frames(video, by_frame, seek_threshold):
+        if blur:
+            frame = fast_blur(frame)
+
+        for request in by_frame[frame_idx]:
+            if mode == 'sheet':
+                thumbs.append(make_thumbnail(frame, request['label'], thumb_width))
+            else:
+                path = output_dir / request.get('filename', f"{stem}_{request['name']}.jpg")
+                cv2.imwrite(str(path), frame)
+                written.append(str(path))
+
+    video.release()
+
+    if mode == 'sheet' and thumbs:
+        path = output_dir / f"{stem}_contact_sheet.jpg"
+        cv2.imwrite(str(path), make_contact_sheet(thumbs, thumb_width, columns))
+        written.append(str(path))
+
+    return written
+
+
+def build_requests(video_path, frames=None, times=None, results_csv=None, single_video=True):
+    """Turn frame/time/results selections into extraction requests
+
+    With no selection, one video gets the fixed frame_first/middle/last.jpg
+    names demo_app.py reads; with several videos the defaults are
+    prefixed with each video's name so they do not overwrite each other.
+    """
+    video = cv2.VideoCapture(str(video_path))
+    fps = video.get(cv2.CAP_PROP_FPS)
+    frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    video.release()
+
+    requests = []
+    for frame_idx in frames or []:
+        requests.append({'frame': frame_idx, 'label': f"frame {frame_idx}",
+                         'name': f"frame_{frame_idx:06d}"})
+    for time_s in times or []:
+        requests.append({'frame': int(round(time_s * fps)), 'label': f"{time_s:.1f}s",
+                         'name': f"t_{time_s:08.1f}s"})
+    if results_csv:
+        requests.extend(requests_from_results(results_csv, fps))
+
+    if not requests:
+        # Default selection used by demo_app.py
+        requests = [
+            {'frame': 27, 'label': 'frame 28', 'name': 'first'},
+            {'frame': frame_count // 2, 'label': 'middle', 'name': 'middle'},
+            {'frame': frame_count - 1, 'label': 'last', 'name': 'last'}
+        ]
+        if single_video:
+            for request in requests:
+                request['filename'] = f"frame_{request['name']}.jpg"
+
+    return requests
+
+
+def main():
+    """Main function with command-line interface"""
+    parser = argparse.ArgumentParser(
+        description='Frame Extractor - Pull blurred frames for ethical display',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Original behaviour: frame 28, middle and last frame of test_30sec.mp4
+  python blur_content.py
+
+  # Specific frames or timestamps
+  python blur_content.py session.mp4 --frames 100 250 900
+  python blur_content.py session.mp4 --times 12.5 30 61.2
+
+  # Contact sheet of every recorded arrival
+  python blur_content.py session.mp4 --results session_ml_results.csv --mode sheet
+
+  # Several videos in parallel (one results CSV per video, same order)
+  python blur_content.py a.mp4 b.mp4 --results a_ml_results.csv b_ml_results.csv --workers 2
+        """
+    )
+
+    parser.add_argument('videos', type=str, nargs='*', default=['test_30sec.mp4'],
+                       help='Video file(s) (default: test_30sec.mp4)')
+    parser.add_argument('--frames', type=int, nargs='+', default=None,
+                       help='0-based frame indices to extract')
+    parser.add_argument('--times', type=float, nargs='+', default=None,
+                       help='Timestamps (seconds) to extract')
+    parser.add_argument('--results', type=str, nargs='+', default=None,
+                       help='Results CSV(s) whose arrivals should be extracted (one per video)')
+    parser.add_argument('--mode', choices=['frames', 'sheet'], default='frames',
+                       help='One image per frame or a single contact sheet (default: frames)')
+    parser.add_argument('--output-dir', '-o', type=str, default='.',
+                       help='Output directory (default: current directory)')
+    parser.add_argument('--no-blur', action='store_true',
+                       help='Save frames without blurring')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                       help='Worker processes for multiple videos (default: CPU count)')
+
+    args = parser.parse_args()
+
+    if args.results and len(args.results) != len(args.videos):
+        print(f"ERROR: Got {len(args.results)} results files for {len(args.videos)} videos")
+        sys.exit(1)
+
+    print("Extracting and blurring frames for ethical display...")
+
+    jobs = []
+    for i, video_path in enumerate(args.videos):
+        if not os.path.exists(video_path):
+            print(f"ERROR: Cannot open video: {video_path}")
+            sys.exit(1)
+        results_csv = args.results[i] if args.results else None
+        requests = build_requests(video_path, args.frames, args.times, results_csv,
+                                  single_video=len(args.videos) == 1)
+        jobs.append((video_path, requests))
+
+    workers = min(len(jobs), args.workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(extract_video, video_path, requests, args.output_dir,
+                               args.mode, not args.no_blur)
+                   for video_path, requests in jobs]
+        for (video_path, requests), future in zip(jobs, futures):
+            written = future.result()
+            print(f"[OK] {video_path}: {len(written)} image(s) from {len(requests)} requested frame(s)")
+
+    print("\nFrames extracted and blurred for ethical display!")
+
 
-print("Extracting and blurring frames for ethical display...")
-
-video = cv2.VideoCapture('test_30sec.mp4')
-
-if not video.isOpened():
-    print("ERROR: Cannot open video")
-    sys.exit(1)
-
-# Extract frame 28 (instead of frame 1)
-video.set(cv2.CAP_PROP_POS_FRAMES, 27)  # 0-indexed, so 27 = frame 28
-ret, frame_28 = video.read()
-if ret:
-    # Apply strong blur for privacy
-    blurred = cv2.GaussianBlur(frame_28, (99, 99), 30)
-    cv2.imwrite('frame_first.jpg', blurred)
-    print("[OK] Saved blurred frame 28 as first frame")
-
-# Extract middle frame
-frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-video.set(cv2.CAP_PROP_POS_FRAMES, frame_count // 2)
-ret, middle_frame = video.read()
-if ret:
-    blurred = cv2.GaussianBlur(middle_frame, (99, 99), 30)
-    cv2.imwrite('frame_middle.jpg', blurred)
-    print("[OK] Saved blurred middle frame")
-
-# Extract last frame
-video.set(cv2.CAP_PROP_POS_FRAMES, frame_count - 1)
-ret, last_frame = video.read()
-if ret:
-    blurred = cv2.GaussianBlur(last_frame, (99, 99), 30)
-    cv2.imwrite('frame_last.jpg', blurred)
-    print("[OK] Saved blurred last frame")
-
-video.release()
-print("\nFrames extracted and blurred for ethical display!")
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,366 @@
+"""
+Privacy Blur Tool
+Creates a blurred copy of a video for ethical display
+
+The large 99x99 Gaussian is approximated by downsampling, blurring with a
+proportionally smaller kernel and upsampling again. The video is split into
+segments that are blurred in parallel on a process pool; the segment files
+are then joined without re-encoding.
+
+Two modes:
+- full:    blur every pixel of every frame
+- objects: blur only padded regions around detected persons and vehicles,
+           taken from a stored detection file (ml_processor.py
+           --save-detections) or from a live YOLO run
+"""
+
 import cv2
+import pandas as pd
+import argparse
+import os
+import shutil
+import subprocess
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Reference blur (what the original full-resolution pass used)
+BLUR_KERNEL = 99
+BLUR_SIGMA = 30
+
+# COCO classes to anonymise: person, car, motorcycle, bus, truck
+ANONYMISE_CLASSES = [0, 2, 3, 5, 7]
+
+
+def fast_blur(frame, kernel=BLUR_KERNEL, sigma=BLUR_SIGMA, scale=0.25):
+    """
+    Approximate cv2.GaussianBlur(frame, (kernel, kernel), sigma)
+
+    Blurring at `scale` resolution with a kernel and sigma shrunk by the same
+    factor gives the same visual result at roughly scale^4 of the cost.
+    """
+    if scale >= 1.0:
+        return cv2.GaussianBlur(frame, (kernel, kernel), sigma)
+
+    height, width = frame.shape[:2]
+    small = cv2.resize(frame, (max(1, int(width * scale)), max(1, int(height * scale))),
+                       interpolation=cv2.INTER_AREA)
+
+    small_kernel = max(3, int(kernel * scale) | 1)  # Kernel size must be odd
+    small = cv2.GaussianBlur(small, (small_kernel, small_kernel), sigma * scale)
+
+    return cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+
+
+class RegionTracker:
+    """
+    Keeps padded blur regions alive across short detection gaps
+
+    A region that is not re-detected is held for `hold_frames` frames so a
+    single missed detection never exposes a face or number plate.
+    """
+
+    def __init__(self, padding=0.15, hold_frames=15, iou_threshold=0.3):
+        self.padding = padding
+        self.hold_frames = hold_frames
+        self.iou_threshold = iou_threshold
+        self.regions = []  # [x1, y1, x2, y2, frames_left]
+
+    def pad(self, box):
+        """Grow a box by `padding` of its size on every side"""
+        x1, y1, x2, y2 = box
+        pad_x = (x2 - x1) * self.padding
+        pad_y = (y2 - y1) * self.padding
+        return [x1 - pad_x, y1 - pad_y, x2 + pad_x, y2 + pad_y]
+
+    @staticmethod
+    def iou(a, b):
+        """Intersection over union of two boxes"""
+        inter_w = min(a[2], b[2]) - max(a[0], b[0])
+        inter_h = min(a[3], b[3]) - max(a[1], b[1])
+        if inter_w <= 0 or inter_h <= 0:
+            return 0.0
+        inter = inter_w * inter_h
+        union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+        return inter / union if union > 0 else 0.0
+
+    def update(self, boxes):
+        """Add this frame's detections and return the regions to blur"""
+        current = [self.pad(box) + [self.hold_frames] for box in boxes]
+
+        # Keep old regions that were not re-detected until their hold expires
+        for region in self.regions:
+            if region[4] <= 1:
+                continue
+            if not any(self.iou(region, new) > self.iou_threshold for new in current):
+                current.append(region[:4] + [region[4] - 1])
+
+        self.regions = current
+        return [region[:4] for region in current]
+
+
+def blur_regions(frame, regions, scale=0.25):
+    """Blur only the given regions in place; cost scales with region area"""
+    height, width = frame.shape[:2]
+    for x1, y1, x2, y2 in regions:
+        x1, y1 = max(0, int(x1)), max(0, int(y1))
+        x2, y2 = min(width, int(x2)), min(height, int(y2))
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            continue
+        frame[y1:y2, x1:x2] = fast_blur(frame[y1:y2, x1:x2], scale=scale)
+    return frame
+
+
+def load_detections(detections_path, start_frame=0, end_frame=None):
+    """
+    Load a stored detection file as {frame index: [boxes]}
+
+    Expects the CSV written by ml_processor.py --save-detections
+    (Frame, X1, Y1, X2, Y2, Class columns; Frame is the 0-based frame index).
+    """
+    df = pd.read_csv(detections_path)
+    df = df[df['Class'].isin(ANONYMISE_CLASSES) & (df['Frame'] >= start_frame)]
+    if end_frame is not None:
+        df = df[df['Frame'] < end_frame]
+
+    boxes = df[['X1', 'Y1', 'X2', 'Y2']].to_numpy().tolist()
+    detections = {}
+    for frame_idx, box in zip(df['Frame'].to_numpy(), boxes):
+        detections.setdefault(int(frame_idx), []).append(box)
+    return detections
+
+
+class LiveDetector:
+    """Runs YOLO on each frame to find regions to anonymise"""
+
+    def __init__(self, confidence=0.35):
+        from ultralytics import YOLO  # Only needed for live object mode
+        self.model = YOLO('yolov8n.pt')
+        self.confidence = confidence
+
+    def detect(self, frame):
+        """Return person/vehicle boxes for one frame"""
+        results = self.model(frame, verbose=False, conf=self.confidence,
+                             classes=ANONYMISE_CLASSES)
+        return results[0].boxes.xyxy.tolist()
+
+
+def get_video_info(video_path):
+    """Read FPS, resolution and frame count"""
+    video = cv2.VideoCapture(str(video_path))
+    if not video.isOpened():
+        raise ValueError(f"Cannot open input video: {video_path}")
+
+    info = {
+        'fps': video.get(cv2.CAP_PROP_FPS),
+        'width': int(video.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        'frame_count': int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    }
+    video.release()
+    return info
+
+
+def blur_segment(input_path, output_path, start_frame, end_frame, scale=0.25,
+                 mode='full', detections_path=None, confidence=0.35):
+    """Blur frames [start_frame, end_frame) into their own segment file (end_frame=None: to the end)"""
+    video = cv2.VideoCapture(str(input_path))
+    if not video.isOpened():
+        raise ValueError(f"Cannot open input video: {input_path}")
+    fps = video.get(cv2.CAP_PROP_FPS)
+    width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    writer = cv2.VideoWriter(str(output_path), fourcc, fps, (width, height))
+    if not writer.isOpened():
+        video.release()
+        raise ValueError(f"Cannot create output video: {output_path}")
+
+    # Object mode: regions come from a stored file or a live detector
+    detections = detector = tracker = None
+    if mode == 'objects':
+        tracker = RegionTracker()
+        if detections_path:
+            detections = load_detections(detections_path, start_frame, end_frame)
+        else:
+            detector = LiveDetector(confidence)
+
+    video.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    frames_written = 0
+    frame_idx = start_frame
+    while end_frame is None or frame_idx < end_frame:
+        ret, frame = video.read()
+        if not ret:
+            break
+
+        if mode == 'objects':
+            boxes = detections.get(frame_idx, []) if detector is None else detector.detect(frame)
+            writer.write(blur_regions(frame, tracker.update(boxes), scale=scale))
+        else:
+            writer.write(fast_blur(frame, scale=scale))
+        frames_written += 1
+        frame_idx += 1
+
+    video.release()
+    writer.release()
+    return frames_written
+
+
+def concat_segments(segment_paths, output_path):
+    """
+    Join segment files into one video
+
+    Uses ffmpeg's concat demuxer with stream copy (no re-encoding) when
+    ffmpeg is installed; otherwise falls back to re-writing frames with OpenCV.
+    """
+    if shutil.which('ffmpeg'):
+        list_file = Path(segment_paths[0]).parent / 'segments.txt'
+        with open(list_file, 'w') as f:
+            for path in segment_paths:
+                f.write(f"file '{Path(path).resolve().as_posix()}'\n")
+
+        subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                        '-i', str(list_file), '-c', 'copy', str(output_path)], check=True)
+        return
+
+    print("  WARNING: ffmpeg not found - re-encoding segments with OpenCV (not lossless)")
+    first = cv2.VideoCapture(str(segment_paths[0]))
+    fps = first.get(cv2.CAP_PROP_FPS)
+    size = (int(first.get(cv2.CAP_PROP_FRAME_WIDTH)), int(first.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    first.release()
+
+    writer = cv2.VideoWriter(str(output_path), cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for path in segment_paths:
+        video = cv2.VideoCapture(str(path))
+        while True:
+            ret, frame = video.read()
+            if not ret:
+                break
+            writer.write(frame)
+        video.release()
+    writer.release()
+
+
+def blur_video(input_path, output_path, workers=None, segments=None, scale=0.25,
+               mode='full', detections_path=None, confidence=0.35):
+    """
+    Blur a whole video in parallel segments
+
+    Parameters:
+    - input_path: Video to anonymise
+    - output_path: Blurred output video
+    - workers: Process pool size (default: CPU count)
+    - segments: Number of segments (default: 2 per worker)
+    - scale: Downsampling factor for the fast blur (1.0 = exact full-resolution blur)
+    - mode: "full" (whole frame) or "objects" (persons and vehicles only)
+    - detections_path: Stored detection CSV for object mode (default: live YOLO)
+    - confidence: Detection confidence for live object mode
+    """
+    info = get_video_info(input_path)
+    print(f"Input: {info['width']}x{info['height']}, {info['fps']:.1f} FPS, {info['frame_count']} frames")
+
+    workers = workers or os.cpu_count() or 1
+    if info['frame_count'] <= 0:
+        # Container does not report a usable frame count (common for MKV):
+        # segment bounds cannot be placed, so blur serially to the end
+        print(f"Frame count unknown - blurring serially (mode={mode}, scale={scale})...")
+        return blur_segment(input_path, output_path, 0, None, scale, mode, detections_path, confidence)
+
+    segments = max(1, min(segments or workers * 2, info['frame_count']))
+    bounds = [round(i * info['frame_count'] / segments) for i in range(segments + 1)]
+    bounds[-1] = None  # The reported count may be short: the last segment reads to the end
+
+    print(f"Blurring {segments} segments on {workers} workers (mode={mode}, scale={scale})...")
+
+    with tempfile.TemporaryDirectory(prefix='blur_segments_', dir=Path(output_path).parent) as tmp_dir:
+        segment_paths = [Path(tmp_dir) / f"segment_{i:04d}.mp4" for i in range(segments)]
+
+        total_frames = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(blur_segment, input_path, segment_paths[i],
+                                   bounds[i], bounds[i + 1], scale,
+                                   mode, detections_path, confidence)
+                       for i in range(segments)]
+            for i, future in enumerate(futures, 1):
+                total_frames += future.result()
+                print(f"  Segment {i}/{segments} done ({total_frames}/{info['frame_count']} frames)")
+
+        print("Joining segments...")
+        concat_segments(segment_paths, output_path)
+
+    return total_frames
+
+
+def main():
+    """Main function with command-line interface"""
+    parser = argparse.ArgumentParser(
+        description='Privacy Blur Tool - Create a blurred copy of a video for ethical display',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Blur the 30-second test clip (writes test_30sec_blurred.mp4)
+  python blur_video.py test_30sec.mp4
+
+  # Blur a full session on 8 workers
+  python blur_video.py session.mp4 --output session_blurred.mp4 --workers 8
+
+  # Exact (slow) full-resolution blur
+  python blur_video.py test_30sec.mp4 --scale 1.0
 
-print("Creating blurred version of video for ethical display...")
+  # Blur only people and vehicles, using detections saved by ml_processor.py
+  python ml_processor.py session.mp4 --save-detections session_detections.csv
+  python blur_video.py session.mp4 --mode objects --detections session_detections.csv
 
-# Open original video
-input_video = cv2.VideoCapture('test_30sec.mp4')
+  # Blur only people and vehicles, detecting them live
+  python blur_video.py session.mp4 --mode objects
+        """
+    )
 
-if not input_video.isOpened():
-    print("ERROR: Cannot open input video")
-    sys.exit(1)
+    parser.add_argument('input', type=str, nargs='?', default='test_30sec.mp4',
+                       help='Input video (default: test_30sec.mp4)')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                       help='Output video (default: <input>_blurred.mp4)')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                       help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--segments', type=int, default=None,
+                       help='Number of segments to split the video into (default: 2 per worker)')
+    parser.add_argument('--scale', type=float, default=0.25,
+                       help='Downsampling factor for the fast blur (default: 0.25)')
+    parser.add_argument('--mode', choices=['full', 'objects'], default='full',
+                       help='Blur whole frames or only detected persons/vehicles (default: full)')
+    parser.add_argument('--detections', '-d', type=str, default=None,
+                       help='Stored detection CSV for objects mode (default: run YOLO live)')
+    parser.add_argument('--confidence', '-c', type=float, default=0.35,
+                       help='Detection confidence for live objects mode (default: 0.35)')
 
-# Get video properties
-fps = int(input_video.get(cv2.CAP_PROP_FPS))
-width = int(input_video.get(cv2.CAP_PROP_FRAME_WIDTH))
-height = int(input_video.get(cv2.CAP_PROP_FRAME_HEIGHT))
-frame_count = int(input_video.get(cv2.CAP_PROP_FRAME_COUNT))
+    args = parser.parse_args()
 
-print(f"Input: {width}x{height}, {fps} FPS, {frame_count} frames")
+    input_path = Path(args.input)
+    if not input_path.exists():
+        print(f"ERROR: Cannot open input video: {input_path}")
+        sys.exit(1)
+    if args.detections and not Path(args.detections).exists():
+        print(f"ERROR: Detection file not found: {args.detections}")
+        sys.exit(1)
 
-# Create output video
-fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-output_video = cv2.VideoWriter('test_30sec_blurred.mp4', fourcc, fps, (width, height))
+    output_path = Path(args.output) if args.output else input_path.with_name(f"{input_path.stem}_blurred.mp4")
 
-frame_num = 0
-while True:
-    ret, frame = input_video.read()
-    if not ret:
-        break
+    print("Creating blurred version of video for ethical display...")
 
-    # Apply strong blur for privacy
-    blurred_frame = cv2.GaussianBlur(frame, (99, 99), 30)
-    output_video.write(blurred_frame)
+    try:
+        frame_num = blur_video(input_path, output_path, workers=args.workers,
+                               segments=args.segments, scale=args.scale, mode=args.mode,
+                               detections_path=args.detections, confidence=args.confidence)
+    except Exception as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
 
-    frame_num += 1
-    if frame_num % 100 == 0:
-        print(f"  Processed {frame_num}/{frame_count} frames...")
+    print(f"\nBlurred video created: {output_path}")
+    print(f"Total frames processed: {frame_num}")
+    print("Video content blurred for ethical display!")
 
-# Cleanup
-input_video.release()
-output_video.release()
 
-print(f"\nBlurred video created: test_30sec_blurred.mp4")
-print(f"Total frames processed: {frame_num}")
-print("Video content blurred for ethical display!")
+if __name__ == "__main__":
+    main()
@@ -1,98 +1,284 @@
 """
 Final Session Combiner
 Combines all 8 session files into one master file for SIMUL8
+
+Combining is incremental. A manifest next to the output
+(<output>.manifest.json) records every ingested session file with its
+content hash, row count and where its block starts in the output CSV.
+Each run only reads new or changed session files (in parallel), stores
+each as a sorted partition in <output stem>_parts/, and rewrites the
+output from the first partition that changed: unchanged sessions before
+it keep their bytes and IDs, later ones are re-appended from their
+partitions with refreshed global IDs. Adding the newest session is an
+append. The manifest also records the output's size and mtime; if the
+output was edited or replaced since, it is rewritten in full.
+
+Sessions are ordered by Session_ID (one file per session); files without
+a Session_ID column go last, ordered by path.
 """
 
 import pandas as pd
+import argparse
+import hashlib
+import json
 import os
-
-def combine_all_sessions(session_files, output_file='all_sessions_combined.csv'):
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+MANIFEST_VERSION = 2
+
+
+def file_sha256(path):
+    """Content hash of a session file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def partition_path(parts_dir, session_file):
+    """Partition file for one session file (path hash avoids name clashes)"""
+    tag = hashlib.sha1(os.path.abspath(session_file).encode()).hexdigest()[:10]
+    return str(Path(parts_dir) / f"{Path(session_file).stem}_{tag}.csv")
+
+
+def ingest_session(session_file, part_file, sha256):
+    """Read one session file, sort it by time and store it as a partition (worker)"""
+    df = pd.read_csv(session_file)
+    df = df.sort_values('Time (s)', kind='stable').drop(columns='ID', errors='ignore')
+    df.to_csv(part_file, index=False)
+
+    def first(col):
+        if col not in df.columns or len(df) == 0:
+            return 'Unknown'
+        value = df[col].iloc[0]
+        return value.item() if hasattr(value, 'item') else value
+
+    stat = os.stat(session_file)
+    counts = lambda col: ({str(k): int(v) for k, v in df[col].value_counts(sort=False).items()}
+                          if col in df.columns else {})
+    return {
+        'sha256': sha256,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'rows': len(df),
+        'columns': list(df.columns),
+        'has_session_id': 'Session_ID' in df.columns,
+        'session_id': first('Session_ID'),
+        'period': first('Period_Type'),
+        'day': first('Day_of_Week'),
+        'period_counts': counts('Period_Type'),
+        'entity_counts': counts('Entity'),
+        'partition': part_file
+    }
+
+
+def new_manifest():
+    """Manifest with nothing ingested"""
+    return {'version': MANIFEST_VERSION, 'columns': [], 'files': {}, 'order': [], 'end_offset': 0,
+            'output': None}
+
+
+def output_stamp(output_file):
+    """Size and mtime of the combined output, to detect outside changes"""
+    stat = os.stat(output_file)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def load_manifest(manifest_file):
+    """Previously ingested files, or an empty manifest"""
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return new_manifest()
+
+
+def session_sort_key(path, entry):
+    """Order partitions by Session_ID (numeric first), then path"""
+    if not entry['has_session_id']:
+        return (2, '', path)
+    session_id = entry['session_id']
+    if isinstance(session_id, (int, float)):
+        return (0, session_id, path)
+    return (1, str(session_id), path)
+
+
+def combine_all_sessions(session_files, output_file='all_sessions_combined.csv', workers=None, rebuild=False):
     """
-    Combine all session CSV files into one master file
+    Combine all session CSV files into one master file (incrementally)
 
     Parameters:
     - session_files: List of session CSV file paths
     - output_file: Final combined output CSV
+    - workers: Worker processes for reading new/changed sessions (default: CPU count)
+    - rebuild: Ignore the manifest and re-ingest every file
     """
 
     print("="*70)
     print("Final Session Combiner - All Observation Windows")
     print("="*70)
 
-    all_sessions = []
+    manifest_file = f"{output_file}.manifest.json"
+    parts_dir = Path(output_file).with_name(f"{Path(output_file).stem}_parts")
+    parts_dir.mkdir(exist_ok=True)
 
-    print("\n[Step 1/3] Loading all session files...")
+    if rebuild or not os.path.exists(output_file):
+        manifest = new_manifest()
+    else:
+        manifest = load_manifest(manifest_file)
+    old_files = manifest['files']
 
+    print("\n[Step 1/3] Checking session files against the manifest...")
+
+    files, to_ingest = {}, []
     for session_file in session_files:
         if not os.path.exists(session_file):
             print(f"WARNING: File not found: {session_file}")
             continue
 
-        df = pd.read_csv(session_file)
-        all_sessions.append(df)
-        session_id = df['Session_ID'].iloc[0] if 'Session_ID' in df.columns else 'Unknown'
-        period = df['Period_Type'].iloc[0] if 'Period_Type' in df.columns else 'Unknown'
-        day = df['Day_of_Week'].iloc[0] if 'Day_of_Week' in df.columns else 'Unknown'
-        print(f"  ✓ Loaded: {session_file} (Session {session_id}: {period} - {day}, {len(df)} entries)")
-
-    if not all_sessions:
+        key = os.path.abspath(session_file)
+        entry = old_files.get(key)
+        stat = os.stat(session_file)
+        if entry and os.path.exists(entry['partition']):
+            if entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                files[key] = entry
+                continue
+            sha256 = file_sha256(session_file)
+            if sha256 == entry['sha256']:
+                files[key] = dict(entry, mtime=stat.st_mtime)
+                continue
+        else:
+            sha256 = file_sha256(session_file)
+
+        to_ingest.append((key, session_file, sha256))
+
+    ingested = {key for key, _, _ in to_ingest}
+    removed = [entry['partition'] for key, entry in old_files.items()
+               if key not in files and key not in ingested]
+    print(f"  Unchanged: {len(files)} | New/changed: {len(to_ingest)} | Removed: {len(removed)}")
+
+    if to_ingest:
+        workers = min(len(to_ingest), workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(ingest_session, session_file, partition_path(parts_dir, session_file), sha256)
+                       for _, session_file, sha256 in to_ingest]
+            for (key, session_file, _), future in zip(to_ingest, futures):
+                entry = future.result()
+                files[key] = entry
+                print(f"  ✓ Loaded: {session_file} (Session {entry['session_id']}: "
+                      f"{entry['period']} - {entry['day']}, {entry['rows']} entries)")
+
+    for part_file in removed:
+        if os.path.exists(part_file):
+            os.remove(part_file)
+
+    if not files:
         print("ERROR: No valid session files found")
         return False
 
-    print(f"\n[Step 2/3] Combining {len(all_sessions)} sessions...")
-
-    # Combine all sessions
-    combined = pd.concat(all_sessions, ignore_index=True)
-
-    # Sort by Session_ID and Time
-    if 'Session_ID' in combined.columns:
-        combined = combined.sort_values(['Session_ID', 'Time (s)']).reset_index(drop=True)
-    else:
-        combined = combined.sort_values('Time (s)').reset_index(drop=True)
-
-    # Renumber global IDs
-    combined['ID'] = range(1, len(combined) + 1)
-
-    print(f"  Total entries across all sessions: {len(combined)}")
+    print(f"\n[Step 2/3] Combining {len(files)} sessions...")
+
+    order = sorted(files, key=lambda key: session_sort_key(key, files[key]))
+    columns = ['ID']
+    for key in order:
+        columns += [col for col in files[key]['columns'] if col not in columns]
+
+    # Byte offsets are only valid for the exact file the last run wrote
+    output_intact = os.path.exists(output_file) and manifest['output'] == output_stamp(output_file)
+    if manifest['order'] and not output_intact:
+        print("  Output changed since the last run - rewriting it in full")
+
+    # First partition whose position, content or layout differs from the last run
+    start = 0
+    if output_intact and columns == manifest['columns']:
+        for old_key, key in zip(manifest['order'], order):
+            if old_key != key or old_files[old_key]['sha256'] != files[key]['sha256']:
+                break
+            files[key]['offset'] = old_files[old_key]['offset']
+            files[key]['first_id'] = old_files[old_key]['first_id']
+            start += 1
+        if start == len(manifest['order']) == len(order):
+            print("  Nothing changed since the last run")
+
+    total = sum(files[key]['rows'] for key in order)
+    print(f"  Total entries across all sessions: {total}")
+    print(f"  Keeping {start} session(s) as written, writing {len(order) - start}")
 
     print("\n[Step 3/3] Saving final combined file...")
 
     try:
-        combined.to_csv(output_file, index=False)
+        if start == 0:
+            pd.DataFrame(columns=columns).to_csv(output_file, index=False)
+            next_id = 1
+            offset = os.path.getsize(output_file)
+        else:
+            last = files[order[start - 1]]
+            next_id = last['first_id'] + last['rows']
+            # Cut where the first differing old block began (or at the end for a pure append)
+            if start < len(manifest['order']):
+                offset = old_files[manifest['order'][start]]['offset']
+            else:
+                offset = manifest['end_offset']
+
+        with open(output_file, 'r+b') as f:
+            f.truncate(offset)
+
+        # Binary handle: tell() is a real byte offset (text-mode tell() is opaque)
+        with open(output_file, 'ab') as f:
+            for key in order[start:]:
+                entry = files[key]
+                part = pd.read_csv(entry['partition'])
+                part.insert(0, 'ID', range(next_id, next_id + len(part)))
+                entry['offset'] = f.tell()
+                entry['first_id'] = next_id
+                part.reindex(columns=columns).to_csv(f, index=False, header=False, encoding='utf-8')
+                next_id += len(part)
+            end_offset = f.tell()
+
         print(f"  Saved to: {output_file}")
     except Exception as e:
         print(f"ERROR: Failed to save file: {e}")
         return False
 
+    manifest = {'version': MANIFEST_VERSION, 'columns': columns, 'files': files,
+                'order': order, 'end_offset': end_offset, 'output': output_stamp(output_file)}
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
     print("\n" + "="*70)
     print("SUCCESS: All sessions combined successfully!")
     print("="*70)
 
-    # Summary statistics
+    # Summary statistics (from the manifest, no re-read)
     print("\nFinal Statistics:")
-    print(f"  Total sessions: {len(all_sessions)}")
-    print(f"  Total arrivals: {len(combined)}")
+    print(f"  Total sessions: {len(order)}")
+    print(f"  Total arrivals: {total}")
 
-    # Statistics by session
-    if 'Session_ID' in combined.columns:
+    if any(files[key]['has_session_id'] for key in order):
         print("\nBy Session:")
-        for session_id in sorted(combined['Session_ID'].unique()):
-            session_data = combined[combined['Session_ID'] == session_id]
-            period = session_data['Period_Type'].iloc[0] if 'Period_Type' in session_data.columns else 'Unknown'
-            day = session_data['Day_of_Week'].iloc[0] if 'Day_of_Week' in session_data.columns else 'Unknown'
-            print(f"  Session {session_id} ({period} - {day}): {len(session_data)} arrivals")
-
-    # Statistics by period type
-    if 'Period_Type' in combined.columns:
+        for key in order:
+            entry = files[key]
+            print(f"  Session {entry['session_id']} ({entry['period']} - {entry['day']}): {entry['rows']} arrivals")
+
+    period_counts, entity_counts = {}, {}
+    for key in order:
+        for period, count in files[key]['period_counts'].items():
+            period_counts[period] = period_counts.get(period, 0) + count
+        for entity, count in files[key]['entity_counts'].items():
+            entity_counts[entity] = entity_counts.get(entity, 0) + count
+
+    if period_counts:
         print("\nBy Period Type:")
-        for period in combined['Period_Type'].unique():
-            count = len(combined[combined['Period_Type'] == period])
+        for period, count in period_counts.items():
             print(f"  {period}: {count} arrivals")
 
-    # Statistics by entity type
     print("\nBy Entity Type (All Sessions):")
-    for entity in combined['Entity'].unique():
-        count = len(combined[combined['Entity'] == entity])
+    for entity, count in entity_counts.items():
         print(f"  {entity}: {count}")
 
     print(f"\nOutput file: {output_file}")
@@ -103,6 +289,26 @@ def combine_all_sessions(session_files, output_file='all_sessions_combined.csv')
 def main():
     """Main function - finds all session files and combines them"""
 
+    parser = argparse.ArgumentParser(
+        description='Final Session Combiner - Incrementally combine session_*_combined.csv files',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Combine new/changed sessions into all_sessions_combined.csv
+  python combine_all_sessions.py
+
+  # Force a full rebuild
+  python combine_all_sessions.py --rebuild
+        """
+    )
+    parser.add_argument('--output', '-o', type=str, default='all_sessions_combined.csv',
+                       help='Combined output CSV (default: all_sessions_combined.csv)')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                       help='Worker processes for reading sessions (default: CPU count)')
+    parser.add_argument('--rebuild', action='store_true',
+                       help='Ignore the manifest and re-ingest every session file')
+    args = parser.parse_args()
+
     print("Searching for session files in current directory...")
 
     # Find all session_*_combined.csv files
@@ -134,7 +340,7 @@ def main():
 
     print("\nProceeding to combine all sessions...\n")
 
-    success = combine_all_sessions(session_files)
+    success = combine_all_sessions(session_files, args.output, args.workers, args.rebuild)
 
     if not success:
         print("\n[FAILED] Combination process encountered errors")
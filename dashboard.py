@@ -15,6 +15,9 @@ from pathlib import Path
 import time
 from datetime import datetime
 
+from live_metrics import LiveMetrics, VEHICLE_ENTITIES, PEDESTRIAN_ENTITIES
+from ml_processor import ArrivalDetector, PedestrianAnalyzer, VehicleDirectionClassifier
+
 # Configure page
 st.set_page_config(
     page_title="Abbey Road Live Monitor",
@@ -57,7 +60,26 @@ if 'model' not in st.session_state:
     st.session_state.processing = False
     st.session_state.frame_count = 0
     st.session_state.arrival_times = []
-    st.session_state.prev_positions = {}
+
+# Sliding-window congestion metrics, fed one arrival at a time
+if 'live_metrics' not in st.session_state:
+    st.session_state.live_metrics = LiveMetrics()
+
+# Arrival detection state (same line-crossing logic as ml_processor.py)
+if 'arrival_detector' not in st.session_state:
+    st.session_state.arrival_detector = ArrivalDetector()
+    st.session_state.pedestrian_analyzer = PedestrianAnalyzer()
+    st.session_state.direction_classifier = VehicleDirectionClassifier()
+    st.session_state.last_arrival_times = {}
+
+
+def reset_detection():
+    """Forget tracks and live windows (new video or cleared data)"""
+    st.session_state.arrival_detector.reset()
+    st.session_state.pedestrian_analyzer = PedestrianAnalyzer()
+    st.session_state.direction_classifier.reset()
+    st.session_state.last_arrival_times = {}
+    st.session_state.live_metrics.reset()
 
 
 def load_models():
@@ -69,8 +91,34 @@ def load_models():
         st.success("✓ Models loaded successfully!")
 
 
-def process_frame(frame, arrival_line_y, confidence):
-    """Process single frame and return annotated frame"""
+def record_arrival(track_id, class_id, bbox, timestamp, frame_width):
+    """Add one line crossing to the arrivals, counts and live metrics"""
+    if class_id == 0:
+        entity_type = st.session_state.pedestrian_analyzer.classify(track_id, timestamp)
+        type_dir = entity_type[:-1]  # Crosser/Poser
+    else:
+        type_dir = st.session_state.direction_classifier.classify(track_id, bbox, frame_width)
+        entity_type = f"{type_dir} Vehicles"
+
+    last_time = st.session_state.last_arrival_times.get(entity_type)
+    st.session_state.last_arrival_times[entity_type] = timestamp
+
+    arrival = {
+        'ID': len(st.session_state.arrivals) + 1,
+        'Time (s)': round(timestamp, 1),
+        'Entity': entity_type,
+        'Type/Dir': type_dir,
+        'Inter-Arrival (s)': round(timestamp - last_time, 1) if last_time is not None else 0.0,
+        'Service Time (s)': '-'
+    }
+    st.session_state.arrivals.append(arrival)
+    st.session_state.arrival_times.append(timestamp)
+    st.session_state.stats[entity_type] += 1
+    st.session_state.live_metrics.on_arrival(arrival)
+
+
+def process_frame(frame, arrival_line_y, confidence, timestamp):
+    """Process single frame, record line crossings and return annotated frame"""
     results = st.session_state.model(frame, verbose=False, conf=confidence)
 
     # Draw detections
@@ -110,17 +158,27 @@ def process_frame(frame, arrival_line_y, confidence):
     # Update tracker
     if st.session_state.tracker is not None:
         tracks = st.session_state.tracker.update_tracks(detections, frame=frame)
+        detector = st.session_state.arrival_detector
+        detector.arrival_line = arrival_line_y
 
-        # Draw track IDs
+        # Draw track IDs and check for arrivals
         for track in tracks:
             if track.is_confirmed():
                 track_id = track.track_id
                 bbox = track.to_ltrb()
+                class_id = track.get_det_class()
                 x1, y1, x2, y2 = map(int, bbox)
 
                 cv2.putText(annotated_frame, f"ID: {track_id}", (x1, y2 + 20),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
 
+                if class_id == 0:
+                    st.session_state.pedestrian_analyzer.update(track_id, bbox, timestamp)
+
+                crossed, arrival_time = detector.check_arrival(track_id, bbox, timestamp)
+                if crossed:
+                    record_arrival(track_id, class_id, bbox, arrival_time, frame.shape[1])
+
     # Draw stats on frame
     stats_text = f"Detections: {len(detections)} | Total Arrivals: {len(st.session_state.arrivals)}"
     cv2.putText(annotated_frame, stats_text, (10, 30),
@@ -164,6 +222,21 @@ def create_entity_chart():
     return fig
 
 
+def create_live_table(now=None):
+    """Current 1/5/15-minute congestion metrics (read from running sums, no rescan)"""
+    rows = []
+    for label, m in st.session_state.live_metrics.snapshot(now).items():
+        rates = m['rate_per_hour']
+        rows.append({
+            'Window': label,
+            'Throughput/h': round(m['throughput_per_hour'], 1),
+            'Vehicles/h': round(sum(rates.get(e, 0.0) for e in VEHICLE_ENTITIES), 1),
+            'Pedestrians/h': round(sum(rates.get(e, 0.0) for e in PEDESTRIAN_ENTITIES), 1),
+            'Pedestrian Occupancy': round(m['pedestrian_occupancy'], 2)
+        })
+    return pd.DataFrame(rows).set_index('Window')
+
+
 def create_timeline_chart():
     """Create timeline chart of arrivals"""
     if not st.session_state.arrivals:
@@ -238,6 +311,8 @@ with st.sidebar:
         st.session_state.arrivals = []
         st.session_state.stats = {'EB Vehicles': 0, 'WB Vehicles': 0, 'Crossers': 0, 'Posers': 0}
         st.session_state.frame_count = 0
+        st.session_state.arrival_times = []
+        reset_detection()
         st.rerun()
 
     # Export section
@@ -298,6 +373,12 @@ with chart_col:
 
 st.markdown("---")
 
+# Live congestion
+st.subheader("🚦 Live Congestion")
+live_placeholder = st.empty()
+
+st.markdown("---")
+
 # Timeline chart
 st.subheader("📈 Arrival Timeline")
 timeline_placeholder = st.empty()
@@ -336,6 +417,7 @@ if start_btn and uploaded_file is not None:
 
     st.session_state.processing = True
     st.session_state.frame_count = 0
+    reset_detection()  # Video time restarts at 0
 
     frame_skip = 2  # Process every 2nd frame for speed
 
@@ -355,7 +437,7 @@ if start_btn and uploaded_file is not None:
             timestamp = st.session_state.frame_count / fps
 
             # Process frame
-            annotated_frame = process_frame(frame, arrival_line_y, confidence)
+            annotated_frame = process_frame(frame, arrival_line_y, confidence, timestamp)
 
             # Convert BGR to RGB for display
             frame_rgb = cv2.cvtColor(annotated_frame, cv2.COLOR_BGR2RGB)
@@ -367,6 +449,7 @@ if start_btn and uploaded_file is not None:
             if st.session_state.frame_count % 10 == 0:
                 chart_placeholder.plotly_chart(create_entity_chart(), use_container_width=True)
                 timeline_placeholder.plotly_chart(create_timeline_chart(), use_container_width=True)
+                live_placeholder.dataframe(create_live_table(timestamp), use_container_width=True)
 
             # Update data table
             if st.session_state.arrivals:
@@ -409,6 +492,7 @@ if not st.session_state.processing:
     if st.session_state.arrivals:
         chart_placeholder.plotly_chart(create_entity_chart(), use_container_width=True)
         timeline_placeholder.plotly_chart(create_timeline_chart(), use_container_width=True)
+        live_placeholder.dataframe(create_live_table(), use_container_width=True)
 
         df = pd.DataFrame(st.session_state.arrivals)
         recent_df = df.tail(show_count).iloc[::-1]  # Newest first
@@ -417,4 +501,5 @@ if not st.session_state.processing:
         video_placeholder.info("👆 Upload a video file and click 'Start Processing' to begin")
         chart_placeholder.info("No data yet. Start processing to see statistics.")
         timeline_placeholder.info("Timeline will appear after processing begins.")
+        live_placeholder.info("Sliding-window congestion metrics will appear as arrivals are recorded.")
         table_placeholder.info("Arrival data will be displayed here.")
@@ -6,6 +6,82 @@ from pathlib import Path
 
 st.set_page_config(page_title="ML Traffic Monitor Demo", layout="wide")
 
+SESSIONS_PAGE_SIZE = 20
+
+
+def file_mtime(path):
+    """Modification time used as part of every cache key"""
+    return os.path.getmtime(path)
+
+
+@st.cache_data
+def load_video_metadata(video_path, mtime):
+    """Read FPS, resolution and frame count once per video version"""
+    video = cv2.VideoCapture(video_path)
+    fps = video.get(cv2.CAP_PROP_FPS)
+    frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    video.release()
+
+    return {
+        'fps': fps,
+        'frame_count': frame_count,
+        'width': width,
+        'height': height,
+        'duration': frame_count / fps if fps > 0 else 0.0
+    }
+
+
+@st.cache_data
+def load_results(results_path, mtime):
+    """Read an ML results CSV once per file version"""
+    return pd.read_csv(results_path)
+
+
+@st.cache_data
+def load_file_bytes(path, mtime):
+    """Read a small image file once per file version (videos are streamed, not cached)"""
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@st.cache_data
+def build_session_index(results_dir, dir_mtime):
+    """
+    Index every *_ml_results.csv in a directory without reading them
+
+    Keyed by the directory mtime, so the index is rebuilt only when files
+    are added or removed; CSV contents are loaded lazily per page.
+    """
+    sessions = []
+    for results_path in sorted(Path(results_dir).glob('*_ml_results.csv')):
+        stem = results_path.name[:-len('_ml_results.csv')]
+        video_path = next((str(p) for p in results_path.parent.glob(f"{stem}.*")
+                           if p.suffix.lower() in ('.mp4', '.mkv', '.avi', '.mov')), None)
+        sessions.append({
+            'session': stem,
+            'results_path': str(results_path),
+            'video_path': video_path,
+            'size_kb': results_path.stat().st_size / 1024
+        })
+    return sessions
+
+
+def summarize_session(session):
+    """Summary row for one indexed session (reads only that CSV)"""
+    df = load_results(session['results_path'], file_mtime(session['results_path']))
+    counts = df['Entity'].value_counts() if 'Entity' in df.columns else pd.Series(dtype=int)
+    return {
+        'Session': session['session'],
+        'Arrivals': len(df),
+        'EB Vehicles': int(counts.get('EB Vehicles', 0)),
+        'WB Vehicles': int(counts.get('WB Vehicles', 0)),
+        'Crossers': int(counts.get('Crossers', 0)),
+        'Posers': int(counts.get('Posers', 0))
+    }
+
+
 st.title("🚗 ML Traffic Monitoring System - Live Demo")
 st.markdown("---")
 
@@ -25,6 +101,10 @@ st.sidebar.markdown("""
 - **Classification:** Direction + Behavior
 """)
 
+st.sidebar.header("Processed Sessions")
+results_dir = st.sidebar.text_input("Results directory", value="",
+                                    help="Folder of *_ml_results.csv files to browse")
+
 # Main content - Two columns
 col1, col2 = st.columns([1, 1])
 
@@ -35,16 +115,19 @@ with col1:
     video_path = "test_30sec.mp4"
 
     if os.path.exists("frame_first.jpg"):
-        st.image("frame_first.jpg", caption="Frame 28 - Sample from video (blurred for privacy)", width='stretch')
+        st.image(load_file_bytes("frame_first.jpg", file_mtime("frame_first.jpg")),
+                 caption="Frame 28 - Sample from video (blurred for privacy)", width='stretch')
 
         with st.expander("View more frames"):
             col_a, col_b = st.columns(2)
             with col_a:
                 if os.path.exists("frame_middle.jpg"):
-                    st.image("frame_middle.jpg", caption="Frame 900 - Middle (blurred)", width='stretch')
+                    st.image(load_file_bytes("frame_middle.jpg", file_mtime("frame_middle.jpg")),
+                             caption="Frame 900 - Middle (blurred)", width='stretch')
             with col_b:
                 if os.path.exists("frame_last.jpg"):
-                    st.image("frame_last.jpg", caption="Frame 1800 - End (blurred)", width='stretch')
+                    st.image(load_file_bytes("frame_last.jpg", file_mtime("frame_last.jpg")),
+                             caption="Frame 1800 - End (blurred)", width='stretch')
 
         st.caption("30-second test clip from Abbey Road crossing (content blurred for ethical reasons)")
 
@@ -63,18 +146,12 @@ with col1:
 
     st.markdown("### Video Details")
     if os.path.exists(video_path):
-        video = cv2.VideoCapture(video_path)
-        fps = video.get(cv2.CAP_PROP_FPS)
-        frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-        width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        duration = frame_count / fps
-        video.release()
-
-        st.metric("Resolution", f"{width}×{height}")
-        st.metric("Frame Rate", f"{fps} FPS")
-        st.metric("Duration", f"{duration:.1f} seconds")
-        st.metric("Total Frames", f"{frame_count:,}")
+        meta = load_video_metadata(video_path, file_mtime(video_path))
+
+        st.metric("Resolution", f"{meta['width']}×{meta['height']}")
+        st.metric("Frame Rate", f"{meta['fps']} FPS")
+        st.metric("Duration", f"{meta['duration']:.1f} seconds")
+        st.metric("Total Frames", f"{meta['frame_count']:,}")
 
 with col2:
     st.header("📊 ML Detection Results")
@@ -82,7 +159,7 @@ with col2:
     # Load results
     results_path = "test_results_30sec.csv"
     if os.path.exists(results_path):
-        df = pd.read_csv(results_path)
+        df = load_results(results_path, file_mtime(results_path))
 
         st.markdown("### Summary Statistics")
         col_a, col_b, col_c = st.columns(3)
@@ -118,6 +195,40 @@ with col2:
 
 st.markdown("---")
 
+# Processed sessions browser (index built once, pages loaded lazily)
+if results_dir:
+    st.header("🗂️ Processed Sessions")
+    if not os.path.isdir(results_dir):
+        st.warning(f"Directory not found: {results_dir}")
+    else:
+        sessions = build_session_index(results_dir, file_mtime(results_dir))
+        if not sessions:
+            st.info("No *_ml_results.csv files found in this directory.")
+        else:
+            num_pages = (len(sessions) - 1) // SESSIONS_PAGE_SIZE + 1
+            page = st.number_input(f"Page (of {num_pages})", min_value=1, max_value=num_pages,
+                                   value=1, step=1)
+            page_sessions = sessions[(page - 1) * SESSIONS_PAGE_SIZE:page * SESSIONS_PAGE_SIZE]
+
+            st.caption(f"{len(sessions)} sessions indexed")
+            st.dataframe(pd.DataFrame([summarize_session(sess) for sess in page_sessions]),
+                         width='stretch')
+
+            selected = st.selectbox("Inspect session", [sess['session'] for sess in page_sessions])
+            session = next(sess for sess in page_sessions if sess['session'] == selected)
+
+            if session['video_path']:
+                meta = load_video_metadata(session['video_path'], file_mtime(session['video_path']))
+                col_a, col_b, col_c = st.columns(3)
+                col_a.metric("Resolution", f"{meta['width']}×{meta['height']}")
+                col_b.metric("Frame Rate", f"{meta['fps']} FPS")
+                col_c.metric("Duration", f"{meta['duration']:.1f} seconds")
+
+            st.dataframe(load_results(session['results_path'], file_mtime(session['results_path'])),
+                         width='stretch', height=300)
+
+    st.markdown("---")
+
 # Technical Details
 with st.expander("🔬 Technical Details"):
     st.markdown("""
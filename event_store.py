@@ -0,0 +1,463 @@
+"""
+Traffic Event Store
+Shared loader and canonical schema for arrival data
+
+Every analyzer loads arrivals through load_events(). A CSV/Excel export is
+parsed once, normalised to the canonical schema and cached next to the
+source as an uncompressed Arrow (Feather) file, <name>.events.feather, which
+later loads are memory-mapped from. The cache is rebuilt whenever the source
+is newer. Without pyarrow the source is simply parsed on every load.
+
+For multi-session studies the events can also be written as a dataset
+directory partitioned on disk by Session_ID / Period_Type / Entity_Type
+(hive-style Parquet). Loading with filters then reads only the matching
+partitions, and only the requested columns, so a per-group analysis costs
+what the group costs rather than the whole study.
+
+Canonical schema:
+    ID                   int32
+    Arrival_Time         float64   seconds from session start
+    Entity_Type          category  EB Vehicles / WB Vehicles / Crossers / Posers
+    Direction            category  EB / WB / Crosser / Poser
+    Inter_Arrival_Time   float64   seconds
+    Service_Time         float64   seconds, NaN where not recorded ('-')
+    Session_ID           category  multi-session files only
+    Period_Type          category  multi-session files only
+    Day_of_Week          category  multi-session files only
+
+Times stay float64: float32 shifts the derived metrics in the reports and
+numpy float32 scalars are not JSON serialisable.
+
+Usage:
+    from event_store import load_events
+    df = load_events('combined_results.csv')
+
+    # Only "Evening Peak, Crossers" from a partitioned dataset
+    df = load_events('study_dataset', columns=['Arrival_Time'],
+                     filters={'Period_Type': 'Evening Peak', 'Entity_Type': 'Crossers'})
+
+    # Scan a file larger than memory, chunk by chunk
+    for chunk in iter_events('huge_study.csv', columns=['Arrival_Time', 'Entity_Type']):
+        ...
+
+    # Build/refresh the caches from the command line
+    python event_store.py combined_results.csv all_sessions_combined.csv
+
+    # Write (or update sessions in) a partitioned dataset
+    python event_store.py --dataset study_dataset all_sessions_combined.csv
+"""
+
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    ds = None
+    feather = None
+
+SCHEMA_VERSION = '1'
+CACHE_SUFFIX = '.events.feather'
+
+# Export header -> canonical column name
+CANONICAL_COLUMNS = {
+    'Time (s)': 'Arrival_Time',
+    'Entity': 'Entity_Type',
+    'Type/Dir': 'Direction',
+    'Inter-Arrival (s)': 'Inter_Arrival_Time',
+    'Service Time (s)': 'Service_Time'
+}
+
+# Canonical column name -> export header (SIMUL8 / annotation tool CSVs)
+EXPORT_COLUMNS = {canonical: raw for raw, canonical in CANONICAL_COLUMNS.items()}
+
+TIME_COLUMNS = ['Arrival_Time', 'Inter_Arrival_Time', 'Service_Time']
+CATEGORY_COLUMNS = ['Entity_Type', 'Direction', 'Session_ID', 'Period_Type', 'Day_of_Week']
+
+# Dataset directory layout, outermost first (levels missing from the data are skipped)
+PARTITION_COLUMNS = ['Session_ID', 'Period_Type', 'Entity_Type']
+PARTITIONING_FILE = '_partitioning.json'
+
+# Rows per chunk when streaming events
+DEFAULT_CHUNKSIZE = 500_000
+
+
+def to_canonical(df: pd.DataFrame) -> pd.DataFrame:
+    """Rename export headers and cast columns to the canonical dtypes"""
+    df = df.rename(columns=lambda col: str(col).strip())
+    df = df.rename(columns=CANONICAL_COLUMNS)
+
+    if 'ID' in df.columns:
+        ids = pd.to_numeric(df['ID'], errors='coerce')
+        if ids.notna().all():
+            df['ID'] = ids.astype('int32')
+
+    for col in TIME_COLUMNS:
+        if col in df.columns:
+            # '-' (and anything else non-numeric) means not recorded
+            df[col] = pd.to_numeric(df[col].replace('-', np.nan), errors='coerce').astype('float64')
+
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+
+    return df
+
+
+def cache_path(source) -> Path:
+    """Location of the columnar cache for a source file"""
+    source = Path(source)
+    return source.with_name(source.name + CACHE_SUFFIX)
+
+
+def read_source(path) -> pd.DataFrame:
+    """Parse a CSV/Excel export into the canonical schema"""
+    path = Path(path)
+    if path.suffix.lower() in ('.xlsx', '.xls'):
+        df = pd.read_excel(path)
+    else:
+        df = pd.read_csv(path)
+    return to_canonical(df)
+
+
+def save_events(df: pd.DataFrame, path):
+    """Persist a canonical frame as an uncompressed (memory-mappable) Feather file"""
+    if feather is None:
+        raise ImportError("pyarrow is required to write the event store (pip install pyarrow)")
+
+    table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'event_store_version'] = SCHEMA_VERSION.encode()
+    table = table.replace_schema_metadata(metadata)
+
+    tmp_path = f"{path}.tmp"
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+
+
+class EventFileWriter:
+    """
+    Write a canonical event file batch by batch (same layout as save_events)
+
+    Each batch is appended as Arrow record batches, so the whole file never
+    has to be in memory. Every batch must have the same columns and, for
+    category columns, the same categories. The file appears under its name
+    only when the writer is closed without an error.
+    """
+
+    def __init__(self, path):
+        if feather is None:
+            raise ImportError("pyarrow is required to write the event store (pip install pyarrow)")
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.writer = None
+        self.schema = None
+        self.rows = 0
+
+    def write(self, df: pd.DataFrame):
+        table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+        if self.writer is None:
+            metadata = dict(table.schema.metadata or {})
+            metadata[b'event_store_version'] = SCHEMA_VERSION.encode()
+            self.schema = table.schema.with_metadata(metadata)
+            self.writer = pa.ipc.new_file(self.tmp_path, self.schema)
+        self.writer.write_table(table.replace_schema_metadata(self.schema.metadata))
+        self.rows += len(df)
+
+    def close(self):
+        """Finish the file and move it into place (nothing is written for no batches)"""
+        if self.writer is not None:
+            self.writer.close()
+            os.replace(self.tmp_path, self.path)
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self.writer is not None:
+            self.writer.close()
+            os.remove(self.tmp_path)
+            self.writer = None
+
+
+def _cache_is_fresh(source: Path, cache: Path) -> bool:
+    if not cache.exists() or cache.stat().st_mtime < source.stat().st_mtime:
+        return False
+    try:
+        with pa.memory_map(str(cache)) as source_map:
+            metadata = pa.ipc.open_file(source_map).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    return metadata.get(b'event_store_version') == SCHEMA_VERSION.encode()
+
+
+def _read_feather(path, columns=None) -> pd.DataFrame:
+    if columns is not None:
+        with pa.memory_map(str(path)) as source_map:
+            available = pa.ipc.open_file(source_map).schema.names
+        columns = [col for col in columns if col in available]
+    return feather.read_table(str(path), columns=columns, memory_map=True).to_pandas()
+
+
+def _partitioning(fields):
+    return ds.partitioning(pa.schema([(field, pa.string()) for field in fields]), flavor='hive')
+
+
+def _dataset_fields(root):
+    with open(Path(root) / PARTITIONING_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)['fields']
+
+
+def _filter_values(value):
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    return [str(v) for v in values]
+
+
+def write_dataset(df: pd.DataFrame, root):
+    """
+    Write canonical events as a partitioned Parquet dataset
+
+    Partitions present in df are replaced; other partitions already in
+    root (e.g. earlier sessions) are kept.
+    """
+    if ds is None:
+        raise ImportError("pyarrow is required to write a dataset (pip install pyarrow)")
+
+    root = Path(root)
+    fields = [col for col in PARTITION_COLUMNS if col in df.columns]
+    layout_file = root / PARTITIONING_FILE
+    if layout_file.exists():
+        with open(layout_file, 'r', encoding='utf-8') as f:
+            existing = json.load(f)['fields']
+        if existing != fields:
+            raise ValueError(f"{root} is partitioned by {existing}, data has {fields}")
+
+    df = df.reset_index(drop=True).copy()
+    for col in fields:
+        df[col] = df[col].astype(str)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    ds.write_dataset(table, str(root), format='parquet', partitioning=_partitioning(fields),
+                     existing_data_behavior='delete_matching')
+
+    with open(layout_file, 'w', encoding='utf-8') as f:
+        json.dump({'fields': fields, 'version': SCHEMA_VERSION}, f)
+
+
+def load_dataset(root, columns=None, filters=None) -> pd.DataFrame:
+    """
+    Load events from a partitioned dataset, pruning partitions and columns
+
+    Parameters:
+    - root: Dataset directory written by write_dataset()
+    - columns: Optional canonical column names to load
+    - filters: Optional {column: value or list of values}; partition columns
+      skip whole directories, other columns are filtered while scanning
+    """
+    if ds is None:
+        raise ImportError("pyarrow is required to read a dataset (pip install pyarrow)")
+
+    fields = _dataset_fields(root)
+    dataset = ds.dataset(str(root), format='parquet', partitioning=_partitioning(fields))
+
+    expression = None
+    for col, value in (filters or {}).items():
+        if col in fields:
+            condition = ds.field(col).isin(_filter_values(value))
+        else:
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            condition = ds.field(col).isin(list(values))
+        expression = condition if expression is None else expression & condition
+
+    if columns is not None:
+        columns = [col for col in columns if col in dataset.schema.names]
+    return to_canonical(dataset.to_table(columns=columns, filter=expression).to_pandas())
+
+
+def iter_groups(root, by, columns=None, filters=None):
+    """
+    Yield (key, DataFrame) per group of partition values, loading one group at a time
+
+    by: partition columns to group on, e.g. ['Period_Type', 'Entity_Type']
+    """
+    fields = _dataset_fields(root)
+    dataset = ds.dataset(str(root), format='parquet', partitioning=_partitioning(fields))
+
+    keys = dataset.to_table(columns=list(by)).to_pandas().drop_duplicates()
+    for values in keys.sort_values(list(by)).itertuples(index=False):
+        group_filters = dict(filters or {})
+        group_filters.update(zip(by, values))
+        key = values[0] if len(by) == 1 else tuple(values)
+        yield key, load_dataset(root, columns, group_filters)
+
+
+def event_groups(source, columns=None):
+    """
+    Yield (key, group) per Period_Type/Entity_Type from a DataFrame or a dataset directory
+
+    key is (period, entity), or just the entity when there is no Period_Type.
+    A dataset directory is read one group of partitions at a time.
+    """
+    if isinstance(source, pd.DataFrame):
+        by = ['Period_Type', 'Entity_Type'] if 'Period_Type' in source.columns else 'Entity_Type'
+        yield from source.groupby(by, observed=True)
+        return
+
+    by = ['Period_Type', 'Entity_Type'] if 'Period_Type' in _dataset_fields(source) else ['Entity_Type']
+    yield from iter_groups(source, by, columns)
+
+
+def is_dataset(path) -> bool:
+    """True for a dataset directory written by write_dataset()"""
+    return (Path(path) / PARTITIONING_FILE).exists()
+
+
+def load_events(path, columns=None, use_cache=True, filters=None) -> pd.DataFrame:
+    """
+    Load arrival events in the canonical schema
+
+    Parameters:
+    - path: CSV/Excel export, a .feather event store file, or a dataset directory
+    - columns: Optional canonical column names to load (missing ones are skipped)
+    - use_cache: Read/write the <name>.events.feather cache next to the source
+    - filters: Optional {column: value or list of values}; pushed down to a
+      dataset directory, applied after loading for single files
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Data file not found: {path}")
+
+    if is_dataset(path):
+        return load_dataset(path, columns, filters)
+
+    if path.suffix.lower() == '.feather':
+        if feather is None:
+            raise ImportError("pyarrow is required to read .feather files (pip install pyarrow)")
+        df = to_canonical(_read_feather(path))
+    elif feather is None or not use_cache:
+        df = read_source(path)
+    else:
+        cache = cache_path(path)
+        if _cache_is_fresh(path, cache):
+            df = _read_feather(cache, None if filters else columns)
+        else:
+            df = read_source(path)
+            try:
+                save_events(df, cache)
+            except OSError:
+                pass  # Read-only location: keep working from the source
+
+    for col, value in (filters or {}).items():
+        if col not in df.columns:
+            df = df.iloc[0:0]
+            continue
+        df = df[df[col].astype(str).isin(_filter_values(value))]
+
+    if columns is not None:
+        df = df[[col for col in columns if col in df.columns]]
+    return df
+
+
+def iter_events(path, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Yield canonical events in chunks of about `chunksize` rows
+
+    CSV exports are parsed chunk by chunk (or read from a fresh cache),
+    .feather files and datasets are read batch by batch, so files larger
+    than memory can be scanned. Excel files are loaded whole.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Data file not found: {path}")
+
+    if is_dataset(path):
+        if ds is None:
+            raise ImportError("pyarrow is required to read a dataset (pip install pyarrow)")
+        dataset = ds.dataset(str(path), format='parquet', partitioning=_partitioning(_dataset_fields(path)))
+        if columns is not None:
+            columns = [col for col in columns if col in dataset.schema.names]
+        for batch in dataset.to_batches(columns=columns, batch_size=chunksize):
+            if batch.num_rows:
+                yield to_canonical(batch.to_pandas())
+        return
+
+    feather_file = None
+    if path.suffix.lower() == '.feather':
+        feather_file = path
+    elif feather is not None and _cache_is_fresh(path, cache_path(path)):
+        feather_file = cache_path(path)
+
+    if feather_file is not None:
+        if feather is None:
+            raise ImportError("pyarrow is required to read .feather files (pip install pyarrow)")
+        with pa.memory_map(str(feather_file)) as source_map:
+            reader = pa.ipc.open_file(source_map)
+            names = reader.schema.names
+            wanted = names if columns is None else [col for col in columns if col in names]
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i).select(wanted)
+                for start in range(0, batch.num_rows, chunksize):
+                    yield to_canonical(batch.slice(start, chunksize).to_pandas())
+        return
+
+    if path.suffix.lower() in ('.xlsx', '.xls'):
+        yield load_events(path, columns)
+        return
+
+    usecols = None
+    if columns is not None:
+        usecols = lambda col: CANONICAL_COLUMNS.get(col.strip(), col.strip()) in columns
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=usecols):
+        yield to_canonical(chunk)
+
+
+def main():
+    """Build or refresh the columnar cache (or a partitioned dataset) for each file given"""
+    parser = argparse.ArgumentParser(
+        description='Traffic Event Store - Build columnar caches and partitioned datasets',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Refresh the .events.feather caches
+  python event_store.py combined_results.csv all_sessions_combined.csv
+
+  # Write/update a dataset partitioned by Session_ID / Period_Type / Entity_Type
+  python event_store.py --dataset study_dataset all_sessions_combined.csv
+        """
+    )
+    parser.add_argument('files', nargs='+', help='CSV/Excel exports to load')
+    parser.add_argument('--dataset', type=str, default=None,
+                       help='Write the files into this partitioned dataset directory instead')
+    args = parser.parse_args()
+
+    if feather is None:
+        print("Error: pyarrow is required to build the event store (pip install pyarrow)")
+        sys.exit(1)
+
+    for filename in args.files:
+        df = read_source(filename)
+        if args.dataset:
+            write_dataset(df, args.dataset)
+            print(f"✓ {filename}: {len(df)} events -> {args.dataset}/")
+            continue
+
+        cache = cache_path(filename)
+        save_events(df, cache)
+        print(f"✓ {filename}: {len(df)} events -> {cache}")
+        for col, dtype in df.dtypes.items():
+            print(f"    {col:<20s} {dtype}")
+
+
+if __name__ == "__main__":
+    main()
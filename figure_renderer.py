@@ -0,0 +1,126 @@
+"""
+Figure Rendering Service
+Headless, parallel and cached rendering of report figures
+
+Importing this module selects the non-interactive Agg backend, so it must
+be imported before matplotlib.pyplot. A figure is described by a
+FigureJob: a module-level draw function that builds and returns a Figure
+from plain inputs, plus the output file and DPI. render_figures():
+
+- hashes each job's inputs (DataFrames/arrays by content, see
+  result_cache.fingerprint), the draw function's source and the DPI, and
+  skips jobs whose hash matches the one stored in .figure_cache.json next
+  to the output (and the file exists)
+- renders the remaining jobs on a process pool (in-process for one job)
+- in preview mode renders at PREVIEW_DPI, which is much faster; the
+  changed DPI means the next full run re-renders those figures
+
+Environment overrides for scheduled runs: FIGURE_PREVIEW=1 renders every
+figure as a preview, FIGURE_WORKERS=<n> sets the pool size and
+FIGURE_FORCE=1 ignores the cache.
+
+Usage:
+    from figure_renderer import FigureJob, render_figures
+
+    jobs = [FigureJob(draw_cost_analysis, 'cost_analysis.png', args=(cost_metrics,), dpi=300)]
+    status = render_figures(jobs)   # {'cost_analysis.png': 'rendered' | 'cached'}
+"""
+
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from result_cache import fingerprint
+
+PREVIEW_DPI = 72
+CACHE_FILE = '.figure_cache.json'
+
+
+@dataclass
+class FigureJob:
+    """One figure: draw(*args, **kwargs) -> Figure, saved to output_file"""
+    draw: Callable
+    output_file: str
+    args: tuple = ()
+    kwargs: Dict = field(default_factory=dict)
+    dpi: int = 150
+    bbox_inches: Optional[str] = 'tight'
+
+
+def job_hash(job: FigureJob, dpi: int) -> str:
+    """Hash of everything that determines the rendered file"""
+    try:
+        source = inspect.getsource(job.draw)
+    except (OSError, TypeError):
+        source = ''
+    name = f'{job.draw.__module__}.{job.draw.__qualname__}'
+    return fingerprint(name, source, dpi, job.bbox_inches, job.args, job.kwargs)
+
+
+def _render(job: FigureJob, dpi: int) -> str:
+    """Draw and save one figure (runs in a worker process)"""
+    fig = job.draw(*job.args, **job.kwargs)
+    fig.savefig(job.output_file, dpi=dpi, bbox_inches=job.bbox_inches)
+    plt.close(fig)
+    return job.output_file
+
+
+def _load_cache(cache_file: Path) -> Dict[str, str]:
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_figures(jobs: List[FigureJob], workers: Optional[int] = None, preview: Optional[bool] = None,
+                   force: Optional[bool] = None) -> Dict[str, str]:
+    """
+    Render figures in parallel, skipping those whose inputs are unchanged
+
+    Returns {output_file: 'rendered' | 'cached'} in job order.
+    """
+    preview = os.environ.get('FIGURE_PREVIEW') == '1' if preview is None else preview
+    force = os.environ.get('FIGURE_FORCE') == '1' if force is None else force
+    if workers is None and os.environ.get('FIGURE_WORKERS'):
+        workers = int(os.environ['FIGURE_WORKERS'])
+
+    caches, todo, status = {}, [], {}
+    for job in jobs:
+        dpi = PREVIEW_DPI if preview else job.dpi
+        cache_file = Path(job.output_file).resolve().parent / CACHE_FILE
+        cache = caches.setdefault(cache_file, _load_cache(cache_file))
+        key = Path(job.output_file).name
+        digest = job_hash(job, dpi)
+
+        if not force and cache.get(key) == digest and Path(job.output_file).exists():
+            status[job.output_file] = 'cached'
+        else:
+            status[job.output_file] = 'rendered'
+            todo.append((job, dpi, cache, key, digest))
+
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_render, job, dpi) for job, dpi, *_ in todo]
+            for future in futures:
+                future.result()
+    else:
+        for job, dpi, *_ in todo:
+            _render(job, dpi)
+
+    for _, _, cache, key, digest in todo:
+        cache[key] = digest
+    for cache_file, cache in caches.items():
+        if any(entry[2] is cache for entry in todo):
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump(cache, f, indent=2)
+
+    return status
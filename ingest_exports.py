@@ -0,0 +1,348 @@
+"""
+Annotation Export Ingester
+Loads a directory of mixed annotation exports into the canonical event schema
+
+The annotation tool and the merge scripts have produced several shapes
+over time: the full 6-column export, per-entity pedestrian exports with
+quoted headers and a different column order, session files with
+Session_ID/Period_Type/Day_of_Week, canonical-named files, and the
+"Excel" download (an HTML table saved as .xls). Each file's shape is
+sniffed from its header (delimiter, quoting, column names), mapped to the
+canonical schema in event_store.py and parsed with pyarrow's
+multithreaded CSV reader (pandas if pyarrow is missing). Files are
+ingested in parallel and anything that cannot be mapped is reported with
+the reason instead of stopping the run.
+
+Usage:
+    python ingest_exports.py "data set"
+    python ingest_exports.py exports/ --output ingested.csv --dedupe
+    python ingest_exports.py exports/ --dataset study_dataset
+"""
+
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+
+import pandas as pd
+
+from event_store import save_events, to_canonical, write_dataset
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
+    pa_csv = None
+
+EXPORT_SUFFIXES = {'.csv', '.txt', '.tsv', '.xls', '.xlsx'}
+
+# Normalised header (lower case, single spaces) -> canonical column
+HEADER_ALIASES = {
+    'id': 'ID',
+    'time (s)': 'Arrival_Time', 'time': 'Arrival_Time', 'arrival_time': 'Arrival_Time',
+    'arrival time': 'Arrival_Time', 'timestamp': 'Arrival_Time',
+    'entity': 'Entity_Type', 'entity_type': 'Entity_Type', 'entity type': 'Entity_Type',
+    'type/dir': 'Direction', 'direction': 'Direction', 'type': 'Direction',
+    'inter-arrival (s)': 'Inter_Arrival_Time', 'inter_arrival_time': 'Inter_Arrival_Time',
+    'inter-arrival': 'Inter_Arrival_Time', 'inter arrival (s)': 'Inter_Arrival_Time',
+    'service time (s)': 'Service_Time', 'service_time': 'Service_Time', 'service time': 'Service_Time',
+    'session_id': 'Session_ID', 'session id': 'Session_ID',
+    'period_type': 'Period_Type', 'period type': 'Period_Type',
+    'day_of_week': 'Day_of_Week', 'day of week': 'Day_of_Week',
+    'camera': 'Camera', 'annotator': 'Annotator'
+}
+
+ENTITY_DIRECTIONS = {'EB Vehicles': 'EB', 'WB Vehicles': 'WB', 'Crossers': 'Crosser', 'Posers': 'Poser'}
+
+# Filename hints for exports without an Entity column
+FILENAME_ENTITIES = [(r'\beb\b|eastbound', 'EB Vehicles'), (r'\bwb\b|westbound', 'WB Vehicles'),
+                     (r'crosser', 'Crossers'), (r'poser', 'Posers')]
+
+TEXT_COLUMNS = ['Entity_Type', 'Direction', 'Session_ID', 'Period_Type', 'Day_of_Week', 'Annotator']
+
+
+class RejectedFile(Exception):
+    """A file that cannot be mapped to the canonical schema"""
+
+
+class _TableParser(HTMLParser):
+    """Rows of the first <table> in an HTML "Excel" export"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows, self._row, self._cell, self._done = [], None, None, False
+
+    def handle_starttag(self, tag, attrs):
+        if self._done:
+            return
+        if tag == 'tr':
+            self._row = []
+        elif tag in ('td', 'th') and self._row is not None:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag in ('td', 'th') and self._cell is not None:
+            self._row.append(''.join(self._cell).strip())
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+        elif tag == 'table' and self.rows:
+            self._done = True
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def normalise_header(name):
+    """Header text as used for alias lookup"""
+    return re.sub(r'\s+', ' ', str(name).strip().strip('"').strip()).lower()
+
+
+def map_header(columns):
+    """Canonical name for each header (unknown columns keep their name)"""
+    return [HEADER_ALIASES.get(normalise_header(col), str(col).strip()) for col in columns]
+
+
+def sniff_file(path):
+    """
+    Identify a file's shape from its first bytes
+
+    Returns (kind, delimiter, header) where kind is 'csv', 'html' or 'excel'.
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.xlsx':
+        return 'excel', None, None
+
+    with open(path, 'rb') as f:
+        head = f.read(64 * 1024)
+    if not head.strip():
+        raise RejectedFile("empty file")
+    if b'\x00' in head:
+        raise RejectedFile("binary file")
+
+    text = head.decode('utf-8-sig', errors='replace')
+    if text.lstrip().startswith('<'):
+        return 'html', None, None
+
+    first_line = text.splitlines()[0]
+    try:
+        delimiter = csv.Sniffer().sniff(first_line, delimiters=',\t;|').delimiter
+    except csv.Error:
+        delimiter = ','
+    header = next(csv.reader([first_line], delimiter=delimiter))
+    return 'csv', delimiter, header
+
+
+def read_csv_fast(path, delimiter, header):
+    """Parse a delimited export with the multithreaded reader"""
+    canonical = map_header(header)
+    if pa_csv is None:
+        return pd.read_csv(path, sep=delimiter, dtype={col: str for col in header
+                                                       if normalise_header(col) in ('service time (s)', 'service_time')})
+
+    # Text and '-'-bearing columns stay strings; to_canonical converts them
+    column_types = {raw: pa.string() for raw, col in zip(header, canonical)
+                    if col in TEXT_COLUMNS or col == 'Service_Time'}
+    table = pa_csv.read_csv(
+        path,
+        read_options=pa_csv.ReadOptions(use_threads=True),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, strings_can_be_null=True)
+    )
+    return table.to_pandas()
+
+
+def read_html_table(path):
+    """Parse the annotation tool's HTML "Excel" download"""
+    parser = _TableParser()
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        parser.feed(f.read())
+    if len(parser.rows) < 2:
+        raise RejectedFile("HTML file has no data table")
+    header, *rows = parser.rows
+    return pd.DataFrame([row[:len(header)] for row in rows], columns=header)
+
+
+def entity_from_filename(path):
+    """Entity type implied by a per-entity export's file name, if any"""
+    name = re.sub(r'[_\-.]', ' ', Path(path).stem.lower())
+    for pattern, entity in FILENAME_ENTITIES:
+        if re.search(pattern, name):
+            return entity
+    return None
+
+
+def ingest_file(path):
+    """
+    Read one export into the canonical schema
+
+    Returns (DataFrame, report) and raises RejectedFile when the file
+    cannot be mapped.
+    """
+    kind, delimiter, header = sniff_file(path)
+
+    try:
+        if kind == 'csv':
+            df = read_csv_fast(path, delimiter, header)
+        elif kind == 'html':
+            df = read_html_table(path)
+        else:
+            df = pd.read_excel(path)
+    except RejectedFile:
+        raise
+    except Exception as e:
+        raise RejectedFile(f"unreadable {kind}: {e}")
+
+    raw_columns = list(df.columns)
+    df.columns = map_header(raw_columns)
+    if df.columns.duplicated().any():
+        raise RejectedFile(f"ambiguous header {raw_columns}")
+    if 'Arrival_Time' not in df.columns:
+        raise RejectedFile(f"no time column in header {raw_columns}")
+    shape = f"{kind}:" + ','.join(c for c in df.columns if c in HEADER_ALIASES.values())
+    if len(df) == 0:
+        raise RejectedFile("no data rows")
+
+    if 'Entity_Type' not in df.columns:
+        entity = entity_from_filename(path)
+        if entity is None:
+            raise RejectedFile(f"no Entity column and none implied by the file name ({raw_columns})")
+        df['Entity_Type'] = entity
+    if 'Direction' not in df.columns:
+        df['Direction'] = df['Entity_Type'].map(ENTITY_DIRECTIONS)
+
+    df = to_canonical(df)
+    bad_times = int(df['Arrival_Time'].isna().sum())
+    if bad_times == len(df):
+        raise RejectedFile("time column is not numeric")
+    df = df.dropna(subset=['Arrival_Time']).sort_values('Arrival_Time', kind='stable')
+
+    report = {'File': str(path), 'Status': 'ok', 'Shape': shape, 'Rows': len(df),
+              'Dropped_Rows': bad_times, 'Reason': ''}
+    return df, report
+
+
+def _ingest_safe(path):
+    try:
+        return ingest_file(path)
+    except RejectedFile as e:
+        return None, {'File': str(path), 'Status': 'rejected', 'Shape': '', 'Rows': 0,
+                      'Dropped_Rows': 0, 'Reason': str(e)}
+    except OSError as e:
+        return None, {'File': str(path), 'Status': 'rejected', 'Shape': '', 'Rows': 0,
+                      'Dropped_Rows': 0, 'Reason': f"cannot read: {e}"}
+
+
+def find_exports(directory, recursive=True):
+    """Candidate export files under a directory"""
+    directory = Path(directory)
+    pattern = '**/*' if recursive else '*'
+    return sorted(path for path in directory.glob(pattern)
+                  if path.is_file() and path.suffix.lower() in EXPORT_SUFFIXES
+                  and not path.name.startswith('.'))
+
+
+def ingest_directory(directory, workers=None, recursive=True, dedupe=False):
+    """
+    Ingest every export in a directory in one parallel pass
+
+    Returns (events, report): canonical events with a Source_File column,
+    and one report row per file (ok/rejected with reason).
+    """
+    files = find_exports(directory, recursive)
+    workers = workers or min(32, (os.cpu_count() or 1) * 4)
+
+    frames, reports = [], []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for df, report in pool.map(_ingest_safe, files):
+            reports.append(report)
+            if df is not None:
+                frames.append(df.assign(Source_File=Path(report['File']).name))
+
+    report_df = pd.DataFrame(reports, columns=['File', 'Status', 'Shape', 'Rows', 'Dropped_Rows', 'Reason'])
+    if not frames:
+        return pd.DataFrame(), report_df
+
+    events = to_canonical(pd.concat(frames, ignore_index=True))
+    if dedupe:
+        key = [col for col in ['Session_ID', 'Arrival_Time', 'Entity_Type', 'Service_Time']
+               if col in events.columns]
+        events = events.drop_duplicates(subset=key).reset_index(drop=True)
+    return events, report_df
+
+
+def main():
+    """Main function with CLI"""
+    parser = argparse.ArgumentParser(
+        description='Annotation Export Ingester - Load mixed annotation exports into the canonical schema',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Check which exports in a folder can be ingested
+  python ingest_exports.py "data set"
+
+  # Ingest everything, drop events exported more than once, save as CSV
+  python ingest_exports.py exports/ --output ingested.csv --dedupe
+
+  # Write straight into a partitioned event store dataset
+  python ingest_exports.py exports/ --dataset study_dataset
+        """
+    )
+    parser.add_argument('directory', type=str, help='Folder of exports (searched recursively)')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                       help='Write the ingested events (.csv or .feather)')
+    parser.add_argument('--dataset', type=str, default=None,
+                       help='Write the ingested events into a partitioned dataset directory')
+    parser.add_argument('--report', type=str, default='ingest_report.csv',
+                       help='Per-file report CSV (default: ingest_report.csv)')
+    parser.add_argument('--dedupe', action='store_true',
+                       help='Drop events that appear in more than one export')
+    parser.add_argument('--no-recursive', action='store_true',
+                       help='Only look at files directly in the folder')
+    parser.add_argument('--workers', '-w', type=int, default=None,
+                       help='Parallel file readers (default: 4 x CPU count, max 32)')
+
+    args = parser.parse_args()
+
+    if not Path(args.directory).is_dir():
+        print(f"Error: Not a directory: {args.directory}")
+        sys.exit(1)
+
+    events, report = ingest_directory(args.directory, args.workers, not args.no_recursive, args.dedupe)
+    report.to_csv(args.report, index=False)
+
+    ok = report[report['Status'] == 'ok']
+    rejected = report[report['Status'] == 'rejected']
+
+    print("="*70)
+    print(f"INGESTED {len(ok)} of {len(report)} files ({len(events)} events)")
+    print("="*70)
+    for shape, group in ok.groupby('Shape'):
+        print(f"  {len(group):4d} file(s)  {shape}")
+    if len(rejected):
+        print(f"\nRejected {len(rejected)} file(s):")
+        for _, row in rejected.iterrows():
+            print(f"  ✗ {row['File']}: {row['Reason']}")
+    print(f"\n✓ Per-file report saved to: {args.report}")
+
+    if len(events) and args.output:
+        if args.output.endswith('.feather'):
+            save_events(events, args.output)
+        else:
+            events.to_csv(args.output, index=False)
+        print(f"✓ Events saved to: {args.output}")
+    if len(events) and args.dataset:
+        write_dataset(events.drop(columns='Source_File'), args.dataset)
+        print(f"✓ Events written to dataset: {args.dataset}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,8 @@ import warnings
 import sys
 import io
 
+from event_store import load_events
+
 warnings.filterwarnings('ignore')
 
 # Set UTF-8 encoding for Windows console
@@ -487,21 +489,9 @@ def main():
 
     # Load data
     try:
-        df = pd.read_csv('combined_results.csv')
+        df = load_events('combined_results.csv')
     except FileNotFoundError:
-        df = pd.read_csv('all_sessions_combined.csv')
-
-    # Standardize column names
-    column_mapping = {
-        'Time (s)': 'Arrival_Time',
-        'Entity': 'Entity_Type',
-        'Inter-Arrival (s)': 'Inter_Arrival_Time',
-        'Service Time (s)': 'Service_Time'
-    }
-
-    for old_col, new_col in column_mapping.items():
-        if old_col in df.columns:
-            df = df.rename(columns={old_col: new_col})
+        df = load_events('all_sessions_combined.csv')
 
     print(f"Dataset loaded: {len(df)} entities")
     print(f"Entity types: {df['Entity_Type'].unique()}")
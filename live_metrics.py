@@ -0,0 +1,299 @@
+"""
+Live Traffic Metrics
+Sliding-window congestion metrics updated as arrivals are recorded
+
+Arrivals are counted into a ring of fixed-width time buckets (1 s by
+default) covering the longest window. Each window (1, 5 and 15 minutes by
+default) keeps running sums per entity: arrivals, inter-arrival count/
+sum/sum of squares and pedestrian service time. A new arrival adds to its
+bucket and to every window's sums; when time moves on, the bucket leaving
+each window is subtracted. Updates are O(1) per arrival (amortised O(1)
+per elapsed bucket), and a snapshot only reads the running sums, so
+dashboards and alerts never rescan the arrival history.
+
+Per window:
+- throughput (entities/hour) and arrival rate per entity
+- inter-arrival CV per entity
+- pedestrian occupancy: time-average number of pedestrians on the
+  crossing (Little's law: sum of their service times / window length);
+  ML arrivals have no service time yet, so DEFAULT_SERVICE_TIMES is used
+
+Usage:
+    live = LiveMetrics()
+    analyzer.arrival_listeners.append(live.on_arrival)   # ml_processor.TrafficAnalyzer
+    live.snapshot(now)['5 min']['throughput_per_hour']
+
+    # Replay a finished results file, printing the metrics every 5 minutes
+    python live_metrics.py combined_results.csv --every 300
+"""
+
+import argparse
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+WINDOWS = (60, 300, 900)  # seconds
+VEHICLE_ENTITIES = ['EB Vehicles', 'WB Vehicles']
+PEDESTRIAN_ENTITIES = ['Crossers', 'Posers']
+ENTITIES = VEHICLE_ENTITIES + PEDESTRIAN_ENTITIES
+
+# Mean observed service times (s), used when an arrival carries none
+DEFAULT_SERVICE_TIMES = {'Crossers': 7.2, 'Posers': 11.0}
+
+# Running-sum columns
+COUNT, IAT_N, IAT_SUM, IAT_SQ, SERVICE = range(5)
+
+
+def window_label(seconds: float) -> str:
+    """'1 min', '15 min', '30 s'"""
+    return f"{seconds / 60:g} min" if seconds % 60 == 0 else f"{seconds:g} s"
+
+
+class LiveMetrics:
+    """Sliding-window throughput, arrival rates, inter-arrival CV and occupancy"""
+
+    def __init__(self, windows=WINDOWS, resolution: float = 1.0, entities: Optional[List[str]] = None,
+                 service_times: Optional[Dict[str, float]] = None):
+        self.windows = tuple(sorted(windows))
+        self.resolution = resolution
+        self.spans = [max(1, int(round(w / resolution))) for w in self.windows]
+        self.n_slots = max(self.spans)
+        self.service_times = dict(DEFAULT_SERVICE_TIMES if service_times is None else service_times)
+
+        self.entities = []
+        self.entity_index = {}
+        self.ring = np.zeros((self.n_slots, 0, 5))
+        self.sums = np.zeros((len(self.spans), 0, 5))
+        self.pedestrian = np.zeros(0, dtype=bool)
+        for entity in entities or ENTITIES:
+            self._index(entity)
+
+        self.last_time = {}
+        self.bucket = None
+        self.first_bucket = None
+        self.total_arrivals = 0
+
+    def _index(self, entity: str) -> int:
+        """Column of an entity, adding it on first sight"""
+        index = self.entity_index.get(entity)
+        if index is None:
+            index = self.entity_index[entity] = len(self.entities)
+            self.entities.append(entity)
+            self.ring = np.concatenate([self.ring, np.zeros((self.n_slots, 1, 5))], axis=1)
+            self.sums = np.concatenate([self.sums, np.zeros((len(self.spans), 1, 5))], axis=1)
+            self.pedestrian = np.append(self.pedestrian, entity in PEDESTRIAN_ENTITIES)
+        return index
+
+    def reset(self):
+        """Forget all arrivals"""
+        self.ring[:] = 0.0
+        self.sums[:] = 0.0
+        self.last_time.clear()
+        self.bucket = self.first_bucket = None
+        self.total_arrivals = 0
+
+    def advance(self, time_s: float):
+        """Move the windows forward to time_s, expiring buckets that fell out"""
+        bucket = int(math.floor(time_s / self.resolution))
+        if self.bucket is None or bucket <= self.bucket:
+            return
+
+        if bucket - self.bucket >= self.n_slots:
+            # Idle for longer than the longest window: everything expired
+            self.ring[:] = 0.0
+            self.sums[:] = 0.0
+            self.bucket = bucket
+            return
+
+        for b in range(self.bucket + 1, bucket + 1):
+            for w, span in enumerate(self.spans):
+                self.sums[w] -= self.ring[(b - span) % self.n_slots]
+            slot = b % self.n_slots
+            self.ring[slot] = 0.0
+            if slot == 0:
+                self._resync(b)
+        self.bucket = bucket
+
+    def _resync(self, bucket: int):
+        """Recompute the running sums from the ring (once per rotation, stops float drift)"""
+        for w, span in enumerate(self.spans):
+            slots = [(bucket - k) % self.n_slots for k in range(span)]
+            self.sums[w] = self.ring[slots].sum(axis=0)
+
+    def record(self, time_s: float, entity: str, service_time: Optional[float] = None):
+        """Add one arrival (late arrivals count in the current bucket)"""
+        if self.bucket is None:
+            self.bucket = self.first_bucket = int(math.floor(time_s / self.resolution))
+        else:
+            self.advance(time_s)
+
+        e = self._index(entity)
+        row = np.zeros(5)
+        row[COUNT] = 1.0
+
+        last = self.last_time.get(entity)
+        if last is not None and time_s >= last:
+            gap = time_s - last
+            row[IAT_N] = 1.0
+            row[IAT_SUM] = gap
+            row[IAT_SQ] = gap * gap
+        self.last_time[entity] = max(time_s, last) if last is not None else time_s
+
+        if self.pedestrian[e]:
+            row[SERVICE] = service_time if service_time is not None else self.service_times.get(entity, 0.0)
+
+        self.ring[self.bucket % self.n_slots, e] += row
+        self.sums[:, e] += row
+        self.total_arrivals += 1
+
+    def on_arrival(self, arrival: Dict):
+        """Arrival listener for ml_processor (export-format arrival dict)"""
+        service = pd.to_numeric(arrival.get('Service Time (s)'), errors='coerce')
+        self.record(float(arrival['Time (s)']), arrival['Entity'],
+                    None if pd.isna(service) else float(service))
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Current metrics per window
+
+        Returns {'1 min': {...}, '5 min': {...}, ...}, each with window_s,
+        full (False while less than a window has been observed; rates are
+        then over the elapsed time), arrivals, throughput_per_hour,
+        rate_per_hour and cv_inter_arrival (per entity) and
+        pedestrian_occupancy. Pass now to expire buckets during quiet
+        periods with no arrivals.
+        """
+        if now is not None:
+            self.advance(now)
+        elapsed = 0.0 if self.bucket is None else (self.bucket - self.first_bucket + 1) * self.resolution
+
+        result = {}
+        for w, seconds in enumerate(self.windows):
+            sums = self.sums[w]
+            span = min(seconds, elapsed)
+            counts = np.maximum(sums[:, COUNT], 0.0)
+
+            n = sums[:, IAT_N]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                mean = sums[:, IAT_SUM] / n
+                var = np.maximum(sums[:, IAT_SQ] - n * mean ** 2, 0.0) / (n - 1)
+                cv = np.where((n > 1) & (mean > 0), np.sqrt(var) / mean, np.nan)
+
+            per_hour = 3600.0 / span if span > 0 else 0.0
+            result[window_label(seconds)] = {
+                'window_s': seconds,
+                'full': elapsed >= seconds,
+                'arrivals': int(round(counts.sum())),
+                'throughput_per_hour': float(counts.sum() * per_hour),
+                'rate_per_hour': {entity: float(counts[i] * per_hour) for i, entity in enumerate(self.entities)},
+                'cv_inter_arrival': {entity: float(cv[i]) for i, entity in enumerate(self.entities)},
+                'pedestrian_occupancy': float(sums[self.pedestrian, SERVICE].sum() / span) if span > 0 else 0.0
+            }
+        return result
+
+    def check_alerts(self, max_throughput: Optional[float] = None, max_occupancy: Optional[float] = None,
+                     window: Optional[float] = None, now: Optional[float] = None) -> Dict[str, str]:
+        """
+        Thresholds exceeded over one window (default: the middle one)
+
+        Returns {'throughput' | 'occupancy': message} for each active alert;
+        nothing until the window has filled, so start-up noise never alerts.
+        """
+        window = self.windows[len(self.windows) // 2] if window is None else window
+        current = self.snapshot(now)[window_label(window)]
+
+        alerts = {}
+        if not current['full']:
+            return alerts
+        if max_throughput is not None and current['throughput_per_hour'] > max_throughput:
+            alerts['throughput'] = (f"Throughput {current['throughput_per_hour']:.0f}/h over "
+                                    f"{window_label(window)} exceeds {max_throughput:.0f}/h")
+        if max_occupancy is not None and current['pedestrian_occupancy'] > max_occupancy:
+            alerts['occupancy'] = (f"Pedestrian occupancy {current['pedestrian_occupancy']:.1f} over "
+                                   f"{window_label(window)} exceeds {max_occupancy:.1f}")
+        return alerts
+
+    def status(self, now: Optional[float] = None) -> str:
+        """Short throughput/occupancy string for progress output"""
+        parts = [f"{label}: {m['throughput_per_hour']:.0f}/h, occ {m['pedestrian_occupancy']:.1f}"
+                 for label, m in self.snapshot(now).items()]
+        return " | ".join(parts)
+
+    def to_frame(self, now: Optional[float] = None) -> pd.DataFrame:
+        """Snapshot as a window x entity table of rates and CVs"""
+        rows = []
+        for label, m in self.snapshot(now).items():
+            for entity in self.entities:
+                rows.append({'Window': label, 'Entity': entity,
+                             'Rate_Per_Hour': m['rate_per_hour'][entity],
+                             'CV_Inter_Arrival': m['cv_inter_arrival'][entity]})
+        return pd.DataFrame(rows)
+
+
+def main():
+    """Replay a results file through the live metrics"""
+    parser = argparse.ArgumentParser(
+        description='Live Traffic Metrics - Sliding-window congestion metrics replayed from a results file',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Print 1/5/15-minute metrics every 5 minutes of recorded time
+  python live_metrics.py combined_results.csv --every 300
+
+  # Report when 5-minute throughput or pedestrian occupancy crosses a threshold
+  python live_metrics.py combined_results.csv --alert-throughput 900 --alert-occupancy 4
+        """
+    )
+    parser.add_argument('input', type=str, help='Results CSV (ml_processor or annotation tool format)')
+    parser.add_argument('--every', type=float, default=300, help='Seconds between printed snapshots (default: 300)')
+    parser.add_argument('--alert-throughput', type=float, default=None,
+                       help='Alert when 5-minute throughput exceeds this (entities/hour)')
+    parser.add_argument('--alert-occupancy', type=float, default=None,
+                       help='Alert when 5-minute pedestrian occupancy exceeds this')
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input).sort_values('Time (s)', kind='stable')
+    if 'Service Time (s)' not in df.columns:
+        df['Service Time (s)'] = np.nan
+    service = pd.to_numeric(df['Service Time (s)'], errors='coerce')
+
+    live = LiveMetrics()
+    next_report = None
+    alerting = set()
+    print(f"Replaying {len(df)} arrivals from {args.input}\n")
+
+    for time_s, entity, svc in zip(df['Time (s)'].to_numpy(dtype=float), df['Entity'], service):
+        live.record(time_s, entity, None if pd.isna(svc) else svc)
+
+        if next_report is None:
+            next_report = time_s + args.every
+        if time_s >= next_report:
+            print(f"t={time_s:8.1f}s  {live.status()}")
+            next_report += args.every * max(1, math.ceil((time_s - next_report) / args.every))
+
+        if args.alert_throughput is not None or args.alert_occupancy is not None:
+            alerts = live.check_alerts(args.alert_throughput, args.alert_occupancy)
+            # Report each condition when it starts; it holds until back below 90% of
+            # the threshold, so a level hovering at the threshold reports once
+            holding = live.check_alerts(*(None if v is None else v * 0.9
+                                          for v in (args.alert_throughput, args.alert_occupancy)))
+            for kind in alerts.keys() - alerting:
+                print(f"t={time_s:8.1f}s  ALERT: {alerts[kind]}")
+            alerting = set(alerts) | (alerting & set(holding))
+
+    print(f"\n{'='*70}")
+    print(f"Final metrics ({live.total_arrivals} arrivals)")
+    print('='*70)
+    for label, m in live.snapshot().items():
+        print(f"{label:>7}: {m['arrivals']:5d} arrivals, {m['throughput_per_hour']:7.1f}/h, "
+              f"pedestrian occupancy {m['pedestrian_occupancy']:.2f}")
+    table = live.to_frame().pivot(index='Entity', columns='Window', values=['Rate_Per_Hour', 'CV_Inter_Arrival'])
+    table = table.reindex(columns=[window_label(w) for w in live.windows], level='Window')
+    print()
+    print(table.to_string(float_format=lambda v: f"{v:.2f}"))
+
+
+if __name__ == "__main__":
+    main()
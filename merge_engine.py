@@ -0,0 +1,171 @@
+"""
+Streaming Merge Engine for Per-Entity Annotation CSVs
+Shared by merge_team_data.py and merge_session_data.py
+
+Each input CSV (one entity type, one annotator) is read in chunks and
+treated as a stream already sorted by time. The streams are combined
+with a chunked k-way heap merge: a heap holds the last time of each
+stream's buffered chunk, and everything before the smallest of those
+times is safe to emit in one stable vectorised sort (rows at that time
+wait until every stream has read past it, so ties keep input order).
+Per-entity inter-arrival times are recomputed with a groupby-diff that
+carries the last arrival of each entity across chunks, and the result
+is appended chunk by chunk to a temporary file that replaces the output
+CSV only once the merge has finished, so memory stays bounded by chunk
+size x streams.
+
+A file that fits in a single chunk is sorted in memory, so only large
+inputs need to be in time order already.
+"""
+
+import heapq
+import os
+import pandas as pd
+import numpy as np
+
+REQUIRED_COLUMNS = ['ID', 'Time (s)', 'Entity', 'Type/Dir', 'Inter-Arrival (s)', 'Service Time (s)']
+DEFAULT_CHUNKSIZE = 100_000
+
+# Text columns are passed through untouched ('-' service times stay '-')
+READ_DTYPES = {'Entity': str, 'Type/Dir': str, 'Service Time (s)': str}
+
+
+def read_header(path):
+    """Column names of a CSV without reading its rows"""
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def sorted_chunks(path, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield time-ordered chunks of one CSV, checking the order across chunks"""
+    last_time = -np.inf
+    reader = pd.read_csv(path, chunksize=chunksize, dtype=READ_DTYPES)
+
+    for i, chunk in enumerate(reader):
+        if len(chunk) == 0:
+            continue
+        if i == 0 and len(chunk) < chunksize:
+            # Whole file in one chunk: no ordering assumption needed
+            chunk = chunk.sort_values('Time (s)', kind='stable')
+        elif not chunk['Time (s)'].is_monotonic_increasing or chunk['Time (s)'].iloc[0] < last_time:
+            raise ValueError(f"{path} is not sorted by 'Time (s)'; sort it before merging")
+
+        last_time = chunk['Time (s)'].iloc[-1]
+        yield chunk
+
+
+def merge_sorted(paths, chunksize=DEFAULT_CHUNKSIZE, keep_source=False):
+    """
+    Stable k-way merge of sorted CSV streams
+
+    Yields time-ordered chunks; equal times keep the order of `paths`, then
+    file order, exactly as a stable sort of the concatenated files would.
+    Rows at the watermark itself are held back until every stream has
+    buffered past it, so ties split across chunk boundaries stay in order.
+    With keep_source, a _source column holds each row's position in `paths`.
+    """
+    streams = [sorted_chunks(path, chunksize) for path in paths]
+    buffers = [None] * len(streams)
+    heap = []  # (buffered tail time, stream) for every stream not yet at end of file
+
+    def extend(i):
+        for chunk in streams[i]:
+            chunk = chunk.assign(_source=i)
+            buffers[i] = chunk if buffers[i] is None else pd.concat([buffers[i], chunk], ignore_index=True)
+            heapq.heappush(heap, (chunk['Time (s)'].iloc[-1], i))
+            return
+
+    for i in range(len(streams)):
+        extend(i)
+
+    while True:
+        if heap:
+            # Nothing earlier than the smallest buffered tail can still arrive
+            watermark, side = heap[0][0], 'left'
+        else:
+            watermark, side = np.inf, 'right'
+
+        ready = []
+        for i, buffer in enumerate(buffers):
+            if buffer is None or len(buffer) == 0:
+                continue
+            cut = int(buffer['Time (s)'].searchsorted(watermark, side=side))
+            if cut:
+                ready.append(buffer.iloc[:cut])
+                buffers[i] = buffer.iloc[cut:]
+
+        if ready:
+            merged = pd.concat(ready, ignore_index=True)
+            merged = merged.sort_values(['Time (s)', '_source'], kind='stable').reset_index(drop=True)
+            yield merged if keep_source else merged.drop(columns='_source')
+
+        if not heap:
+            return
+
+        # Streams ending at the watermark may hold more rows at that time: read on
+        while heap and heap[0][0] == watermark:
+            _, i = heapq.heappop(heap)
+            extend(i)
+
+
+def add_inter_arrivals(chunk, last_time):
+    """
+    Per-entity inter-arrival times for one time-ordered chunk
+
+    last_time maps entity -> previous arrival time and is updated in place;
+    the first arrival of each entity gets 0.0.
+    """
+    times = chunk['Time (s)']
+    previous = times.groupby(chunk['Entity'], sort=False).shift()
+    previous = previous.fillna(chunk['Entity'].map(last_time))
+    chunk['Inter-Arrival (s)'] = (times - previous).round(1).fillna(0.0)
+
+    last_time.update(times.groupby(chunk['Entity'], sort=False).last().to_dict())
+    return chunk
+
+
+def merge_files(paths, output_file, metadata=None, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Merge per-entity CSVs into one time-ordered file, chunk by chunk
+
+    Parameters:
+    - paths: Input CSVs in tie-break order
+    - output_file: Combined CSV (IDs renumbered from 1)
+    - metadata: Optional {column: value} inserted after ID (e.g. session info)
+    - chunksize: Rows read per input chunk
+
+    Returns summary statistics: total, per-entity counts, rows per input
+    file (file_counts, in path order), earliest/latest time.
+    """
+    summary = {'total': 0, 'entity_counts': {}, 'file_counts': [0] * len(paths),
+               'earliest': np.inf, 'latest': -np.inf}
+    last_time = {}
+    header = True
+
+    # Written beside the output and renamed at the end, so a failed merge
+    # never leaves a truncated file that looks complete
+    tmp_file = f"{output_file}.partial"
+    try:
+        for chunk in merge_sorted(paths, chunksize, keep_source=True):
+            file_counts = np.bincount(chunk.pop('_source').to_numpy(), minlength=len(paths))
+            summary['file_counts'] = [int(n) for n in summary['file_counts'] + file_counts]
+            chunk = add_inter_arrivals(chunk, last_time)
+            chunk['ID'] = np.arange(summary['total'] + 1, summary['total'] + len(chunk) + 1)
+            for position, (column, value) in enumerate((metadata or {}).items(), start=1):
+                chunk.insert(position, column, value)
+
+            chunk.to_csv(tmp_file, index=False, header=header, mode='w' if header else 'a')
+            header = False
+
+            summary['total'] += len(chunk)
+            for entity, count in chunk['Entity'].value_counts(sort=False).items():
+                summary['entity_counts'][entity] = summary['entity_counts'].get(entity, 0) + count
+            summary['earliest'] = min(summary['earliest'], chunk['Time (s)'].iloc[0])
+            summary['latest'] = max(summary['latest'], chunk['Time (s)'].iloc[-1])
+
+        if not header:
+            os.replace(tmp_file, output_file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+    return summary
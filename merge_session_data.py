@@ -1,12 +1,16 @@
 """
 Enhanced Session Data Merger
 Merges 4 CSV files AND adds session metadata for multi-session studies
+
+The files are streamed through merge_engine (k-way merge, chunked output),
+so long sessions merge in bounded memory.
 """
 
-import pandas as pd
 import sys
 import os
 
+from merge_engine import merge_files
+
 def merge_session_data(wb_file, eb_file, crossers_file, posers_file,
                        session_id, period_type, day_of_week,
                        output_file='session_combined.csv'):
@@ -35,64 +39,33 @@ def merge_session_data(wb_file, eb_file, crossers_file, posers_file,
             print(f"ERROR: File not found: {filename}")
             return False
 
-    print("\n[Step 1/6] Loading CSV files...")
+    print("\n[Step 1/2] Merging streams with session metadata...")
+    print(f"  Session ID: {session_id}")
+    print(f"  Period Type: {period_type}")
+    print(f"  Day of Week: {day_of_week}")
+
+    # Session metadata columns go straight after ID
+    metadata = {'Session_ID': session_id, 'Period_Type': period_type, 'Day_of_Week': day_of_week}
 
     try:
-        df_wb = pd.read_csv(wb_file)
-        df_eb = pd.read_csv(eb_file)
-        df_crossers = pd.read_csv(crossers_file)
-        df_posers = pd.read_csv(posers_file)
+        summary = merge_files([wb_file, eb_file, crossers_file, posers_file], output_file, metadata)
     except Exception as e:
-        print(f"ERROR: Failed to load CSV files: {e}")
+        print(f"ERROR: Failed to merge files: {e}")
         return False
 
-    print("\n[Step 2/6] Validating data...")
-    print(f"  {wb_file}: {len(df_wb)} entries")
-    print(f"  {eb_file}: {len(df_eb)} entries")
-    print(f"  {crossers_file}: {len(df_crossers)} entries")
-    print(f"  {posers_file}: {len(df_posers)} entries")
-
-    print("\n[Step 3/6] Combining data...")
-
-    # Combine all dataframes
-    combined = pd.concat([df_wb, df_eb, df_crossers, df_posers], ignore_index=True)
-
-    # Sort by time
-    combined = combined.sort_values('Time (s)').reset_index(drop=True)
-
-    print(f"  Total entries: {len(combined)}")
+    for filename, count in zip([wb_file, eb_file, crossers_file, posers_file], summary['file_counts']):
+        if count == 0:
+            print(f"WARNING: {filename} is empty")
+        else:
+            print(f"  {filename}: {count} entries")
+    print(f"  Total entries: {summary['total']}")
 
-    if len(combined) == 0:
+    if summary['total'] == 0:
         print("ERROR: No data to merge (all files empty)")
         return False
 
-    print("\n[Step 4/6] Recalculating inter-arrival times...")
-
-    # Recalculate inter-arrival times for each entity type
-    combined = recalculate_inter_arrival(combined)
-
-    # Renumber IDs sequentially
-    combined['ID'] = range(1, len(combined) + 1)
-
-    print("\n[Step 5/6] Adding session metadata...")
-
-    # Add session metadata columns
-    combined.insert(1, 'Session_ID', session_id)
-    combined.insert(2, 'Period_Type', period_type)
-    combined.insert(3, 'Day_of_Week', day_of_week)
-
-    print(f"  Session ID: {session_id}")
-    print(f"  Period Type: {period_type}")
-    print(f"  Day of Week: {day_of_week}")
-
-    print("\n[Step 6/6] Saving combined file...")
-
-    try:
-        combined.to_csv(output_file, index=False)
-        print(f"  Saved to: {output_file}")
-    except Exception as e:
-        print(f"ERROR: Failed to save file: {e}")
-        return False
+    print("\n[Step 2/2] Saved combined file...")
+    print(f"  Saved to: {output_file}")
 
     print("\n" + "="*70)
     print(f"SUCCESS: Session {session_id} merged successfully!")
@@ -101,46 +74,20 @@ def merge_session_data(wb_file, eb_file, crossers_file, posers_file,
     # Summary statistics
     print("\nSummary Statistics:")
     print(f"  Session: {session_id} ({period_type} - {day_of_week})")
-    print(f"  Total arrivals: {len(combined)}")
+    print(f"  Total arrivals: {summary['total']}")
 
-    for entity in combined['Entity'].unique():
-        count = len(combined[combined['Entity'] == entity])
+    for entity, count in summary['entity_counts'].items():
         print(f"  {entity}: {count}")
 
     print(f"\nTime range:")
-    print(f"  Earliest: {combined['Time (s)'].min():.1f}s")
-    print(f"  Latest: {combined['Time (s)'].max():.1f}s")
-    print(f"  Duration: {combined['Time (s)'].max() - combined['Time (s)'].min():.1f}s")
+    print(f"  Earliest: {summary['earliest']:.1f}s")
+    print(f"  Latest: {summary['latest']:.1f}s")
+    print(f"  Duration: {summary['latest'] - summary['earliest']:.1f}s")
 
     print(f"\nOutput file: {output_file}")
 
     return True
 
-def recalculate_inter_arrival(df):
-    """Recalculate inter-arrival times for each entity type"""
-    df = df.sort_values('Time (s)').reset_index(drop=True)
-
-    # Track last arrival time for each entity type
-    last_time = {}
-    inter_arrivals = []
-
-    for idx, row in df.iterrows():
-        entity = row['Entity']
-        time = row['Time (s)']
-
-        if entity not in last_time:
-            # First arrival of this entity type
-            inter_arrivals.append(0.0)
-            last_time[entity] = time
-        else:
-            # Calculate inter-arrival time
-            inter_arrival = time - last_time[entity]
-            inter_arrivals.append(round(inter_arrival, 1))
-            last_time[entity] = time
-
-    df['Inter-Arrival (s)'] = inter_arrivals
-    return df
-
 def main():
     """Main function"""
 
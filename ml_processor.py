@@ -11,7 +11,13 @@ from deep_sort_realtime.deepsort_tracker import DeepSort
 import numpy as np
 import argparse
 from pathlib import Path
+import queue
 import sys
+import threading
+import time
+
+from blur_video import RegionTracker, blur_regions, fast_blur
+from live_metrics import LiveMetrics
 
 
 class PedestrianAnalyzer:
@@ -100,20 +106,204 @@ class ArrivalDetector:
         self.last_positions.clear()
 
 
+class VehicleDirectionClassifier:
+    """Classifies vehicles as EB or WB when they arrive"""
+
+    def __init__(self):
+        self.prev_positions = {}
+
+    def classify(self, track_id, bbox, frame_width):
+        """Classify vehicle as EB or WB based on movement"""
+        center_x = (bbox[0] + bbox[2]) / 2
+
+        if track_id in self.prev_positions:
+            prev_x = self.prev_positions[track_id]
+            # Moving right = EB, moving left = WB
+            direction = "EB" if center_x > prev_x else "WB"
+        else:
+            # First detection: use position (left side = WB, right side = EB)
+            direction = "EB" if center_x > frame_width / 2 else "WB"
+
+        self.prev_positions[track_id] = center_x
+        return direction
+
+    def reset(self):
+        """Reset classifier for new video"""
+        self.prev_positions.clear()
+
+
+class OnlineValidator:
+    """
+    Validates ML arrivals against manual annotations while a video is processing
+
+    Manual times are sorted per entity and scanned with a sliding window:
+    each ML arrival is matched to the earliest unmatched manual event within
+    the tolerance (the online form of validate_ml.match_times, so the most
+    pairs are found), and manual events whose window has passed are counted
+    as misses. Updates are amortised O(1) per arrival.
+    """
+
+    def __init__(self, manual_csv, time_tolerance=1.0):
+        self.time_tolerance = time_tolerance
+
+        manual = pd.read_csv(manual_csv)
+        self.manual_times = {
+            entity: np.sort(group['Time (s)'].to_numpy(dtype=float))
+            for entity, group in manual.groupby('Entity')
+        }
+        self.matched_flags = {entity: np.zeros(len(times), dtype=bool)
+                              for entity, times in self.manual_times.items()}
+        self.window_start = {entity: 0 for entity in self.manual_times}
+
+        self.ml_seen = 0
+        self.matched = 0
+        self.missed = 0
+
+    def on_arrival(self, arrival):
+        """Match one newly recorded ML arrival (arrival listener)"""
+        time_s = arrival['Time (s)']
+        entity = arrival['Entity']
+        self.ml_seen += 1
+        self.advance(time_s)
+
+        times = self.manual_times.get(entity)
+        if times is None:
+            return
+
+        # Earliest unmatched manual event inside [time - tol, time + tol]
+        # (earlier ones already expired in advance())
+        flags = self.matched_flags[entity]
+        i = self.window_start[entity]
+        while i < len(times) and times[i] <= time_s + self.time_tolerance:
+            if not flags[i]:
+                flags[i] = True
+                self.matched += 1
+                return
+            i += 1
+
+    def advance(self, current_time):
+        """Expire manual events whose match window ended before current_time"""
+        for entity, times in self.manual_times.items():
+            flags = self.matched_flags[entity]
+            i = self.window_start[entity]
+            while i < len(times) and times[i] + self.time_tolerance < current_time:
+                if not flags[i]:
+                    self.missed += 1
+                i += 1
+            self.window_start[entity] = i
+
+    def finish(self):
+        """Expire every remaining manual event (end of video)"""
+        self.advance(float('inf'))
+
+    @property
+    def precision(self):
+        return self.matched / self.ml_seen * 100 if self.ml_seen > 0 else 0.0
+
+    @property
+    def recall(self):
+        decided = self.matched + self.missed
+        return self.matched / decided * 100 if decided > 0 else 0.0
+
+    def status(self):
+        """Short running precision/recall string for progress output"""
+        return (f"P={self.precision:.1f}% R={self.recall:.1f}% "
+                f"({self.matched} matched, {self.missed} missed)")
+
+
+class AnonymisedWriter(threading.Thread):
+    """
+    Blurs and encodes frames on its own thread
+
+    Lets process_video write the shareable anonymised copy from the frames
+    it has already decoded, without the encoder stalling inference.
+    """
+
+    def __init__(self, output_path, fps, frame_size, blur_mode='objects', max_buffer=32):
+        super().__init__(daemon=True)
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        self.writer = cv2.VideoWriter(str(output_path), fourcc, fps, frame_size)
+        if not self.writer.isOpened():
+            raise ValueError(f"Could not open output video: {output_path}")
+
+        self.blur_mode = blur_mode
+        self.region_tracker = RegionTracker()
+        self.frames = queue.Queue(maxsize=max_buffer)
+        self.frames_written = 0
+        self.error = None
+
+    def _put(self, item):
+        """Queue an item, re-raising the writer's error if the thread has died"""
+        while True:
+            self._check()
+            try:
+                self.frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _check(self):
+        if self.error is not None:
+            raise RuntimeError(f"Anonymised writer failed: {self.error}") from self.error
+        if not self.is_alive():
+            raise RuntimeError("Anonymised writer thread is not running")
+
+    def write(self, frame, boxes):
+        """Queue a frame and its detection boxes (x1, y1, x2, y2)"""
+        self._put((frame, boxes))
+
+    def run(self):
+        """Blur and encode queued frames until close() is called"""
+        try:
+            while True:
+                item = self.frames.get()
+                if item is None:
+                    break
+
+                frame, boxes = item
+                if self.blur_mode == 'objects':
+                    frame = blur_regions(frame, self.region_tracker.update(boxes))
+                else:
+                    frame = fast_blur(frame)
+                self.writer.write(frame)
+                self.frames_written += 1
+        except Exception as e:
+            self.error = e
+        finally:
+            self.writer.release()
+
+    def close(self):
+        """Flush remaining frames and finish the file"""
+        if self.is_alive():
+            self._put(None)
+            self.join()
+        if self.error is not None:
+            raise RuntimeError(f"Anonymised writer failed: {self.error}") from self.error
+
+
 class TrafficAnalyzer:
     """Main analyzer class for processing videos"""
 
-    def __init__(self, video_path, arrival_line_y=None, confidence=0.35, show_video=False):
+    def __init__(self, video_path, arrival_line_y=None, confidence=0.35, show_video=False,
+                 model=None, camera_id=None, record_detections=False,
+                 anonymised_output=None, blur_mode='objects', online_validator=None,
+                 live_metrics=None, alert_thresholds=None):
         self.video_path = video_path
         self.show_video = show_video
-
-        # Initialize ML models
-        print("Loading YOLO model...")
-        self.model = YOLO('yolov8n.pt')
+        self.camera_id = camera_id
+        self.record_detections = record_detections
+
+        # Initialize ML models (a detector can be shared between cameras)
+        if model is None:
+            print("Loading YOLO model...")
+            model = YOLO('yolov8n.pt')
+        self.model = model
         self.tracker = DeepSort(max_age=30, n_init=3)
 
         # Data storage
         self.arrivals = []
+        self.arrival_listeners = []  # Callables notified with each recorded arrival
+        self.detections = []  # Per-frame boxes, kept only if record_detections
         self.last_arrival_times = {
             'EB Vehicles': None,
             'WB Vehicles': None,
@@ -122,7 +312,7 @@ class TrafficAnalyzer:
         }
 
         # Tracking state
-        self.prev_positions = {}
+        self.direction_classifier = VehicleDirectionClassifier()
         self.pedestrian_analyzer = PedestrianAnalyzer()
 
         # Video properties
@@ -143,6 +333,24 @@ class TrafficAnalyzer:
         self.arrival_detector = ArrivalDetector(arrival_line_y=arrival_line_y)
         self.confidence_threshold = confidence
 
+        # Optional anonymised copy written during the same decode pass
+        self.anonymised_output = anonymised_output
+        self.blur_mode = blur_mode
+        self.frame_boxes = []
+
+        # Optional running validation against manual annotations
+        self.online_validator = online_validator
+        if online_validator is not None:
+            self.arrival_listeners.append(online_validator.on_arrival)
+
+        # Optional sliding-window congestion metrics, with alerts on
+        # LiveMetrics.check_alerts thresholds (max_throughput, max_occupancy)
+        self.live_metrics = live_metrics
+        self.alert_thresholds = alert_thresholds or {}
+        self.active_alerts = set()
+        if live_metrics is not None:
+            self.arrival_listeners.append(live_metrics.on_arrival)
+
         print(f"Video loaded: {self.frame_width}x{self.frame_height} @ {self.fps:.1f} FPS")
         print(f"Total frames: {self.total_frames}")
         print(f"Arrival line at Y={arrival_line_y}")
@@ -152,6 +360,15 @@ class TrafficAnalyzer:
         print("\nStarting video processing...")
         print("Press 'q' to stop early (if show_video=True)\n")
 
+        anonymised_writer = None
+        if self.anonymised_output:
+            anonymised_writer = AnonymisedWriter(self.anonymised_output, self.fps,
+                                                 (self.frame_width, self.frame_height),
+                                                 blur_mode=self.blur_mode)
+            anonymised_writer.start()
+            print(f"Writing anonymised copy ({self.blur_mode} blur) to: {self.anonymised_output}\n")
+
+        completed = False
         try:
             while True:
                 ret, frame = self.cap.read()
@@ -163,41 +380,7 @@ class TrafficAnalyzer:
 
                 # Run YOLO detection
                 results = self.model(frame, verbose=False, conf=self.confidence_threshold)
-
-                # Prepare detections for tracker
-                detections = []
-                for box in results[0].boxes:
-                    x1, y1, x2, y2 = box.xyxy[0].tolist()
-                    conf = float(box.conf[0])
-                    class_id = int(box.cls[0])
-
-                    # Filter: only vehicles (2,3,5,7) and persons (0)
-                    if class_id in [0, 2, 3, 5, 7]:
-                        detections.append(([x1, y1, x2-x1, y2-y1], conf, class_id))
-
-                # Update tracker
-                tracks = self.tracker.update_tracks(detections, frame=frame)
-
-                # Process each track
-                for track in tracks:
-                    if not track.is_confirmed():
-                        continue
-
-                    track_id = track.track_id
-                    bbox = track.to_ltrb()
-                    class_id = track.get_det_class()
-
-                    # Update pedestrian analyzer for persons
-                    if class_id == 0:
-                        self.pedestrian_analyzer.update(track_id, bbox, timestamp)
-
-                    # Check for arrival
-                    crossed, arrival_time = self.arrival_detector.check_arrival(
-                        track_id, bbox, timestamp
-                    )
-
-                    if crossed:
-                        self.record_arrival(track_id, class_id, bbox, arrival_time)
+                tracks = self.process_detections(frame, results[0], timestamp)
 
                 # Optional: Display video with detections
                 if self.show_video:
@@ -208,11 +391,22 @@ class TrafficAnalyzer:
                         print("\nStopped by user")
                         break
 
+                # Hand the decoded frame to the writer thread (it blurs in place)
+                if anonymised_writer is not None:
+                    anonymised_writer.write(frame, self.frame_boxes)
+
                 # Progress indicator
                 if self.frame_count % 100 == 0:
                     progress = (self.frame_count / self.total_frames) * 100
+                    validation = ""
+                    if self.online_validator is not None:
+                        self.online_validator.advance(timestamp)
+                        validation = f" | {self.online_validator.status()}"
                     print(f"Progress: {progress:.1f}% ({self.frame_count}/{self.total_frames} frames) - "
-                          f"Detected: {len(self.arrivals)} arrivals")
+                          f"Detected: {len(self.arrivals)} arrivals{validation}")
+                    if self.live_metrics is not None:
+                        self.report_live_metrics(timestamp)
+            completed = True
 
         except KeyboardInterrupt:
             print("\n\nInterrupted by user")
@@ -221,13 +415,87 @@ class TrafficAnalyzer:
             self.cap.release()
             if self.show_video:
                 cv2.destroyAllWindows()
+            if anonymised_writer is not None:
+                try:
+                    anonymised_writer.close()
+                    print(f"\n✓ Anonymised video written: {self.anonymised_output} "
+                          f"({anonymised_writer.frames_written} frames)")
+                except Exception as e:
+                    # Never mask the error (or interrupt) that ended the loop
+                    print(f"\n⚠ Anonymised video failed: {e}")
+                    if completed:
+                        raise
 
         print(f"\n✓ Processing complete!")
         print(f"Total arrivals detected: {len(self.arrivals)}")
         self.print_summary()
 
+        if self.online_validator is not None:
+            self.online_validator.finish()
+            print(f"Validation vs manual annotations: {self.online_validator.status()}")
+
         return self.get_dataframe()
 
+    def report_live_metrics(self, timestamp):
+        """Print current window metrics and any newly raised alert"""
+        print(f"  Live: {self.live_metrics.status(timestamp)}")
+        if self.alert_thresholds:
+            alerts = self.live_metrics.check_alerts(**self.alert_thresholds, now=timestamp)
+            for kind in alerts.keys() - self.active_alerts:
+                print(f"  ⚠ ALERT at {timestamp:.1f}s: {alerts[kind]}")
+            self.active_alerts = set(alerts)
+
+    def process_detections(self, frame, result, timestamp):
+        """Track one frame's YOLO result and record any arrivals"""
+        # Prepare detections for tracker
+        detections = []
+        self.frame_boxes = []
+        for box in result.boxes:
+            x1, y1, x2, y2 = box.xyxy[0].tolist()
+            conf = float(box.conf[0])
+            class_id = int(box.cls[0])
+
+            # Filter: only vehicles (2,3,5,7) and persons (0)
+            if class_id in [0, 2, 3, 5, 7]:
+                detections.append(([x1, y1, x2-x1, y2-y1], conf, class_id))
+                self.frame_boxes.append((x1, y1, x2, y2))
+
+                if self.record_detections:
+                    self.detections.append({
+                        'Frame': self.frame_count - 1,  # 0-based frame index
+                        'Time (s)': round(timestamp, 3),
+                        'Class': class_id,
+                        'Confidence': round(conf, 3),
+                        'X1': round(x1, 1), 'Y1': round(y1, 1),
+                        'X2': round(x2, 1), 'Y2': round(y2, 1)
+                    })
+
+        # Update tracker
+        tracks = self.tracker.update_tracks(detections, frame=frame)
+
+        # Process each track
+        for track in tracks:
+            if not track.is_confirmed():
+                continue
+
+            track_id = track.track_id
+            bbox = track.to_ltrb()
+            class_id = track.get_det_class()
+
+            # Update pedestrian analyzer for persons
+            if class_id == 0:
+                self.pedestrian_analyzer.update(track_id, bbox, timestamp)
+
+            # Check for arrival
+            crossed, arrival_time = self.arrival_detector.check_arrival(
+                track_id, bbox, timestamp
+            )
+
+            if crossed:
+                self.record_arrival(track_id, class_id, bbox, arrival_time)
+
+        return tracks
+
     def record_arrival(self, track_id, class_id, bbox, timestamp):
         """Record arrival event"""
         # Determine entity type
@@ -266,23 +534,17 @@ class TrafficAnalyzer:
             'Inter-Arrival (s)': round(inter_arrival, 1),
             'Service Time (s)': service_time
         }
+        if self.camera_id is not None:
+            arrival_data['Camera'] = self.camera_id
 
         self.arrivals.append(arrival_data)
 
+        for listener in self.arrival_listeners:
+            listener(arrival_data)
+
     def classify_vehicle_direction(self, track_id, bbox):
         """Classify vehicle as EB or WB based on movement"""
-        center_x = (bbox[0] + bbox[2]) / 2
-
-        if track_id in self.prev_positions:
-            prev_x = self.prev_positions[track_id]
-            # Moving right = EB, moving left = WB
-            direction = "EB" if center_x > prev_x else "WB"
-        else:
-            # First detection: use position (left side = WB, right side = EB)
-            direction = "EB" if center_x > self.frame_width / 2 else "WB"
-
-        self.prev_positions[track_id] = center_x
-        return direction
+        return self.direction_classifier.classify(track_id, bbox, self.frame_width)
 
     def draw_detections(self, frame, tracks, timestamp):
         """Draw bounding boxes and arrival line on frame"""
@@ -364,6 +626,201 @@ class TrafficAnalyzer:
         df.to_excel(output_path, index=False, engine='openpyxl')
         print(f"\n✓ Results exported to: {output_path}")
 
+    def export_detections(self, output_path):
+        """Export per-frame detections (input for blur_video.py --mode objects)"""
+        df = pd.DataFrame(self.detections, columns=['Frame', 'Time (s)', 'Class', 'Confidence',
+                                                    'X1', 'Y1', 'X2', 'Y2'])
+        df.to_csv(output_path, index=False)
+        print(f"\n✓ Detections exported to: {output_path}")
+
+
+class FrameReader(threading.Thread):
+    """Decodes frames from one video source into a bounded queue"""
+
+    def __init__(self, cap, max_buffer=16):
+        super().__init__(daemon=True)
+        self.cap = cap
+        self.frames = queue.Queue(maxsize=max_buffer)
+        self.stopped = threading.Event()
+        self.error = None
+
+    def run(self):
+        """Read frames until the video ends; None marks end of stream (also after an error)"""
+        try:
+            while not self.stopped.is_set():
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                self._put(frame)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._put(None)
+
+    def next_frame(self):
+        """Next decoded frame, or None at end of stream; re-raises a decode error"""
+        while True:
+            try:
+                frame = self.frames.get(timeout=0.5)
+                break
+            except queue.Empty:
+                # Thread gone without a sentinel (stopped mid-put): treat as ended
+                if not self.is_alive() and self.frames.empty():
+                    frame = None
+                    break
+        if frame is None and self.error is not None:
+            raise RuntimeError(f"Frame reader failed: {self.error}") from self.error
+        return frame
+
+    def _put(self, item):
+        """Block on a full buffer, but give up once stop() is called"""
+        while not self.stopped.is_set():
+            try:
+                self.frames.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def stop(self):
+        """Stop decoding and wait for the thread to exit"""
+        self.stopped.set()
+        self.join()
+
+
+class MultiCameraAnalyzer:
+    """
+    Processes several camera streams concurrently with one shared detector
+
+    Each stream is decoded on its own thread and keeps its own tracker and
+    arrival logic (a TrafficAnalyzer per camera); frames from all streams are
+    stacked into one batched YOLO call per step.
+    """
+
+    def __init__(self, video_paths, camera_ids=None, arrival_line_y=None, confidence=0.35):
+        if camera_ids is None:
+            camera_ids = [f"cam{i + 1}" for i in range(len(video_paths))]
+        if len(camera_ids) != len(video_paths):
+            raise ValueError(f"Got {len(camera_ids)} camera ids for {len(video_paths)} videos")
+
+        print("Loading YOLO model...")
+        self.model = YOLO('yolov8n.pt')
+        self.confidence_threshold = confidence
+        self.failed_streams = {}  # camera_id -> error of a stream that stopped early
+
+        self.cameras = []
+        for video_path, camera_id in zip(video_paths, camera_ids):
+            print(f"\n[{camera_id}] {video_path}")
+            self.cameras.append(TrafficAnalyzer(
+                video_path,
+                arrival_line_y=arrival_line_y,
+                confidence=confidence,
+                model=self.model,
+                camera_id=camera_id
+            ))
+
+    def process_videos(self):
+        """Process all streams until every video ends"""
+        print(f"\nStarting multi-camera processing ({len(self.cameras)} streams)...\n")
+
+        readers = [FrameReader(camera.cap) for camera in self.cameras]
+        for reader in readers:
+            reader.start()
+
+        active = list(range(len(self.cameras)))
+        self.failed_streams = {}
+        steps = 0
+        frames_processed = 0
+        start_time = time.perf_counter()
+
+        try:
+            while active:
+                # Gather the next frame from every stream that is still running
+                batch_ids, frames = [], []
+                for i in active:
+                    try:
+                        frame = readers[i].next_frame()
+                    except RuntimeError as e:
+                        # A broken stream ends on its own; the others keep going
+                        camera = self.cameras[i]
+                        self.failed_streams[camera.camera_id] = str(e)
+                        print(f"⚠ [{camera.camera_id}] {camera.video_path} stopped at frame "
+                              f"{camera.frame_count}: {e}")
+                        continue
+                    if frame is not None:
+                        batch_ids.append(i)
+                        frames.append(frame)
+                active = batch_ids
+                if not frames:
+                    break
+
+                # One detector call for all streams
+                results = self.model(frames, verbose=False, conf=self.confidence_threshold)
+
+                for i, frame, result in zip(batch_ids, frames, results):
+                    camera = self.cameras[i]
+                    camera.frame_count += 1
+                    timestamp = camera.frame_count / camera.fps
+                    camera.process_detections(frame, result, timestamp)
+
+                steps += 1
+                frames_processed += len(frames)
+
+                # Progress indicator
+                if steps % 100 == 0:
+                    elapsed = time.perf_counter() - start_time
+                    status = ", ".join(
+                        f"{c.camera_id}: {c.frame_count}/{c.total_frames}" for c in self.cameras
+                    )
+                    print(f"Progress: {status} - {frames_processed / elapsed:.1f} FPS total - "
+                          f"Detected: {sum(len(c.arrivals) for c in self.cameras)} arrivals")
+
+        except KeyboardInterrupt:
+            print("\n\nInterrupted by user")
+
+        finally:
+            for reader in readers:
+                reader.stop()
+            for camera in self.cameras:
+                camera.cap.release()
+
+        elapsed = time.perf_counter() - start_time
+        print(f"\n✓ Processing complete!")
+        if elapsed > 0:
+            print(f"Throughput: {frames_processed / elapsed:.1f} FPS across {len(self.cameras)} streams")
+        for camera_id, error in self.failed_streams.items():
+            print(f"⚠ [{camera_id}] incomplete (stream failed: {error})")
+        self.print_summary()
+
+        return self.get_dataframe()
+
+    def get_dataframe(self):
+        """Combine per-camera arrivals into one DataFrame tagged by camera"""
+        frames = [camera.get_dataframe() for camera in self.cameras if camera.arrivals]
+        if not frames:
+            print("\nWarning: No arrivals detected!")
+            return pd.DataFrame(columns=['ID', 'Time (s)', 'Entity', 'Type/Dir',
+                                        'Inter-Arrival (s)', 'Service Time (s)', 'Camera'])
+
+        return pd.concat(frames, ignore_index=True)
+
+    def print_summary(self):
+        """Print summary statistics for each camera"""
+        for camera in self.cameras:
+            print(f"\n[{camera.camera_id}] {len(camera.arrivals)} arrivals")
+            camera.print_summary()
+
+    def export_csv(self, output_path):
+        """Export results to CSV"""
+        df = self.get_dataframe()
+        df.to_csv(output_path, index=False)
+        print(f"\n✓ Results exported to: {output_path}")
+
+    def export_excel(self, output_path):
+        """Export results to Excel"""
+        df = self.get_dataframe()
+        df.to_excel(output_path, index=False, engine='openpyxl')
+        print(f"\n✓ Results exported to: {output_path}")
+
 
 def main():
     """Main function with command-line interface"""
@@ -386,10 +843,26 @@ Examples:
 
   # Export to Excel
   python ml_processor.py video.mp4 --output results.xlsx
+
+  # Save per-frame detections for object-only blurring (blur_video.py --mode objects)
+  python ml_processor.py video.mp4 --save-detections video_detections.csv
+
+  # Analyse and write an anonymised shareable copy in one decode pass
+  python ml_processor.py video.mp4 --anonymise video_anonymised.mp4
+
+  # Report running precision/recall against manual annotations
+  python ml_processor.py video.mp4 --manual manual.csv --tolerance 1.0
+
+  # Print 1/5/15-minute throughput and pedestrian occupancy, alerting on congestion
+  python ml_processor.py video.mp4 --live --alert-throughput 900 --alert-occupancy 4
+
+  # Multi-camera: one model serving both approaches to the crossing
+  python ml_processor.py north.mp4 south.mp4 --camera-ids north south
         """
     )
 
-    parser.add_argument('video', type=str, help='Path to video file')
+    parser.add_argument('video', type=str, nargs='+',
+                       help='Path to video file (pass several for multi-camera processing)')
     parser.add_argument('--output', '-o', type=str, default=None,
                        help='Output file path (CSV or XLSX)')
     parser.add_argument('--arrival-line', '-a', type=int, default=None,
@@ -398,34 +871,99 @@ Examples:
                        help='Detection confidence threshold (0.0-1.0, default: 0.35)')
     parser.add_argument('--show', '-s', action='store_true',
                        help='Show video processing in real-time')
+    parser.add_argument('--camera-ids', type=str, nargs='+', default=None,
+                       help='Camera id for each video (default: cam1, cam2, ...)')
+    parser.add_argument('--save-detections', type=str, default=None,
+                       help='Also save per-frame detection boxes to this CSV')
+    parser.add_argument('--anonymise', type=str, default=None,
+                       help='Also write an anonymised copy of the video to this path')
+    parser.add_argument('--blur-mode', choices=['objects', 'full'], default='objects',
+                       help='Anonymised copy blurs persons/vehicles only or whole frames (default: objects)')
+    parser.add_argument('--manual', '-m', type=str, default=None,
+                       help='Manual annotation CSV to validate against while processing')
+    parser.add_argument('--tolerance', '-t', type=float, default=1.0,
+                       help='Time tolerance in seconds for online validation (default: 1.0)')
+    parser.add_argument('--live', action='store_true',
+                       help='Report sliding-window (1/5/15 min) throughput, rates and occupancy while processing')
+    parser.add_argument('--alert-throughput', type=float, default=None,
+                       help='Alert when 5-minute throughput exceeds this many entities/hour (implies --live)')
+    parser.add_argument('--alert-occupancy', type=float, default=None,
+                       help='Alert when 5-minute pedestrian occupancy exceeds this (implies --live)')
 
     args = parser.parse_args()
 
-    # Validate video file
-    video_path = Path(args.video)
-    if not video_path.exists():
-        print(f"Error: Video file not found: {video_path}")
+    # Validate video files
+    video_paths = [Path(v) for v in args.video]
+    for video_path in video_paths:
+        if not video_path.exists():
+            print(f"Error: Video file not found: {video_path}")
+            sys.exit(1)
+
+    if args.manual and not Path(args.manual).exists():
+        print(f"Error: Manual annotation file not found: {args.manual}")
         sys.exit(1)
 
+    multi_camera = len(video_paths) > 1
+    if multi_camera:
+        unsupported = [flag for flag, value in [('--show', args.show),
+                                                ('--save-detections', args.save_detections),
+                                                ('--anonymise', args.anonymise),
+                                                ('--manual', args.manual),
+                                                ('--live', args.live),
+                                                ('--alert-throughput', args.alert_throughput is not None),
+                                                ('--alert-occupancy', args.alert_occupancy is not None)]
+                       if value]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} not supported with several videos "
+                         f"(process the videos one at a time)")
+
+    alert_thresholds = {name: value for name, value in [('max_throughput', args.alert_throughput),
+                                                         ('max_occupancy', args.alert_occupancy)]
+                        if value is not None}
+    live = args.live or bool(alert_thresholds)
+
     # Determine output path
     if args.output is None:
-        output_path = video_path.stem + "_ml_results.csv"
+        if multi_camera:
+            output_path = "multi_camera_ml_results.csv"
+        else:
+            output_path = video_paths[0].stem + "_ml_results.csv"
     else:
         output_path = args.output
 
     output_path = Path(output_path)
 
     try:
-        # Initialize analyzer
-        analyzer = TrafficAnalyzer(
-            video_path,
-            arrival_line_y=args.arrival_line,
-            confidence=args.confidence,
-            show_video=args.show
-        )
-
-        # Process video
-        results_df = analyzer.process_video()
+        if multi_camera:
+            analyzer = MultiCameraAnalyzer(
+                video_paths,
+                camera_ids=args.camera_ids,
+                arrival_line_y=args.arrival_line,
+                confidence=args.confidence
+            )
+            results_df = analyzer.process_videos()
+        else:
+            online_validator = None
+            if args.manual:
+                online_validator = OnlineValidator(args.manual, time_tolerance=args.tolerance)
+
+            # Initialize analyzer
+            analyzer = TrafficAnalyzer(
+                video_paths[0],
+                arrival_line_y=args.arrival_line,
+                confidence=args.confidence,
+                show_video=args.show,
+                camera_id=args.camera_ids[0] if args.camera_ids else None,
+                record_detections=args.save_detections is not None,
+                anonymised_output=args.anonymise,
+                blur_mode=args.blur_mode,
+                online_validator=online_validator,
+                live_metrics=LiveMetrics() if live else None,
+                alert_thresholds=alert_thresholds
+            )
+
+            # Process video
+            results_df = analyzer.process_video()
 
         # Export results
         if output_path.suffix.lower() in ['.xlsx', '.xls']:
@@ -433,6 +971,9 @@ Examples:
         else:
             analyzer.export_csv(output_path)
 
+        if args.save_detections:
+            analyzer.export_detections(args.save_detections)
+
         print(f"\n✓ Analysis complete! Results saved to: {output_path.absolute()}")
 
     except Exception as e:
@@ -11,6 +11,8 @@ from sklearn.preprocessing import PolynomialFeatures
 import sys
 import io
 
+from event_store import load_events
+
 # UTF-8 encoding for Windows
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
@@ -23,16 +25,9 @@ MAX_WAIT_TIME = 5.0       # Maximum acceptable wait time (seconds)
 
 def load_data(filepath='combined_results.csv'):
     """Load and prepare traffic data"""
-    try:
-        df = pd.read_csv(filepath)
-    except:
-        df = pd.read_excel(filepath)
-
-    # Standardize column names
-    if 'Time (s)' in df.columns:
-        df = df.rename(columns={'Time (s)': 'Arrival_Time', 'Entity': 'Entity_Type'})
-
-    return df
+    # Service_Time is left out so the calibrated default service rates are kept
+    return load_events(filepath, columns=['ID', 'Arrival_Time', 'Entity_Type',
+                                          'Direction', 'Inter_Arrival_Time'])
 
 
 def calculate_wait_time_queueing(arrival_rate, service_rate, cv_service, num_servers):
@@ -14,6 +14,8 @@ import math
 from scipy.special import factorial
 from scipy.optimize import fsolve
 
+from event_store import event_groups, is_dataset, load_events
+
 @dataclass
 class QueueingParameters:
     """Input parameters for queueing calculations"""
@@ -324,12 +326,8 @@ class TrafficQueueingAnalyzer:
         # For traffic: assume 60 vehicles/hour per lane or 120 peds/hour per crossing
 
         # Group by period and entity type
-        if 'Period_Type' in self.data.columns:
-            groups = self.data.groupby(['Period_Type', 'Entity_Type'])
-        else:
-            groups = self.data.groupby('Entity_Type')
-
-        for group_key, group_data in groups:
+        # self.data may also be a partitioned dataset directory (read group by group)
+        for group_key, group_data in event_groups(self.data, columns=['Arrival_Time']):
             if isinstance(group_key, tuple):
                 period_type, entity_type = group_key
             else:
@@ -497,19 +495,13 @@ def main():
     try:
         # Load data
         print(f"Loading data from {input_file}...")
-        data = pd.read_csv(input_file)
-        print(f"Loaded {len(data)} records")
-
-        # Map column names to standard format
-        column_mapping = {
-            'Time (s)': 'Arrival_Time',
-            'Entity': 'Entity_Type',
-            'Inter-Arrival (s)': 'Inter_Arrival_Time',
-            'Service Time (s)': 'Service_Time'
-        }
-        for old_col, new_col in column_mapping.items():
-            if old_col in data.columns:
-                data = data.rename(columns={old_col: new_col})
+        if is_dataset(input_file):
+            # Partitioned dataset: groups are read one at a time during analysis
+            data = input_file
+            print("Using partitioned dataset")
+        else:
+            data = load_events(input_file)
+            print(f"Loaded {len(data)} records")
 
         # Load variability metrics if available
         try:
@@ -0,0 +1,186 @@
+"""
+Analysis Result Cache
+Memoizes analysis results by input data and parameters
+
+A result is stored under a key built from its name, the content of its
+inputs (DataFrames and arrays hashed by value; Path inputs by file path,
+size and mtime, so a file is recognised without reading it), its
+parameters and the source code of the module that computes it and of
+the project modules it uses (event_store and so on), so editing the
+analysis or how it loads data invalidates old results. Results are kept
+in memory for the life of the process and, when a directory is given (or
+METRICS_CACHE_DIR is set), pickled to disk so later runs can skip the
+computation entirely.
+
+Usage:
+    from result_cache import ResultCache
+
+    cache = ResultCache('.metrics_cache')
+    aggregates = cache.get_or_compute('traffic.aggregates', TrafficTimeAnalyzer.aggregate, data)
+    summary = cache.get_or_compute('traffic.summary', summarize_events, [Path('week.csv')], stream=False)
+"""
+
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+def _feed(digest, value):
+    """Add a value to the hash by content"""
+    if isinstance(value, pd.DataFrame):
+        digest.update(b'DataFrame')
+        digest.update(repr(list(value.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(b'Series')
+        digest.update(repr(value.name).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f'ndarray{value.dtype}{value.shape}'.encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, os.PathLike):
+        digest.update(b'file')
+        _feed(digest, file_fingerprint(value))
+    elif is_dataclass(value) and not isinstance(value, type):
+        digest.update(type(value).__name__.encode())
+        _feed(digest, asdict(value))
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        for key in sorted(value, key=repr):
+            _feed(digest, key)
+            _feed(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(type(value).__name__.encode())
+        for item in value:
+            _feed(digest, item)
+    else:
+        digest.update(repr(value).encode())
+
+
+def fingerprint(*values) -> str:
+    """Content hash of any mix of DataFrames, arrays, dataclasses and plain values"""
+    digest = hashlib.sha256()
+    for value in values:
+        _feed(digest, value)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path) -> tuple:
+    """Cheap identity of a file (or dataset directory) without reading it"""
+    path = Path(path).resolve()
+    if path.is_dir():
+        return tuple((str(p.relative_to(path)), p.stat().st_size, p.stat().st_mtime_ns)
+                     for p in sorted(path.rglob('*')) if p.is_file())
+    stat = path.stat()
+    return (str(path), stat.st_size, stat.st_mtime_ns)
+
+
+_module_hashes: Dict[str, str] = {}
+
+
+def _project_modules(module) -> list:
+    """module and the project modules it uses, directly or through each other"""
+    root = Path(getattr(module, '__file__', None) or '.').resolve().parent
+    found = {}
+    pending = [module]
+    while pending:
+        current = pending.pop()
+        if current.__name__ in found:
+            continue
+        found[current.__name__] = current
+        for value in list(vars(current).values()):
+            dependency = value if inspect.ismodule(value) else sys.modules.get(getattr(value, '__module__', None) or '')
+            path = getattr(dependency, '__file__', None)
+            if path and Path(path).resolve().parent == root:
+                pending.append(dependency)
+    return [found[name] for name in sorted(found)]
+
+
+def code_version(func: Callable) -> str:
+    """Hash of the source of the module defining func and the project modules it depends on"""
+    module_name = getattr(func, '__module__', None) or ''
+    if module_name not in _module_hashes:
+        digest = hashlib.sha256()
+        module = sys.modules.get(module_name)
+        for dependency in _project_modules(module) if module is not None else []:
+            try:
+                source = inspect.getsource(dependency)
+            except (OSError, TypeError):
+                source = dependency.__name__
+            digest.update(dependency.__name__.encode())
+            digest.update(source.encode())
+        if module is None:
+            digest.update(module_name.encode())
+        _module_hashes[module_name] = digest.hexdigest()
+    return _module_hashes[module_name]
+
+
+class ResultCache:
+    """In-process memo with an optional on-disk pickle store"""
+
+    def __init__(self, directory: Optional[str] = None):
+        directory = directory or os.environ.get('METRICS_CACHE_DIR')
+        self.directory = Path(directory) if directory else None
+        self.memory: Dict[str, object] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, name: str, compute: Callable, *inputs, **params) -> str:
+        """Cache key for one computation"""
+        return f"{name}-{fingerprint(code_version(compute), inputs, params)[:24]}"
+
+    def get_or_compute(self, name: str, compute: Callable, *inputs, **params):
+        """Return compute(*inputs, **params), reusing a stored result for the same inputs"""
+        key = self.key(name, compute, *inputs, **params)
+        if key in self.memory:
+            self.hits += 1
+            return self.memory[key]
+
+        disk_file = self.directory / f"{key}.pkl" if self.directory else None
+        if disk_file is not None and disk_file.exists():
+            try:
+                with open(disk_file, 'rb') as f:
+                    result = pickle.load(f)
+                self.hits += 1
+                self.memory[key] = result
+                return result
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+                pass  # Unreadable entry: recompute and overwrite
+
+        self.misses += 1
+        result = compute(*inputs, **params)
+        self.memory[key] = result
+
+        if disk_file is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_file = disk_file.with_suffix('.tmp')
+            with open(tmp_file, 'wb') as f:
+                pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, disk_file)
+        return result
+
+    def clear(self):
+        """Drop in-memory results and any on-disk store"""
+        self.memory.clear()
+        if self.directory is not None and self.directory.exists():
+            for entry in self.directory.glob('*.pkl'):
+                entry.unlink()
+
+
+_default_cache: Optional[ResultCache] = None
+
+
+def default_cache() -> ResultCache:
+    """Process-wide cache (on disk when METRICS_CACHE_DIR is set)"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResultCache()
+    return _default_cache
@@ -0,0 +1,269 @@
+"""
+Session Comparison Engine
+Compares any number of observation sessions in one grouped pass
+
+Per-session and per-session/entity statistics (duration, throughput,
+arrival rates, inter-arrival mean/CV) come from a single sort plus
+groupby. Inter-arrival distributions are compared for every pair of
+sessions with the two-sample Kolmogorov-Smirnov and Anderson-Darling
+tests. For KS, each entity's inter-arrival samples are placed on one
+shared sorted grid; every session's ECDF is evaluated on that grid
+once, and each pair's KS statistic is the largest gap between two rows
+of that matrix. KS p-values are exact for small samples (as scipy's
+ks_2samp) and asymptotic for large ones. The AD test reuses the
+per-session sorted arrays.
+
+Sessions are defined by a column (Session_ID, Period_Type, Day_of_Week,
+or Day_Class = Weekday/Weekend derived from Day_of_Week), or by file
+when several single-session exports are given.
+
+Usage:
+    python session_comparison.py all_sessions_combined.csv --by Session_ID
+    python session_comparison.py all_sessions_combined.csv --by Day_Class
+    python session_comparison.py combined_results.csv weekend_combined.csv
+"""
+
+import argparse
+import sys
+import warnings
+from itertools import combinations
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from event_store import load_events
+
+WEEKEND_DAYS = {'saturday', 'sunday', 'sat', 'sun'}
+
+# Largest sample for which the exact KS p-value is computed (scipy's own
+# cutoff for ks_2samp's 'auto' method)
+KS_EXACT_MAX_N = 10_000
+
+
+def add_day_class(df):
+    """Add Day_Class (Weekday/Weekend) from Day_of_Week"""
+    days = df['Day_of_Week'].astype(str).str.strip().str.lower()
+    df['Day_Class'] = pd.Categorical(np.where(days.isin(WEEKEND_DAYS), 'Weekend', 'Weekday'))
+    return df
+
+
+def _timeline_keys(df, by):
+    """Grouping that keeps each recorded session on its own timeline"""
+    if by != 'Session_ID' and 'Session_ID' in df.columns:
+        return [by, 'Session_ID']
+    return [by]
+
+
+def inter_arrivals(df, by='Session_ID'):
+    """
+    Per-session, per-entity inter-arrival times from arrival times
+
+    One stable sort and a grouped diff; the first arrival of each
+    session/entity has no inter-arrival time and is dropped. When `by`
+    pools several Session_IDs, gaps are still taken within each session.
+    """
+    keys = _timeline_keys(df, by) + ['Entity_Type']
+    data = df[keys + ['Arrival_Time']].sort_values(keys + ['Arrival_Time'], kind='stable')
+    gaps = data.groupby(keys, observed=True, sort=False)['Arrival_Time'].diff()
+    return data.assign(Inter_Arrival=gaps).dropna(subset=['Inter_Arrival'])
+
+
+def session_statistics(df, by='Session_ID', iat=None):
+    """
+    Session and session/entity statistics
+
+    Returns (sessions, entities) DataFrames:
+    - sessions: Duration_Hours, Total, Throughput_Per_Hour per session
+    - entities: Count, Share, Rate_Per_Hour, Mean/Std/CV of inter-arrival
+      and Rate_Change_Pct vs the first session, per session and entity
+    """
+    iat = inter_arrivals(df, by) if iat is None else iat
+
+    # Pooled sessions: durations add up, each session timed from its own start
+    timelines = df.groupby(_timeline_keys(df, by), observed=True)['Arrival_Time'].agg(['max', 'size'])
+    sessions = timelines.groupby(level=by, observed=True).agg(
+        Duration_Seconds=('max', 'sum'), Total=('size', 'sum'))
+    sessions['Duration_Hours'] = sessions['Duration_Seconds'] / 3600
+    sessions['Throughput_Per_Hour'] = sessions['Total'] / sessions['Duration_Hours']
+
+    entities = df.groupby([by, 'Entity_Type'], observed=True).size().rename('Count').to_frame()
+    gap_stats = iat.groupby([by, 'Entity_Type'], observed=True)['Inter_Arrival'].agg(['mean', 'std'])
+    entities['Mean_Inter_Arrival'] = gap_stats['mean']
+    entities['Std_Inter_Arrival'] = gap_stats['std']
+    entities['CV_Inter_Arrival'] = gap_stats['std'] / gap_stats['mean']
+
+    level = entities.index.get_level_values(by)
+    entities['Share'] = entities['Count'] / sessions['Total'].reindex(level).to_numpy()
+    entities['Rate_Per_Hour'] = entities['Count'] / sessions['Duration_Hours'].reindex(level).to_numpy()
+
+    baseline = entities['Rate_Per_Hour'].xs(sessions.index[0], level=by)
+    base_rate = baseline.reindex(entities.index.get_level_values('Entity_Type')).to_numpy()
+    entities['Rate_Change_Pct'] = (entities['Rate_Per_Hour'].to_numpy() / base_rate - 1) * 100
+
+    return sessions.reset_index(), entities.reset_index()
+
+
+def pairwise_tests(iat, by='Session_ID', anderson=True):
+    """
+    Two-sample KS (and Anderson-Darling) tests for every pair of sessions
+
+    Returns one row per (entity, session pair) with KS_Statistic, KS_P_Value,
+    AD_Statistic and AD_P_Value (AD p-values are capped to [0.001, 0.25] by scipy).
+    """
+    rows = []
+    for entity, group in iat.groupby('Entity_Type', observed=True, sort=True):
+        samples = {session: np.sort(values.to_numpy(dtype=float))
+                   for session, values in group.groupby(by, observed=True)['Inter_Arrival']
+                   if len(values) > 0}
+        labels = list(samples)
+        if len(labels) < 2:
+            continue
+
+        # Every session's ECDF on one shared grid of all observed values
+        grid = np.unique(np.concatenate(list(samples.values())))
+        sizes = np.array([len(samples[s]) for s in labels], dtype=float)
+        ecdf = np.vstack([np.searchsorted(samples[s], grid, side='right') for s in labels]) / sizes[:, None]
+
+        for i, j in combinations(range(len(labels)), 2):
+            d = float(np.abs(ecdf[i] - ecdf[j]).max())
+            n, m = sizes[i], sizes[j]
+            if max(n, m) <= KS_EXACT_MAX_N:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')  # scipy falls back to asymptotic if exact fails
+                    p = float(stats.ks_2samp(samples[labels[i]], samples[labels[j]], method='exact').pvalue)
+            else:
+                # Same asymptotic p-value scipy's ks_2samp uses for large samples
+                en = n * m / (n + m)
+                p = float(np.clip(stats.kstwo.sf(d, np.round(en)), 0.0, 1.0))
+
+            row = {'Entity_Type': entity, 'Session_A': labels[i], 'Session_B': labels[j],
+                   'N_A': int(n), 'N_B': int(m), 'KS_Statistic': d, 'KS_P_Value': p,
+                   'AD_Statistic': np.nan, 'AD_P_Value': np.nan}
+            if anderson and n > 1 and m > 1:
+                with warnings.catch_warnings():
+                    warnings.simplefilter('ignore')
+                    try:
+                        result = stats.anderson_ksamp([samples[labels[i]], samples[labels[j]]])
+                        row['AD_Statistic'] = float(result.statistic)
+                        row['AD_P_Value'] = float(result.pvalue)
+                    except ValueError:
+                        pass
+            rows.append(row)
+
+    columns = ['Entity_Type', 'Session_A', 'Session_B', 'N_A', 'N_B',
+               'KS_Statistic', 'KS_P_Value', 'AD_Statistic', 'AD_P_Value']
+    return pd.DataFrame(rows, columns=columns)
+
+
+def pairwise_matrix(tests, entity, value='KS_P_Value'):
+    """Symmetric session x session matrix of one test column for one entity"""
+    subset = tests[tests['Entity_Type'] == entity]
+    labels = pd.unique(pd.concat([subset['Session_A'], subset['Session_B']]))
+    matrix = pd.DataFrame(np.nan, index=labels, columns=labels)
+    for a, b, v in subset[['Session_A', 'Session_B', value]].itertuples(index=False):
+        matrix.loc[a, b] = matrix.loc[b, a] = v
+    return matrix
+
+
+def compare_sessions(df, by='Session_ID', anderson=True):
+    """
+    Compare every session in df (grouped by `by`)
+
+    Returns {'sessions', 'entities', 'tests'} DataFrames.
+    """
+    if by == 'Day_Class' and 'Day_Class' not in df.columns:
+        if 'Day_of_Week' not in df.columns:
+            raise ValueError("Day_Class needs a Day_of_Week column, which this data does not have")
+        df = add_day_class(df.copy())
+    if by not in df.columns:
+        raise ValueError(f"No '{by}' column to group sessions by "
+                         f"(available: {', '.join(map(str, df.columns))})")
+
+    iat = inter_arrivals(df, by)
+    sessions, entities = session_statistics(df, by, iat)
+    return {'sessions': sessions, 'entities': entities, 'tests': pairwise_tests(iat, by, anderson)}
+
+
+def print_comparison(result, alpha=0.05):
+    """Print the comparison tables"""
+    by = result['sessions'].columns[0]
+
+    print(f"\n{'='*70}")
+    print(f"Session Comparison by {by} ({len(result['sessions'])} sessions)")
+    print('='*70)
+    print(result['sessions'][[by, 'Duration_Hours', 'Total', 'Throughput_Per_Hour']]
+          .to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+
+    print(f"\nArrival rates (entities/hour):")
+    rates = result['entities'].pivot(index='Entity_Type', columns=by, values='Rate_Per_Hour')
+    print(rates.to_string(float_format=lambda v: f"{v:.1f}"))
+
+    print(f"\nMean inter-arrival (s):")
+    means = result['entities'].pivot(index='Entity_Type', columns=by, values='Mean_Inter_Arrival')
+    print(means.to_string(float_format=lambda v: f"{v:.2f}"))
+
+    tests = result['tests']
+    if len(tests):
+        different = tests[tests['KS_P_Value'] < alpha]
+        print(f"\nInter-arrival distributions differing at alpha={alpha} (KS): "
+              f"{len(different)} of {len(tests)} session pairs")
+        for row in different.itertuples(index=False):
+            print(f"  {row.Entity_Type}: {row.Session_A} vs {row.Session_B} "
+                  f"(D={row.KS_Statistic:.3f}, p={row.KS_P_Value:.4f})")
+
+
+def main():
+    """Main function with CLI"""
+    parser = argparse.ArgumentParser(
+        description='Session Comparison Engine - Compare rates and inter-arrival distributions across sessions',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Compare every session in the combined file
+  python session_comparison.py all_sessions_combined.csv --by Session_ID
+
+  # Weekday vs weekend, or by period type
+  python session_comparison.py all_sessions_combined.csv --by Day_Class
+  python session_comparison.py all_sessions_combined.csv --by Period_Type
+
+  # One session per file
+  python session_comparison.py combined_results.csv weekend_combined.csv
+        """
+    )
+    parser.add_argument('files', nargs='+', help='Event files (CSV/Excel/feather) or dataset directories')
+    parser.add_argument('--by', type=str, default=None,
+                       help='Session column: Session_ID, Period_Type, Day_of_Week or Day_Class '
+                            '(default: Session_ID, or one session per file)')
+    parser.add_argument('--alpha', type=float, default=0.05, help='Significance level (default: 0.05)')
+    parser.add_argument('--no-anderson', action='store_true', help='Skip the Anderson-Darling tests')
+    parser.add_argument('--output-prefix', type=str, default='session_comparison',
+                       help='Prefix for the output CSVs (default: session_comparison)')
+
+    args = parser.parse_args()
+
+    frames = []
+    for path in args.files:
+        df = load_events(path)
+        if args.by is None and (len(args.files) > 1 or 'Session_ID' not in df.columns):
+            df['Session_ID'] = Path(path).stem
+        frames.append(df)
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+    try:
+        result = compare_sessions(df, args.by or 'Session_ID', anderson=not args.no_anderson)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print_comparison(result, args.alpha)
+
+    print()
+    for name, table in result.items():
+        output = f"{args.output_prefix}_{name}.csv"
+        table.to_csv(output, index=False)
+        print(f"✓ Saved {name} table to {output}")
+
+
+if __name__ == "__main__":
+    main()
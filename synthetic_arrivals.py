@@ -0,0 +1,316 @@
+"""
+Synthetic Arrival Generator
+Generates large multi-session event files from fitted distributions
+
+Inter-arrival and service time distributions (the scipy_name/scipy_params
+dictionaries produced by variability_analysis_enhanced.fit_distributions)
+are sampled in bulk: for a batch of sessions, one (sessions x draws)
+matrix of gaps per entity is cumulated into arrival times, cut at the
+session length, and merged across entities with one lexsort. Batches are
+streamed to CSV (export format), a Feather event file (appended as Arrow
+record batches) or a partitioned dataset, so months of sessions and tens
+of millions of rows fit in bounded memory. The same
+seed always produces the same file.
+
+Sessions follow the study schedule: weekdays get the Morning Peak,
+Midday Tourist and Evening Peak windows, weekend days get Weekend
+windows.
+
+Usage:
+    python synthetic_arrivals.py --days 30 -o synthetic_sessions.csv
+    python synthetic_arrivals.py --fit-from combined_results.csv --save-spec fits.json
+    python synthetic_arrivals.py --spec fits.json --days 365 --rate-scale 50 --dataset synthetic_dataset
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from event_store import EXPORT_COLUMNS, EventFileWriter, load_events, to_canonical, write_dataset
+
+ENTITY_DIRECTIONS = {'EB Vehicles': 'EB', 'WB Vehicles': 'WB', 'Crossers': 'Crosser', 'Posers': 'Poser'}
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+WEEKDAY_PERIODS = ['Morning Peak', 'Midday Tourist', 'Evening Peak']
+WEEKEND_PERIOD = 'Weekend'
+BATCH_ROWS = 2_000_000
+
+
+def fit_spec(filepath, min_samples=10):
+    """
+    Fit arrival and service distributions per entity from real data
+
+    Returns a spec: {entity: {'direction', 'arrival': fit, 'service': fit or None}}
+    where each fit holds scipy_name, scipy_params and mean.
+    """
+    from variability_analysis_enhanced import fit_distributions
+
+    df = load_events(filepath)
+    spec = {}
+    for entity, group in df.groupby('Entity_Type', observed=True):
+        gaps = group['Arrival_Time'].sort_values().diff().dropna().to_numpy()
+        if (gaps > 0).sum() < min_samples:
+            print(f"  ⚠ Skipping {entity} - insufficient data")
+            continue
+
+        # fit_distributions reports every candidate; keep only the result here
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, arrival, _ = fit_distributions(gaps, f"{entity} - Inter-Arrival Times")
+            service = None
+            if 'Service_Time' in group.columns:
+                service_times = group['Service_Time'].dropna().to_numpy()
+                if (service_times > 0).sum() > min_samples:
+                    _, service, _ = fit_distributions(service_times, f"{entity} - Service Times")
+
+        direction = group['Direction'].mode() if 'Direction' in group.columns else pd.Series(dtype=str)
+        spec[str(entity)] = {
+            'direction': str(direction.iloc[0]) if len(direction) else ENTITY_DIRECTIONS.get(entity, ''),
+            'arrival': _spec_entry(arrival),
+            'service': _spec_entry(service) if service else None
+        }
+        print(f"  ✓ {entity}: arrivals {arrival['distribution']} (mean {arrival['mean']:.2f}s)"
+              + (f", service {service['distribution']} (mean {service['mean']:.2f}s)" if service else ""))
+    return spec
+
+
+def _spec_entry(fit):
+    """JSON-safe part of a fit_distributions result"""
+    return {'distribution': fit['distribution'], 'scipy_name': fit['scipy_name'],
+            'scipy_params': [float(p) for p in fit['scipy_params']], 'mean': float(fit['mean'])}
+
+
+def session_schedule(days, sessions_per_day=None, start_day='Monday'):
+    """One row per session: Session_ID, Period_Type, Day_of_Week"""
+    first = DAYS.index(start_day)
+    rows = []
+    for day in range(days):
+        name = DAYS[(first + day) % 7]
+        weekend = name in ('Saturday', 'Sunday')
+        periods = [WEEKEND_PERIOD] * len(WEEKDAY_PERIODS) if weekend else list(WEEKDAY_PERIODS)
+        if sessions_per_day is not None:
+            periods = [periods[i % len(periods)] for i in range(sessions_per_day)]
+        for period in periods:
+            rows.append({'Session_ID': len(rows) + 1, 'Period_Type': period, 'Day_of_Week': name})
+    return pd.DataFrame(rows)
+
+
+def quantize(values, resolution):
+    """Round to the annotation resolution (and drop float noise such as 3.8000000000000003)"""
+    if not resolution:
+        return values
+    return np.round(np.round(values / resolution) * resolution, 6)
+
+
+def sample_arrivals(fit, sessions, duration, rng, rate_scale=1.0, resolution=0.1):
+    """
+    Arrival and inter-arrival times for one entity in a batch of sessions
+
+    Returns (session_index, arrival_times, inter_arrival_times) as flat
+    arrays in session-then-time order.
+    """
+    dist = getattr(stats, fit['scipy_name'])
+    params = tuple(fit['scipy_params'])
+    mean_gap = float(dist.mean(*params)) / rate_scale
+    expected = duration / mean_gap
+
+    # Enough draws that nearly every session passes the end; top up the rest
+    draws = int(expected + 5 * np.sqrt(expected) + 10)
+    gaps = np.maximum(dist.rvs(*params, size=(sessions, draws), random_state=rng), 0) / rate_scale
+    times = np.cumsum(gaps, axis=1)
+    while (times[:, -1] <= duration).any():
+        extra = np.maximum(dist.rvs(*params, size=(sessions, draws), random_state=rng), 0) / rate_scale
+        times = np.hstack([times, times[:, -1:] + np.cumsum(extra, axis=1)])
+
+    times = quantize(times, resolution)
+    inter = quantize(np.diff(times, axis=1, prepend=0.0), resolution)
+    inter[:, 0] = 0.0
+
+    keep = times <= duration
+    session_index = np.nonzero(keep)[0]
+    return session_index, times[keep], inter[keep]
+
+
+def sample_service(fit, size, rng, resolution=0.1):
+    """Service times for `size` arrivals (NaN when the entity has no service fit)"""
+    if fit is None:
+        return np.full(size, np.nan)
+    dist = getattr(stats, fit['scipy_name'])
+    values = np.maximum(dist.rvs(*fit['scipy_params'], size=size, random_state=rng), 0)
+    return quantize(values, resolution)
+
+
+def generate_batch(spec, schedule, duration, rng, first_id=1, rate_scale=1.0, resolution=0.1):
+    """Canonical events for a batch of sessions (one row of `schedule` each)"""
+    sessions = len(schedule)
+    parts = []
+    for order, (entity, entry) in enumerate(spec.items()):
+        session_index, arrival, inter = sample_arrivals(entry['arrival'], sessions, duration, rng,
+                                                        rate_scale, resolution)
+        service = sample_service(entry.get('service'), len(arrival), rng, resolution)
+        parts.append((session_index, arrival, inter, service, np.full(len(arrival), order)))
+
+    session_index, arrival, inter, service, entity_code = (np.concatenate(col) for col in zip(*parts))
+    order = np.lexsort((entity_code, arrival, session_index))
+
+    entities = list(spec)
+    df = pd.DataFrame({
+        'ID': np.arange(first_id, first_id + len(order), dtype=np.int64),
+        'Session_ID': schedule['Session_ID'].to_numpy()[session_index[order]],
+        'Period_Type': schedule['Period_Type'].to_numpy()[session_index[order]],
+        'Day_of_Week': schedule['Day_of_Week'].to_numpy()[session_index[order]],
+        'Arrival_Time': arrival[order],
+        'Entity_Type': pd.Categorical.from_codes(entity_code[order], entities),
+        'Direction': pd.Categorical(np.array([spec[e]['direction'] for e in entities])[entity_code[order]]),
+        'Inter_Arrival_Time': inter[order],
+        'Service_Time': service[order]
+    })
+    return df
+
+
+def write_csv_batch(df, output_file, header):
+    """Append one batch to the CSV in export format ('-' where no service time)"""
+    df = df.rename(columns=EXPORT_COLUMNS)
+    df.to_csv(output_file, index=False, header=header, mode='w' if header else 'a', na_rep='-')
+
+
+def generate(spec, days, output_file=None, dataset=None, session_hours=1.5, sessions_per_day=None,
+             seed=42, rate_scale=1.0, resolution=0.1, start_day='Monday'):
+    """
+    Generate and write synthetic sessions in batches
+
+    Returns summary statistics: sessions, rows, entity_counts, seconds.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    duration = session_hours * 3600
+    schedule = session_schedule(days, sessions_per_day, start_day)
+
+    rows_per_session = sum(duration * rate_scale / getattr(stats, e['arrival']['scipy_name']).mean(
+        *e['arrival']['scipy_params']) for e in spec.values())
+    batch_sessions = max(1, int(BATCH_ROWS / max(rows_per_session, 1)))
+
+    summary = {'sessions': len(schedule), 'rows': 0, 'entity_counts': {}}
+    # A Feather file keeps one dictionary per category column, so every batch
+    # gets the categories of the whole run
+    categories = {col: pd.Categorical(schedule[col]).categories
+                  for col in ('Session_ID', 'Period_Type', 'Day_of_Week')}
+    categories['Entity_Type'] = list(spec)
+    categories['Direction'] = sorted({entry['direction'] for entry in spec.values()})
+
+    feather_file = output_file if output_file and output_file.endswith('.feather') else None
+    with contextlib.ExitStack() as stack:
+        writer = stack.enter_context(EventFileWriter(feather_file)) if feather_file else None
+        for start in range(0, len(schedule), batch_sessions):
+            batch = generate_batch(spec, schedule.iloc[start:start + batch_sessions], duration, rng,
+                                   summary['rows'] + 1, rate_scale, resolution)
+
+            if writer is not None:
+                canonical = to_canonical(batch)
+                for col, values in categories.items():
+                    canonical[col] = canonical[col].cat.set_categories(values)
+                writer.write(canonical)
+            elif output_file:
+                write_csv_batch(batch, output_file, header=(start == 0))
+            if dataset:
+                write_dataset(to_canonical(batch), dataset)
+
+            summary['rows'] += len(batch)
+            for entity, count in batch['Entity_Type'].value_counts(sort=False).items():
+                summary['entity_counts'][entity] = summary['entity_counts'].get(entity, 0) + int(count)
+            print(f"  ✓ Sessions {start + 1}-{min(start + batch_sessions, len(schedule))}: "
+                  f"{summary['rows']:,} rows so far")
+
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+
+def main():
+    """Main function with CLI"""
+    parser = argparse.ArgumentParser(
+        description='Synthetic Arrival Generator - Large multi-session event files from fitted distributions',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # A month of sessions fitted to the real 90-minute session
+  python synthetic_arrivals.py --days 30 -o synthetic_sessions.csv
+
+  # Fit once, keep the spec, reuse it
+  python synthetic_arrivals.py --fit-from combined_results.csv --save-spec fits.json
+  python synthetic_arrivals.py --spec fits.json --days 90 -o synthetic_sessions.feather
+
+  # Tens of millions of rows: a year at 50x the observed rates, streamed to a dataset
+  python synthetic_arrivals.py --spec fits.json --days 365 --rate-scale 50 --dataset synthetic_dataset
+        """
+    )
+    parser.add_argument('--spec', type=str, default=None,
+                       help='JSON distribution spec (from --save-spec)')
+    parser.add_argument('--fit-from', type=str, default='combined_results.csv',
+                       help='Fit distributions from this event file when no --spec is given')
+    parser.add_argument('--save-spec', type=str, default=None,
+                       help='Write the fitted spec as JSON')
+    parser.add_argument('--output', '-o', type=str, default=None,
+                       help='Output file (.csv in export format, or .feather)')
+    parser.add_argument('--dataset', type=str, default=None,
+                       help='Also write a partitioned dataset directory')
+    parser.add_argument('--days', type=int, default=30, help='Days of sessions (default: 30)')
+    parser.add_argument('--sessions-per-day', type=int, default=None,
+                       help='Sessions per day (default: the 3 study windows)')
+    parser.add_argument('--session-hours', type=float, default=1.5,
+                       help='Length of each session in hours (default: 1.5)')
+    parser.add_argument('--rate-scale', type=float, default=1.0,
+                       help='Multiply all arrival rates (default: 1.0)')
+    parser.add_argument('--resolution', type=float, default=0.1,
+                       help='Round times to this many seconds, 0 for none (default: 0.1)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+
+    args = parser.parse_args()
+
+    print("="*70)
+    print("SYNTHETIC ARRIVAL GENERATOR")
+    print("="*70)
+
+    if args.spec:
+        with open(args.spec, 'r', encoding='utf-8') as f:
+            spec = json.load(f)
+        print(f"\n✓ Loaded distribution spec for {len(spec)} entity types from {args.spec}")
+    else:
+        print(f"\nFitting distributions to {args.fit_from}...")
+        spec = fit_spec(args.fit_from)
+
+    if args.save_spec:
+        with open(args.save_spec, 'w', encoding='utf-8') as f:
+            json.dump(spec, f, indent=2)
+        print(f"✓ Spec saved to {args.save_spec}")
+
+    if not args.output and not args.dataset:
+        if args.save_spec:
+            return
+        args.output = 'synthetic_sessions.csv'
+
+    if args.output and Path(args.output).exists():
+        Path(args.output).unlink()
+
+    print(f"\nGenerating {args.days} days of {args.session_hours}h sessions (seed {args.seed})...")
+    summary = generate(spec, args.days, args.output, args.dataset, args.session_hours,
+                       args.sessions_per_day, args.seed, args.rate_scale, args.resolution)
+
+    print("\n" + "="*70)
+    print(f"✓ {summary['rows']:,} events in {summary['sessions']} sessions "
+          f"({summary['seconds']:.1f}s, {summary['rows'] / max(summary['seconds'], 1e-9):,.0f} rows/s)")
+    print("="*70)
+    for entity, count in summary['entity_counts'].items():
+        print(f"  {entity}: {count:,}")
+    if args.output:
+        print(f"\nOutput file: {args.output}")
+    if args.dataset:
+        print(f"Dataset: {args.dataset}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,8 @@ from scipy.optimize import minimize
 import sys
 import io
 
+from event_store import load_events
+
 # UTF-8 encoding for Windows
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
@@ -512,15 +514,9 @@ def multivariate_taylor_analysis():
 
 def load_data(filepath='combined_results.csv'):
     """Load traffic data"""
-    try:
-        df = pd.read_csv(filepath)
-    except:
-        df = pd.read_excel(filepath)
-
-    if 'Time (s)' in df.columns:
-        df = df.rename(columns={'Time (s)': 'Arrival_Time', 'Entity': 'Entity_Type'})
-
-    return df
+    # Service_Time is left out so the calibrated default service rates are kept
+    return load_events(filepath, columns=['ID', 'Arrival_Time', 'Entity_Type',
+                                          'Direction', 'Inter_Arrival_Time'])
 
 
 def extract_entity_stats(df, entity_name):
@@ -5,12 +5,21 @@ Complete implementation for analyzing SIMUL8 traffic simulation data
 
 import pandas as pd
 import numpy as np
+from figure_renderer import FigureJob, render_figures  # selects the headless backend before pyplot
 import matplotlib.pyplot as plt
 import seaborn as sns
 from dataclasses import dataclass, asdict
 from typing import Dict, List, Tuple, Optional
 import json
+import argparse
 from datetime import datetime
+from functools import cached_property
+from pathlib import Path
+
+from concurrent.futures import ProcessPoolExecutor
+
+from event_store import load_events, iter_events, EXPORT_COLUMNS, DEFAULT_CHUNKSIZE
+from result_cache import ResultCache
 
 # Set plotting style
 sns.set_style("whitegrid")
@@ -38,6 +47,22 @@ class CostParameters:
     emission_cost_per_vehicle_minute: float = 0.1
     safety_incident_cost: float = 5000.0
 
+    # Modelling assumptions
+    vehicle_share: float = 0.7          # share of arrivals that are vehicles
+    amortization_years: float = 10.0    # infrastructure write-off period
+
+# Default uncertainty for Monte Carlo cost analysis: name -> (numpy Generator method, *args)
+DEFAULT_COST_UNCERTAINTY = {
+    'vehicle_time_value': ('triangular', 10.0, 15.0, 25.0),
+    'pedestrian_time_value': ('triangular', 5.0, 8.0, 14.0),
+    'congestion_cost_per_minute': ('uniform', 0.25, 1.0),
+    'emission_cost_per_vehicle_minute': ('lognormal', np.log(0.1), 0.3),
+    'maintenance_cost_per_year': ('normal', 36500.0, 3650.0),
+    'electricity_cost_per_year': ('normal', 9125.0, 1500.0),
+    'vehicle_share': ('uniform', 0.6, 0.8),
+    'amortization_years': ('triangular', 7.0, 10.0, 15.0)
+}
+
 @dataclass
 class TimeMetrics:
     """Comprehensive time-related performance metrics"""
@@ -85,21 +110,8 @@ class TrafficDataLoader:
     @staticmethod
     def load_data(filepath: str) -> pd.DataFrame:
         """Load CSV data with preprocessing"""
-        df = pd.read_csv(filepath)
-
-        # Convert Service Time to numeric (handle '-' values)
-        if 'Service Time (s)' in df.columns:
-            df['Service Time (s)'] = pd.to_numeric(
-                df['Service Time (s)'].replace('-', np.nan),
-                errors='coerce'
-            )
-
-        # Convert Inter-Arrival to numeric
-        if 'Inter-Arrival (s)' in df.columns:
-            df['Inter-Arrival (s)'] = pd.to_numeric(
-                df['Inter-Arrival (s)'],
-                errors='coerce'
-            )
+        # Canonical store, presented with the export headers this module uses
+        df = load_events(filepath).rename(columns=EXPORT_COLUMNS)
 
         # Sort by time
         if 'Time (s)' in df.columns:
@@ -107,6 +119,13 @@ class TrafficDataLoader:
 
         return df
 
+    @staticmethod
+    def iter_chunks(filepath: str, chunksize: int = DEFAULT_CHUNKSIZE):
+        """Yield the columns the time analysis needs, chunk by chunk, with export headers"""
+        columns = ['Arrival_Time', 'Entity_Type', 'Inter_Arrival_Time', 'Service_Time', 'Period_Type']
+        for chunk in iter_events(filepath, columns, chunksize):
+            yield chunk.rename(columns=EXPORT_COLUMNS)
+
     @staticmethod
     def separate_entity_types(df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
         """Separate data by entity type"""
@@ -118,101 +137,234 @@ class TrafficDataLoader:
 
         return entity_data
 
+def inter_arrival_histogram(data: pd.DataFrame, bins: int = 30) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """(counts, edges) of the inter-arrival times, or None if there are none"""
+    if 'Inter-Arrival (s)' not in data.columns:
+        return None
+    values = data['Inter-Arrival (s)'].dropna().to_numpy()
+    return np.histogram(values, bins=bins) if len(values) > 0 else None
+
+def summarize_events(paths: List[str], stream: bool = False, chunksize: int = DEFAULT_CHUNKSIZE,
+                     workers: Optional[int] = None) -> Dict[str, object]:
+    """Everything the report needs from event files, small enough to cache
+
+    Returns {'aggregates', 'inter_arrival_hist'}: the TrafficTimeAnalyzer
+    partial aggregates and the inter-arrival histogram (None when
+    streaming, which never holds all inter-arrival times at once).
+    """
+    paths = [str(path) for path in paths]
+    if stream:
+        analyzer = TrafficTimeAnalyzer.from_files(paths, chunksize, workers)
+        return {'aggregates': analyzer.aggregates, 'inter_arrival_hist': None}
+
+    frames = [TrafficDataLoader.load_data(path) for path in paths]
+    data = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    return {'aggregates': TrafficTimeAnalyzer.aggregate(data), 'inter_arrival_hist': inter_arrival_histogram(data)}
+
+VEHICLE_ENTITIES = ['EB Vehicles', 'WB Vehicles']
+PEDESTRIAN_ENTITIES = ['Crossers', 'Posers']
+
 class TrafficTimeAnalyzer:
-    """Analyze time-related metrics from simulation data"""
+    """Analyze time-related metrics from simulation data
 
-    def __init__(self, data: pd.DataFrame):
+    All metrics are derived from one table of per (period, entity) partial
+    aggregates, built by a single groupby pass over the data; system,
+    period and entity figures are roll-ups of its rows. Tables from
+    separate chunks, files or processes merge exactly, so the analyzer
+    can also be built by streaming files too large to load (from_files).
+    """
+
+    def __init__(self, data: Optional[pd.DataFrame] = None, aggregates: Optional[pd.DataFrame] = None):
         self.data = data
-        self.entity_data = TrafficDataLoader.separate_entity_types(data)
+        self.aggregates = self.aggregate(data) if aggregates is None else aggregates
         self.metrics = None
 
-    def calculate_comprehensive_metrics(self) -> TimeMetrics:
-        """Calculate all time-related metrics"""
-
-        # Separate vehicles and pedestrians
-        vehicles = pd.concat([
-            self.entity_data.get('EB Vehicles', pd.DataFrame()),
-            self.entity_data.get('WB Vehicles', pd.DataFrame())
-        ]) if len(self.entity_data) > 0 else pd.DataFrame()
-
-        pedestrians = pd.concat([
-            self.entity_data.get('Crossers', pd.DataFrame()),
-            self.entity_data.get('Posers', pd.DataFrame())
-        ]) if len(self.entity_data) > 0 else pd.DataFrame()
-
-        # Calculate wait times (using inter-arrival as proxy)
-        avg_vehicle_wait = vehicles['Inter-Arrival (s)'].mean() if len(vehicles) > 0 else 0.0
-        avg_ped_wait = pedestrians['Inter-Arrival (s)'].mean() if len(pedestrians) > 0 else 0.0
-
-        # Calculate service times
-        avg_service = self.data['Service Time (s)'].mean()
-        max_service = self.data['Service Time (s)'].max()
-
-        # Calculate throughput
-        if 'Time (s)' in self.data.columns and len(self.data) > 0:
-            duration = self.data['Time (s)'].max() - self.data['Time (s)'].min()
-            throughput = len(self.data) / (duration / 3600) if duration > 0 else 0.0
+        if data is not None:
+            self.has_periods = 'Period_Type' in data.columns
+            self.has_entities = 'Entity' in data.columns
         else:
-            duration = 0.0
-            throughput = 0.0
+            self.has_periods = bool(self.aggregates['Period_Type'].notna().any())
+            self.has_entities = bool((self.aggregates['Entity'] != '').any())
+
+    @classmethod
+    def from_files(cls, filepaths: List[str], chunksize: int = DEFAULT_CHUNKSIZE,
+                   workers: Optional[int] = None) -> 'TrafficTimeAnalyzer':
+        """Analyzer over event files streamed in chunks (files aggregated in parallel)"""
+        if len(filepaths) == 1 or workers == 1:
+            tables = [cls.aggregate_file(path, chunksize) for path in filepaths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                tables = list(pool.map(cls.aggregate_file, filepaths, [chunksize] * len(filepaths)))
+        return cls(aggregates=cls.merge_aggregates(tables))
+
+    @classmethod
+    def aggregate_file(cls, filepath: str, chunksize: int = DEFAULT_CHUNKSIZE) -> pd.DataFrame:
+        """Partial aggregates of one event file, read chunk by chunk"""
+        table = None
+        for chunk in TrafficDataLoader.iter_chunks(filepath, chunksize):
+            partial = cls.aggregate(chunk)
+            table = partial if table is None else cls.merge_aggregates([table, partial])
+        if table is None:
+            raise ValueError(f"No events in {filepath}")
+        return table
 
-        # Calculate utilization
-        total_service_time = self.data['Service Time (s)'].sum()
-        utilization = (total_service_time / duration) if duration > 0 else 0.0
+    @staticmethod
+    def merge_aggregates(tables: List[pd.DataFrame]) -> pd.DataFrame:
+        """Combine partial aggregate tables (from chunks, files or processes) into one
+
+        Counts, sums, minima and maxima add up directly; inter-arrival
+        mean/M2 are pooled with the parallel-variance formula.
+        """
+        combined = pd.concat(tables, ignore_index=True)
+        keys = ['Period_Type', 'Entity']
+        weighted = combined['IAT_Count'] * combined['IAT_Mean'].fillna(0.0)
+        groups = combined.assign(_IAT_Total=weighted).groupby(keys, sort=False, dropna=False)
+
+        merged = groups.agg(
+            Count=('Count', 'sum'),
+            IAT_Count=('IAT_Count', 'sum'),
+            _IAT_Total=('_IAT_Total', 'sum'),
+            IAT_Min=('IAT_Min', 'min'),
+            IAT_Max=('IAT_Max', 'max'),
+            Service_Count=('Service_Count', 'sum'),
+            Service_Sum=('Service_Sum', 'sum'),
+            Service_Max=('Service_Max', 'max'),
+            Time_Min=('Time_Min', 'min'),
+            Time_Max=('Time_Max', 'max')
+        )
+        merged['IAT_Mean'] = merged['_IAT_Total'] / merged['IAT_Count'].where(merged['IAT_Count'] > 0)
 
-        # Peak period analysis (if Session_ID or Period_Type available)
-        peak_utilization = self._calculate_peak_utilization()
+        pooled_mean = merged['IAT_Mean'].reindex(pd.MultiIndex.from_frame(combined[keys])).to_numpy()
+        spread = combined['IAT_M2'] + combined['IAT_Count'] * (combined['IAT_Mean'] - pooled_mean) ** 2
+        merged['IAT_M2'] = spread.fillna(0.0).groupby([combined[k] for k in keys], sort=False, dropna=False).sum()
 
-        # Inter-arrival statistics
-        min_inter = self.data['Inter-Arrival (s)'].min()
-        max_inter = self.data['Inter-Arrival (s)'].max()
-        max_queue = max_inter  # Simplified
+        columns = ['Count', 'IAT_Count', 'IAT_Mean', 'IAT_Min', 'IAT_Max', 'Service_Count',
+                   'Service_Sum', 'Service_Max', 'Time_Min', 'Time_Max', 'IAT_M2']
+        return merged[columns].reset_index()
+
+    @staticmethod
+    def aggregate(data: pd.DataFrame) -> pd.DataFrame:
+        """Per (period, entity) partial aggregates in one groupby pass
+
+        Inter-arrival spread is kept as count/mean/M2 (sum of squared
+        deviations) so groups can be combined exactly.
+        """
+        keys = [col for col in ['Period_Type', 'Entity'] if col in data.columns]
+        if not keys:
+            keys = ['Entity']
+            data = data.assign(Entity='')
+
+        table = data.groupby(keys, observed=True, sort=False, dropna=False).agg(
+            Count=('Time (s)', 'size'),
+            IAT_Count=('Inter-Arrival (s)', 'count'),
+            IAT_Mean=('Inter-Arrival (s)', 'mean'),
+            IAT_Var=('Inter-Arrival (s)', 'var'),
+            IAT_Min=('Inter-Arrival (s)', 'min'),
+            IAT_Max=('Inter-Arrival (s)', 'max'),
+            Service_Count=('Service Time (s)', 'count'),
+            Service_Sum=('Service Time (s)', 'sum'),
+            Service_Max=('Service Time (s)', 'max'),
+            Time_Min=('Time (s)', 'min'),
+            Time_Max=('Time (s)', 'max')
+        ).reset_index()
+
+        table['IAT_M2'] = (table.pop('IAT_Var') * (table['IAT_Count'] - 1)).fillna(0.0)
+        if 'Period_Type' not in table.columns:
+            table.insert(0, 'Period_Type', None)
+        for col in ['Period_Type', 'Entity']:
+            table[col] = table[col].astype(object)
+        return table
+
+    @staticmethod
+    def rollup(rows: pd.DataFrame) -> Dict[str, float]:
+        """Combine partial aggregates into one group's statistics"""
+        count = int(rows['Count'].sum())
+        iat_count = rows['IAT_Count'].sum()
+        has_iat = rows['IAT_Count'] > 0
+        iat_weight = rows['IAT_Count'][has_iat]
+        iat_mean = (iat_weight * rows['IAT_Mean'][has_iat]).sum() / iat_count if iat_count else np.nan
+        iat_m2 = (rows['IAT_M2'][has_iat] + iat_weight * (rows['IAT_Mean'][has_iat] - iat_mean) ** 2).sum()
+        service_count = rows['Service_Count'].sum()
+        service_sum = rows['Service_Sum'].sum()
+        duration = rows['Time_Max'].max() - rows['Time_Min'].min() if count else 0.0
+
+        return {
+            'count': count,
+            'iat_mean': iat_mean,
+            'iat_std': np.sqrt(iat_m2 / (iat_count - 1)) if iat_count > 1 else np.nan,
+            'iat_min': rows['IAT_Min'].min(),
+            'iat_max': rows['IAT_Max'].max(),
+            'service_mean': service_sum / service_count if service_count else np.nan,
+            'service_sum': service_sum,
+            'service_max': rows['Service_Max'].max(),
+            'duration': duration
+        }
+
+    def _wait(self, rows: pd.DataFrame, entities: List[str]) -> float:
+        """Mean inter-arrival (wait proxy) over the given entity types"""
+        subset = rows[rows['Entity'].isin(entities)]
+        return self.rollup(subset)['iat_mean'] if subset['Count'].sum() > 0 else 0.0
+
+    def _period_metrics(self, rows: pd.DataFrame) -> Dict[str, float]:
+        """Wait, throughput and utilization for a set of aggregate rows"""
+        stats = self.rollup(rows)
+        duration = stats['duration']
+        return dict(stats,
+                    vehicle_wait=self._wait(rows, VEHICLE_ENTITIES),
+                    pedestrian_wait=self._wait(rows, PEDESTRIAN_ENTITIES),
+                    throughput=stats['count'] / (duration / 3600) if duration > 0 else 0.0,
+                    utilization=stats['service_sum'] / duration if duration > 0 else 0.0)
+
+    def calculate_comprehensive_metrics(self) -> TimeMetrics:
+        """Calculate all time-related metrics"""
+        overall = self._period_metrics(self.aggregates)
+
+        # Peak period analysis (if Period_Type available)
+        peak_utilization = self._calculate_peak_utilization()
 
         self.metrics = TimeMetrics(
-            avg_vehicle_wait_time=avg_vehicle_wait,
-            avg_pedestrian_wait_time=avg_ped_wait,
-            max_queue_time=max_queue,
-            min_inter_arrival=min_inter,
-            max_inter_arrival=max_inter,
-            total_arrivals=len(self.data),
-            simulation_duration=duration,
-            throughput_per_hour=throughput,
-            system_utilization=min(utilization, 1.0),
+            avg_vehicle_wait_time=overall['vehicle_wait'],
+            avg_pedestrian_wait_time=overall['pedestrian_wait'],
+            max_queue_time=overall['iat_max'],  # Simplified
+            min_inter_arrival=overall['iat_min'],
+            max_inter_arrival=overall['iat_max'],
+            total_arrivals=overall['count'],
+            simulation_duration=overall['duration'],
+            throughput_per_hour=overall['throughput'],
+            system_utilization=min(overall['utilization'], 1.0),
             peak_period_utilization=peak_utilization,
-            avg_service_time=avg_service,
-            max_service_time=max_service
+            avg_service_time=overall['service_mean'],
+            max_service_time=overall['service_max']
         )
 
         return self.metrics
 
     def _calculate_peak_utilization(self) -> float:
         """Calculate utilization during peak periods"""
-        if 'Period_Type' in self.data.columns:
-            peak_data = self.data[self.data['Period_Type'].str.contains('Peak', na=False)]
-            if len(peak_data) > 0:
-                duration = peak_data['Time (s)'].max() - peak_data['Time (s)'].min()
-                service_time = peak_data['Service Time (s)'].sum()
-                return service_time / duration if duration > 0 else 0.0
+        periods = self.aggregates['Period_Type']
+        if periods.notna().any():
+            peak = self.aggregates[periods.astype(str).str.contains('Peak') & periods.notna()]
+            if len(peak) > 0:
+                stats = self.rollup(peak)
+                return stats['service_sum'] / stats['duration'] if stats['duration'] > 0 else 0.0
         return self.metrics.system_utilization if self.metrics else 0.0
 
     def analyze_by_period(self) -> Optional[pd.DataFrame]:
         """Analyze metrics by period type"""
-        if 'Period_Type' not in self.data.columns:
+        if not self.has_periods:
             return None
 
         results = []
-        for period in self.data['Period_Type'].unique():
-            period_data = self.data[self.data['Period_Type'] == period]
-            analyzer = TrafficTimeAnalyzer(period_data)
-            metrics = analyzer.calculate_comprehensive_metrics()
+        for period, rows in self.aggregates.groupby('Period_Type', sort=False):
+            metrics = self._period_metrics(rows)
 
             results.append({
                 'Period': period,
-                'Arrivals': metrics.total_arrivals,
-                'Avg_Vehicle_Wait': metrics.avg_vehicle_wait_time,
-                'Avg_Pedestrian_Wait': metrics.avg_pedestrian_wait_time,
-                'Throughput': metrics.throughput_per_hour,
-                'Utilization': metrics.system_utilization * 100
+                'Arrivals': metrics['count'],
+                'Avg_Vehicle_Wait': metrics['vehicle_wait'],
+                'Avg_Pedestrian_Wait': metrics['pedestrian_wait'],
+                'Throughput': metrics['throughput'],
+                'Utilization': min(metrics['utilization'], 1.0) * 100
             })
 
         return pd.DataFrame(results)
@@ -221,143 +373,167 @@ class TrafficTimeAnalyzer:
         """Analyze metrics by entity type"""
         results = []
 
-        for entity_name, entity_df in self.entity_data.items():
-            if len(entity_df) == 0:
+        if not self.has_entities:
+            return pd.DataFrame(results)
+
+        for entity_name, rows in self.aggregates.groupby('Entity', sort=False):
+            stats = self.rollup(rows)
+            if stats['count'] == 0:
                 continue
 
             results.append({
                 'Entity': entity_name,
-                'Count': len(entity_df),
-                'Avg_Inter_Arrival': entity_df['Inter-Arrival (s)'].mean(),
-                'Std_Inter_Arrival': entity_df['Inter-Arrival (s)'].std(),
-                'Avg_Service_Time': entity_df['Service Time (s)'].mean(),
-                'Max_Service_Time': entity_df['Service Time (s)'].max()
+                'Count': stats['count'],
+                'Avg_Inter_Arrival': stats['iat_mean'],
+                'Std_Inter_Arrival': stats['iat_std'],
+                'Avg_Service_Time': stats['service_mean'],
+                'Max_Service_Time': stats['service_max']
             })
 
         return pd.DataFrame(results)
 
+COST_COMPONENTS = ['infrastructure', 'operational', 'time_value', 'congestion', 'environmental']
+
 class TrafficCostAnalyzer:
-    """Analyze cost metrics from time data"""
+    """Analyze cost metrics from time data
+
+    Every cost component is one array expression (cost_components), so the
+    same code prices the single CostParameters case and whole batches of
+    scenarios: evaluate_scenarios() takes arrays of parameters and
+    monte_carlo() samples them and returns percentile bands.
+    """
 
     def __init__(self, time_metrics: TimeMetrics, cost_params: CostParameters):
         self.time_metrics = time_metrics
         self.cost_params = cost_params
 
-    def calculate_comprehensive_costs(self) -> CostMetrics:
-        """Calculate complete cost breakdown"""
+    def cost_components(self, params: Dict[str, object]) -> Dict[str, np.ndarray]:
+        """Daily cost of each component; params values may be scalars or arrays (broadcast)"""
+        p = {name: np.asarray(value, dtype=float) for name, value in params.items()}
+        tm = self.time_metrics
+        vehicle_share = p['vehicle_share']
+
+        # Infrastructure amortized over its write-off period
+        total_infrastructure = (p['traffic_light_cost'] * 2 + p['signage_cost'] * 4 +
+                                p['road_marking_cost'] * 2 + p['pedestrian_barrier_cost'] * 2)
+        infrastructure = total_infrastructure / p['amortization_years'] / 365
 
-        # Infrastructure (amortized daily)
-        infra_per_day = self._calculate_infrastructure_cost()
+        operational = (p['maintenance_cost_per_year'] + p['electricity_cost_per_year']) / 365
 
-        # Operational
-        ops_per_day = self._calculate_operational_cost()
+        # Value of time lost, scaled from the observed window to 24 hours
+        hours_simulated = tm.simulation_duration / 3600
+        daily_factor = 24 / hours_simulated if hours_simulated > 0 else 1
+        vehicle_time_cost = (tm.throughput_per_hour * vehicle_share *
+                             (tm.avg_vehicle_wait_time / 3600) * p['vehicle_time_value'] * hours_simulated)
+        ped_time_cost = (tm.throughput_per_hour * (1 - vehicle_share) *
+                         (tm.avg_pedestrian_wait_time / 3600) * p['pedestrian_time_value'] * hours_simulated)
+        time_value = (vehicle_time_cost + ped_time_cost) * daily_factor
 
-        # Time value
-        time_value_per_day = self._calculate_time_value_cost()
+        # Congestion externality per 100 arrivals
+        congestion = ((tm.max_queue_time / 60) * p['congestion_cost_per_minute'] *
+                      tm.throughput_per_hour * 24 / 100)
 
-        # Congestion
-        congestion_per_day = self._calculate_congestion_cost()
+        environmental = ((tm.avg_vehicle_wait_time / 60) * tm.throughput_per_hour * 24 *
+                         vehicle_share * p['emission_cost_per_vehicle_minute'])
 
-        # Environmental
-        env_per_day = self._calculate_environmental_cost()
+        return {'infrastructure': infrastructure, 'operational': operational, 'time_value': time_value,
+                'congestion': congestion, 'environmental': environmental}
 
-        # Total
-        total_per_day = (infra_per_day + ops_per_day + time_value_per_day +
-                        congestion_per_day + env_per_day)
+    def calculate_comprehensive_costs(self) -> CostMetrics:
+        """Calculate complete cost breakdown"""
+        daily = {name: float(value) for name, value in self.cost_components(asdict(self.cost_params)).items()}
+        total_per_day = sum(daily[name] for name in COST_COMPONENTS)
 
         # Annual projections
         return CostMetrics(
-            infrastructure_cost_per_day=infra_per_day,
-            operational_cost_per_day=ops_per_day,
-            time_value_cost_per_day=time_value_per_day,
-            congestion_cost_per_day=congestion_per_day,
-            environmental_cost_per_day=env_per_day,
+            infrastructure_cost_per_day=daily['infrastructure'],
+            operational_cost_per_day=daily['operational'],
+            time_value_cost_per_day=daily['time_value'],
+            congestion_cost_per_day=daily['congestion'],
+            environmental_cost_per_day=daily['environmental'],
             total_cost_per_day=total_per_day,
-            annual_infrastructure=infra_per_day * 365,
-            annual_operational=ops_per_day * 365,
-            annual_time_value=time_value_per_day * 365,
-            annual_congestion=congestion_per_day * 365,
-            annual_environmental=env_per_day * 365,
+            annual_infrastructure=daily['infrastructure'] * 365,
+            annual_operational=daily['operational'] * 365,
+            annual_time_value=daily['time_value'] * 365,
+            annual_congestion=daily['congestion'] * 365,
+            annual_environmental=daily['environmental'] * 365,
             annual_total=total_per_day * 365
         )
 
-    def _calculate_infrastructure_cost(self) -> float:
-        """Calculate amortized infrastructure cost per day"""
-        total_infrastructure = (
-            self.cost_params.traffic_light_cost * 2 +
-            self.cost_params.signage_cost * 4 +
-            self.cost_params.road_marking_cost * 2 +
-            self.cost_params.pedestrian_barrier_cost * 2
-        )
-
-        # Amortize over 10 years
-        annual_cost = total_infrastructure / 10
-        return annual_cost / 365
-
-    def _calculate_operational_cost(self) -> float:
-        """Calculate daily operational costs"""
-        return (self.cost_params.maintenance_cost_per_year +
-                self.cost_params.electricity_cost_per_year) / 365
-
-    def _calculate_time_value_cost(self) -> float:
-        """Calculate value of time lost"""
-        hours_simulated = self.time_metrics.simulation_duration / 3600
-
-        # Estimate vehicle and pedestrian proportions
-        vehicles_per_hour = self.time_metrics.throughput_per_hour * 0.7
-        pedestrians_per_hour = self.time_metrics.throughput_per_hour * 0.3
-
-        # Calculate time value costs
-        vehicle_time_cost = (
-            vehicles_per_hour *
-            (self.time_metrics.avg_vehicle_wait_time / 3600) *
-            self.cost_params.vehicle_time_value *
-            hours_simulated
-        )
-
-        ped_time_cost = (
-            pedestrians_per_hour *
-            (self.time_metrics.avg_pedestrian_wait_time / 3600) *
-            self.cost_params.pedestrian_time_value *
-            hours_simulated
-        )
-
-        # Convert to daily cost (scale to 24 hours)
-        daily_factor = 24 / hours_simulated if hours_simulated > 0 else 1
-        return (vehicle_time_cost + ped_time_cost) * daily_factor
-
-    def _calculate_congestion_cost(self) -> float:
-        """Calculate congestion externality cost"""
-        congestion_minutes = self.time_metrics.max_queue_time / 60
-        arrivals_per_day = self.time_metrics.throughput_per_hour * 24
-
-        return (congestion_minutes *
-                self.cost_params.congestion_cost_per_minute *
-                arrivals_per_day / 100)  # Per 100 arrivals
-
-    def _calculate_environmental_cost(self) -> float:
-        """Calculate environmental impact cost"""
-        vehicle_wait_minutes = self.time_metrics.avg_vehicle_wait_time / 60
-        vehicles_per_day = self.time_metrics.throughput_per_hour * 24 * 0.7
-
-        return (vehicle_wait_minutes *
-                vehicles_per_day *
-                self.cost_params.emission_cost_per_vehicle_minute)
+    def evaluate_scenarios(self, scenarios: Dict[str, object]) -> pd.DataFrame:
+        """Annual cost components for a batch of scenarios
+
+        scenarios maps CostParameters field names to arrays (one value per
+        scenario) or scalars; fields not given keep self.cost_params values.
+        Returns one row per scenario with annual_<component> and annual_total.
+        """
+        unknown = set(scenarios) - set(asdict(self.cost_params))
+        if unknown:
+            raise ValueError(f"Unknown cost parameters: {sorted(unknown)}")
+
+        params = dict(asdict(self.cost_params), **scenarios)
+        daily = self.cost_components(params)
+        size = np.broadcast(*[np.asarray(v) for v in params.values()]).shape or (1,)
+
+        annual = {f'annual_{name}': np.broadcast_to(daily[name] * 365, size) for name in COST_COMPONENTS}
+        annual['annual_total'] = sum(annual.values())
+        return pd.DataFrame(annual)
+
+    def sample_scenarios(self, n: int, distributions: Optional[Dict[str, Tuple]] = None,
+                         seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Draw n scenarios: name -> (numpy Generator method, *args), e.g. ('uniform', 10, 20)"""
+        rng = np.random.default_rng(seed)
+        distributions = DEFAULT_COST_UNCERTAINTY if distributions is None else distributions
+        samples = {name: getattr(rng, method)(*args, size=n) for name, (method, *args) in distributions.items()}
+        if 'vehicle_share' in samples:
+            samples['vehicle_share'] = np.clip(samples['vehicle_share'], 0.0, 1.0)
+        return samples
+
+    def monte_carlo(self, n: int = 100_000, distributions: Optional[Dict[str, Tuple]] = None,
+                    seed: Optional[int] = None,
+                    percentiles: Tuple[float, ...] = (5, 25, 50, 75, 95)) -> pd.DataFrame:
+        """Percentile bands of annual cost (per component and total) over n sampled scenarios"""
+        results = self.evaluate_scenarios(self.sample_scenarios(n, distributions, seed))
+        values = results.to_numpy()
+        bands = pd.DataFrame(np.percentile(values, percentiles, axis=0).T, index=results.columns,
+                             columns=[f'P{p:g}' for p in percentiles])
+        bands.insert(0, 'Mean', values.mean(axis=0))
+        bands.index.name = 'Component'
+        return bands
 
 class TrafficReportGenerator:
-    """Generate comprehensive analysis reports"""
+    """Generate comprehensive analysis reports
+
+    Metrics, period and entity tables are computed once and shared by the
+    text report, JSON export and figures.
+    """
 
-    def __init__(self, data: pd.DataFrame, cost_params: CostParameters):
+    def __init__(self, data: Optional[pd.DataFrame], cost_params: CostParameters,
+                 time_analyzer: Optional[TrafficTimeAnalyzer] = None,
+                 inter_arrival_hist: Optional[Tuple[np.ndarray, np.ndarray]] = None):
         self.data = data
         self.cost_params = cost_params
 
-        # Run analyses
-        self.time_analyzer = TrafficTimeAnalyzer(data)
+        # Run analyses (a streamed or cached analyzer can be passed in instead of data)
+        self.time_analyzer = time_analyzer or TrafficTimeAnalyzer(data)
         self.time_metrics = self.time_analyzer.calculate_comprehensive_metrics()
+        if inter_arrival_hist is None and data is not None:
+            inter_arrival_hist = inter_arrival_histogram(data)
+        self.inter_arrival_hist = inter_arrival_hist
 
         self.cost_analyzer = TrafficCostAnalyzer(self.time_metrics, cost_params)
         self.cost_metrics = self.cost_analyzer.calculate_comprehensive_costs()
 
+    @cached_property
+    def period_table(self) -> Optional[pd.DataFrame]:
+        """Per-period metrics (None without Period_Type)"""
+        return self.time_analyzer.analyze_by_period()
+
+    @cached_property
+    def entity_table(self) -> pd.DataFrame:
+        """Per-entity metrics"""
+        return self.time_analyzer.analyze_by_entity()
+
     def generate_text_report(self) -> str:
         """Generate formatted text report"""
         report = []
@@ -391,15 +567,14 @@ class TrafficReportGenerator:
         report.append(f"TOTAL ANNUAL COST: £{self.cost_metrics.annual_total:,.2f}")
 
         # Period analysis
-        if 'Period_Type' in self.data.columns:
-            period_df = self.time_analyzer.analyze_by_period()
-            if period_df is not None:
-                report.append("\n" + "ANALYSIS BY PERIOD TYPE")
-                report.append("-" * 80)
-                report.append(period_df.to_string(index=False))
+        period_df = self.period_table
+        if period_df is not None:
+            report.append("\n" + "ANALYSIS BY PERIOD TYPE")
+            report.append("-" * 80)
+            report.append(period_df.to_string(index=False))
 
         # Entity analysis
-        entity_df = self.time_analyzer.analyze_by_entity()
+        entity_df = self.entity_table
         if len(entity_df) > 0:
             report.append("\n" + "ANALYSIS BY ENTITY TYPE")
             report.append("-" * 80)
@@ -428,167 +603,244 @@ class TrafficReportGenerator:
             json.dump(metrics_dict, f, indent=2)
         print(f"Metrics exported to: {filename}")
 
-    def create_visualizations(self, output_dir: str = "."):
-        """Create comprehensive visualizations"""
-
-        # Figure 1: Time metrics
-        fig1, axes = plt.subplots(2, 2, figsize=(15, 12))
-
-        # Wait time comparison
-        wait_data = {
-            'Vehicles': self.time_metrics.avg_vehicle_wait_time,
-            'Pedestrians': self.time_metrics.avg_pedestrian_wait_time
-        }
-        axes[0, 0].bar(wait_data.keys(), wait_data.values(), color=['#1f77b4', '#ff7f0e'])
-        axes[0, 0].set_title('Average Wait Time by Type', fontsize=14, fontweight='bold')
-        axes[0, 0].set_ylabel('Wait Time (seconds)')
-        axes[0, 0].grid(axis='y', alpha=0.3)
-
-        # Throughput
-        axes[0, 1].bar(['Throughput'], [self.time_metrics.throughput_per_hour],
-                      color='#2ca02c', width=0.5)
-        axes[0, 1].set_title('System Throughput', fontsize=14, fontweight='bold')
-        axes[0, 1].set_ylabel('Entities per Hour')
-        axes[0, 1].grid(axis='y', alpha=0.3)
-
-        # Utilization
-        util_data = {
-            'Overall': self.time_metrics.system_utilization * 100,
-            'Peak Period': self.time_metrics.peak_period_utilization * 100
-        }
-        axes[1, 0].bar(util_data.keys(), util_data.values(), color=['#d62728', '#9467bd'])
-        axes[1, 0].set_title('System Utilization', fontsize=14, fontweight='bold')
-        axes[1, 0].set_ylabel('Utilization (%)')
-        axes[1, 0].set_ylim([0, 100])
-        axes[1, 0].axhline(y=80, color='r', linestyle='--', label='Target (80%)')
-        axes[1, 0].legend()
-        axes[1, 0].grid(axis='y', alpha=0.3)
-
-        # Inter-arrival distribution
-        if len(self.data) > 0:
-            axes[1, 1].hist(self.data['Inter-Arrival (s)'].dropna(), bins=30,
-                           color='#8c564b', edgecolor='black', alpha=0.7)
-            axes[1, 1].set_title('Inter-Arrival Time Distribution', fontsize=14, fontweight='bold')
-            axes[1, 1].set_xlabel('Inter-Arrival Time (seconds)')
-            axes[1, 1].set_ylabel('Frequency')
-            axes[1, 1].grid(axis='y', alpha=0.3)
-
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/time_analysis.png', dpi=300, bbox_inches='tight')
-        print(f"Time analysis visualization saved to: {output_dir}/time_analysis.png")
-        plt.close()
-
-        # Figure 2: Cost breakdown
-        fig2, axes = plt.subplots(1, 2, figsize=(15, 6))
-
-        # Daily costs
-        cost_categories = ['Infrastructure', 'Operational', 'Time Value', 'Congestion', 'Environmental']
-        daily_costs = [
-            self.cost_metrics.infrastructure_cost_per_day,
-            self.cost_metrics.operational_cost_per_day,
-            self.cost_metrics.time_value_cost_per_day,
-            self.cost_metrics.congestion_cost_per_day,
-            self.cost_metrics.environmental_cost_per_day
-        ]
+    def create_visualizations(self, output_dir: str = ".", preview: Optional[bool] = None):
+        """Create comprehensive visualizations (rendered in parallel, unchanged figures skipped)"""
+        # Without a histogram (streamed data) the figure falls back to per-entity means
+        entity_df = self.entity_table if self.inter_arrival_hist is None else None
 
-        colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
-        axes[0].pie(daily_costs, labels=cost_categories, autopct='%1.1f%%',
-                   colors=colors, startangle=90)
-        axes[0].set_title('Daily Cost Breakdown', fontsize=14, fontweight='bold')
-
-        # Annual costs bar chart
-        annual_costs = [
-            self.cost_metrics.annual_infrastructure,
-            self.cost_metrics.annual_operational,
-            self.cost_metrics.annual_time_value,
-            self.cost_metrics.annual_congestion,
-            self.cost_metrics.annual_environmental
+        jobs = [
+            FigureJob(draw_time_analysis, f'{output_dir}/time_analysis.png',
+                      (self.time_metrics, self.inter_arrival_hist, entity_df), dpi=300),
+            FigureJob(draw_cost_analysis, f'{output_dir}/cost_analysis.png', (self.cost_metrics,), dpi=300)
         ]
-
-        axes[1].barh(cost_categories, annual_costs, color=colors)
-        axes[1].set_title('Annual Cost Breakdown', fontsize=14, fontweight='bold')
-        axes[1].set_xlabel('Annual Cost (£)')
-        axes[1].grid(axis='x', alpha=0.3)
-
-        # Add value labels
-        for i, v in enumerate(annual_costs):
-            axes[1].text(v, i, f' £{v:,.0f}', va='center')
-
-        plt.tight_layout()
-        plt.savefig(f'{output_dir}/cost_analysis.png', dpi=300, bbox_inches='tight')
-        print(f"Cost analysis visualization saved to: {output_dir}/cost_analysis.png")
-        plt.close()
-
-        # Figure 3: Period comparison (if available)
-        if 'Period_Type' in self.data.columns:
-            period_df = self.time_analyzer.analyze_by_period()
-            if period_df is not None and len(period_df) > 0:
-                fig3, axes = plt.subplots(2, 2, figsize=(15, 12))
-
-                # Arrivals by period
-                axes[0, 0].bar(period_df['Period'], period_df['Arrivals'])
-                axes[0, 0].set_title('Arrivals by Period', fontsize=14, fontweight='bold')
-                axes[0, 0].set_ylabel('Total Arrivals')
-                axes[0, 0].tick_params(axis='x', rotation=45)
-                axes[0, 0].grid(axis='y', alpha=0.3)
-
-                # Throughput by period
-                axes[0, 1].bar(period_df['Period'], period_df['Throughput'], color='#2ca02c')
-                axes[0, 1].set_title('Throughput by Period', fontsize=14, fontweight='bold')
-                axes[0, 1].set_ylabel('Entities per Hour')
-                axes[0, 1].tick_params(axis='x', rotation=45)
-                axes[0, 1].grid(axis='y', alpha=0.3)
-
-                # Wait times by period
-                x = np.arange(len(period_df))
-                width = 0.35
-                axes[1, 0].bar(x - width/2, period_df['Avg_Vehicle_Wait'], width,
-                             label='Vehicles', color='#1f77b4')
-                axes[1, 0].bar(x + width/2, period_df['Avg_Pedestrian_Wait'], width,
-                             label='Pedestrians', color='#ff7f0e')
-                axes[1, 0].set_title('Wait Times by Period', fontsize=14, fontweight='bold')
-                axes[1, 0].set_ylabel('Wait Time (seconds)')
-                axes[1, 0].set_xticks(x)
-                axes[1, 0].set_xticklabels(period_df['Period'], rotation=45)
-                axes[1, 0].legend()
-                axes[1, 0].grid(axis='y', alpha=0.3)
-
-                # Utilization by period
-                axes[1, 1].bar(period_df['Period'], period_df['Utilization'], color='#d62728')
-                axes[1, 1].set_title('Utilization by Period', fontsize=14, fontweight='bold')
-                axes[1, 1].set_ylabel('Utilization (%)')
-                axes[1, 1].tick_params(axis='x', rotation=45)
-                axes[1, 1].axhline(y=80, color='black', linestyle='--', label='Target (80%)')
-                axes[1, 1].legend()
-                axes[1, 1].grid(axis='y', alpha=0.3)
-
-                plt.tight_layout()
-                plt.savefig(f'{output_dir}/period_comparison.png', dpi=300, bbox_inches='tight')
-                print(f"Period comparison saved to: {output_dir}/period_comparison.png")
-                plt.close()
+        labels = ['Time analysis visualization', 'Cost analysis visualization']
+
+        # Period comparison (if available)
+        period_df = self.period_table
+        if period_df is not None and len(period_df) > 0:
+            jobs.append(FigureJob(draw_period_comparison, f'{output_dir}/period_comparison.png',
+                                  (period_df,), dpi=300))
+            labels.append('Period comparison')
+
+        status = render_figures(jobs, preview=preview)
+        for label, job in zip(labels, jobs):
+            if status[job.output_file] == 'cached':
+                print(f"{label} unchanged, kept: {job.output_file}")
+            else:
+                print(f"{label} saved to: {job.output_file}")
+
+def draw_time_analysis(time_metrics: TimeMetrics, inter_arrival_hist: Optional[Tuple[np.ndarray, np.ndarray]],
+                       entity_df: Optional[pd.DataFrame]):
+    """Figure 1: Time metrics"""
+    fig1, axes = plt.subplots(2, 2, figsize=(15, 12))
+
+    # Wait time comparison
+    wait_data = {
+        'Vehicles': time_metrics.avg_vehicle_wait_time,
+        'Pedestrians': time_metrics.avg_pedestrian_wait_time
+    }
+    axes[0, 0].bar(wait_data.keys(), wait_data.values(), color=['#1f77b4', '#ff7f0e'])
+    axes[0, 0].set_title('Average Wait Time by Type', fontsize=14, fontweight='bold')
+    axes[0, 0].set_ylabel('Wait Time (seconds)')
+    axes[0, 0].grid(axis='y', alpha=0.3)
+
+    # Throughput
+    axes[0, 1].bar(['Throughput'], [time_metrics.throughput_per_hour],
+                  color='#2ca02c', width=0.5)
+    axes[0, 1].set_title('System Throughput', fontsize=14, fontweight='bold')
+    axes[0, 1].set_ylabel('Entities per Hour')
+    axes[0, 1].grid(axis='y', alpha=0.3)
+
+    # Utilization
+    util_data = {
+        'Overall': time_metrics.system_utilization * 100,
+        'Peak Period': time_metrics.peak_period_utilization * 100
+    }
+    axes[1, 0].bar(util_data.keys(), util_data.values(), color=['#d62728', '#9467bd'])
+    axes[1, 0].set_title('System Utilization', fontsize=14, fontweight='bold')
+    axes[1, 0].set_ylabel('Utilization (%)')
+    axes[1, 0].set_ylim([0, 100])
+    axes[1, 0].axhline(y=80, color='r', linestyle='--', label='Target (80%)')
+    axes[1, 0].legend()
+    axes[1, 0].grid(axis='y', alpha=0.3)
+
+    # Inter-arrival distribution
+    if inter_arrival_hist is not None:
+        counts, edges = inter_arrival_hist
+        axes[1, 1].hist(edges[:-1], bins=edges, weights=counts,
+                       color='#8c564b', edgecolor='black', alpha=0.7)
+        axes[1, 1].set_title('Inter-Arrival Time Distribution', fontsize=14, fontweight='bold')
+        axes[1, 1].set_xlabel('Inter-Arrival Time (seconds)')
+        axes[1, 1].set_ylabel('Frequency')
+        axes[1, 1].grid(axis='y', alpha=0.3)
+    elif entity_df is not None and len(entity_df) > 0:
+        # Streamed: only the aggregates are available
+        axes[1, 1].bar(entity_df['Entity'], entity_df['Avg_Inter_Arrival'],
+                      yerr=entity_df['Std_Inter_Arrival'], color='#8c564b',
+                      edgecolor='black', alpha=0.7, capsize=5)
+        axes[1, 1].set_title('Inter-Arrival Time by Entity (mean ± std)', fontsize=14, fontweight='bold')
+        axes[1, 1].set_ylabel('Inter-Arrival Time (seconds)')
+        axes[1, 1].tick_params(axis='x', rotation=45)
+        axes[1, 1].grid(axis='y', alpha=0.3)
+
+    plt.tight_layout()
+    return fig1
+
+def draw_cost_analysis(cost_metrics: CostMetrics):
+    """Figure 2: Cost breakdown"""
+    fig2, axes = plt.subplots(1, 2, figsize=(15, 6))
+
+    # Daily costs
+    cost_categories = ['Infrastructure', 'Operational', 'Time Value', 'Congestion', 'Environmental']
+    daily_costs = [
+        cost_metrics.infrastructure_cost_per_day,
+        cost_metrics.operational_cost_per_day,
+        cost_metrics.time_value_cost_per_day,
+        cost_metrics.congestion_cost_per_day,
+        cost_metrics.environmental_cost_per_day
+    ]
+
+    colors = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd']
+    axes[0].pie(daily_costs, labels=cost_categories, autopct='%1.1f%%',
+               colors=colors, startangle=90)
+    axes[0].set_title('Daily Cost Breakdown', fontsize=14, fontweight='bold')
+
+    # Annual costs bar chart
+    annual_costs = [
+        cost_metrics.annual_infrastructure,
+        cost_metrics.annual_operational,
+        cost_metrics.annual_time_value,
+        cost_metrics.annual_congestion,
+        cost_metrics.annual_environmental
+    ]
+
+    axes[1].barh(cost_categories, annual_costs, color=colors)
+    axes[1].set_title('Annual Cost Breakdown', fontsize=14, fontweight='bold')
+    axes[1].set_xlabel('Annual Cost (£)')
+    axes[1].grid(axis='x', alpha=0.3)
+
+    # Add value labels
+    for i, v in enumerate(annual_costs):
+        axes[1].text(v, i, f' £{v:,.0f}', va='center')
+
+    plt.tight_layout()
+    return fig2
+
+def draw_period_comparison(period_df: pd.DataFrame):
+    """Figure 3: Period comparison"""
+    fig3, axes = plt.subplots(2, 2, figsize=(15, 12))
+
+    # Arrivals by period
+    axes[0, 0].bar(period_df['Period'], period_df['Arrivals'])
+    axes[0, 0].set_title('Arrivals by Period', fontsize=14, fontweight='bold')
+    axes[0, 0].set_ylabel('Total Arrivals')
+    axes[0, 0].tick_params(axis='x', rotation=45)
+    axes[0, 0].grid(axis='y', alpha=0.3)
+
+    # Throughput by period
+    axes[0, 1].bar(period_df['Period'], period_df['Throughput'], color='#2ca02c')
+    axes[0, 1].set_title('Throughput by Period', fontsize=14, fontweight='bold')
+    axes[0, 1].set_ylabel('Entities per Hour')
+    axes[0, 1].tick_params(axis='x', rotation=45)
+    axes[0, 1].grid(axis='y', alpha=0.3)
+
+    # Wait times by period
+    x = np.arange(len(period_df))
+    width = 0.35
+    axes[1, 0].bar(x - width/2, period_df['Avg_Vehicle_Wait'], width,
+                 label='Vehicles', color='#1f77b4')
+    axes[1, 0].bar(x + width/2, period_df['Avg_Pedestrian_Wait'], width,
+                 label='Pedestrians', color='#ff7f0e')
+    axes[1, 0].set_title('Wait Times by Period', fontsize=14, fontweight='bold')
+    axes[1, 0].set_ylabel('Wait Time (seconds)')
+    axes[1, 0].set_xticks(x)
+    axes[1, 0].set_xticklabels(period_df['Period'], rotation=45)
+    axes[1, 0].legend()
+    axes[1, 0].grid(axis='y', alpha=0.3)
+
+    # Utilization by period
+    axes[1, 1].bar(period_df['Period'], period_df['Utilization'], color='#d62728')
+    axes[1, 1].set_title('Utilization by Period', fontsize=14, fontweight='bold')
+    axes[1, 1].set_ylabel('Utilization (%)')
+    axes[1, 1].tick_params(axis='x', rotation=45)
+    axes[1, 1].axhline(y=80, color='black', linestyle='--', label='Target (80%)')
+    axes[1, 1].legend()
+    axes[1, 1].grid(axis='y', alpha=0.3)
+
+    plt.tight_layout()
+    return fig3
 
 def main():
     """Main execution function"""
+    parser = argparse.ArgumentParser(
+        description='Traffic Time & Cost Analysis System',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Analyze all_sessions_combined.csv
+  python traffic_analyzer.py
+
+  # Stream event files too large for memory, one worker process per file
+  python traffic_analyzer.py --stream study_2024.csv study_2025.csv --workers 2
+
+  # Annual cost uncertainty over 100,000 sampled cost assumptions
+  python traffic_analyzer.py --monte-carlo 100000
+
+  # Quick low-DPI figures while iterating on the report
+  python traffic_analyzer.py --preview
+
+  # Keep results on disk: reruns on unchanged files skip loading and aggregation
+  python traffic_analyzer.py --cache-dir .metrics_cache
+        """
+    )
+    parser.add_argument('files', nargs='*', default=['all_sessions_combined.csv'],
+                       help='Event files or dataset directories (default: all_sessions_combined.csv)')
+    parser.add_argument('--stream', action='store_true',
+                       help='Read files in chunks and merge partial aggregates instead of loading them')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                       help=f'Rows per chunk when streaming (default: {DEFAULT_CHUNKSIZE})')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Processes for streaming several files (default: CPU count)')
+    parser.add_argument('--monte-carlo', type=int, default=0, metavar='N',
+                       help='Also sample N cost scenarios and save annual cost percentile bands')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for --monte-carlo')
+    parser.add_argument('--preview', action='store_true',
+                       help='Render low-DPI preview figures (fast, for iterating on the report)')
+    parser.add_argument('--cache-dir', type=str, default=None,
+                       help='Store analysis results here and reuse them while the input files are unchanged '
+                            '(default: $METRICS_CACHE_DIR, else no on-disk cache)')
+    args = parser.parse_args()
+
     print("=" * 80)
     print("TRAFFIC TIME & COST ANALYSIS SYSTEM")
     print("=" * 80)
 
-    # Load data
+    # Load data (files are keyed by path, size and mtime, so a cached summary skips loading)
     print("\nLoading data...")
+    cache = ResultCache(args.cache_dir)
     try:
-        data = TrafficDataLoader.load_data('all_sessions_combined.csv')
-        print(f"Loaded {len(data)} records")
-    except FileNotFoundError:
-        print("Error: all_sessions_combined.csv not found")
+        summary = cache.get_or_compute('traffic.summary', summarize_events, [Path(p) for p in args.files],
+                                       stream=args.stream, chunksize=args.chunksize, workers=args.workers)
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
         print("Please ensure your simulation data is in the current directory")
         return
 
+    time_analyzer = TrafficTimeAnalyzer(aggregates=summary['aggregates'])
+    records = int(time_analyzer.aggregates['Count'].sum())
+    if cache.hits:
+        print(f"Reusing cached analysis of {records} records from {cache.directory}")
+    elif args.stream:
+        print(f"Streamed {records} records from {len(args.files)} file(s)")
+    else:
+        print(f"Loaded {records} records")
+
     # Initialize cost parameters
     cost_params = CostParameters()
 
     # Generate report
     print("\nGenerating analysis report...")
-    reporter = TrafficReportGenerator(data, cost_params)
+    reporter = TrafficReportGenerator(None, cost_params, time_analyzer, summary['inter_arrival_hist'])
 
     # Print report to console
     print("\n" + reporter.generate_text_report())
@@ -598,9 +850,16 @@ def main():
     reporter.save_report("traffic_analysis_report.txt")
     reporter.export_metrics_json("traffic_metrics.json")
 
+    if args.monte_carlo:
+        bands = reporter.cost_analyzer.monte_carlo(args.monte_carlo, seed=args.seed)
+        print(f"\nAnnual cost uncertainty ({args.monte_carlo:,} scenarios):")
+        print(bands.to_string(float_format=lambda v: f"£{v:,.0f}"))
+        bands.to_csv("cost_uncertainty.csv")
+        print("Cost uncertainty bands saved to: cost_uncertainty.csv")
+
     # Create visualizations
     print("\nGenerating visualizations...")
-    reporter.create_visualizations()
+    reporter.create_visualizations(preview=args.preview or None)
 
     print("\n" + "=" * 80)
     print("ANALYSIS COMPLETE!")
@@ -610,8 +869,10 @@ def main():
     print("  - traffic_metrics.json")
     print("  - time_analysis.png")
     print("  - cost_analysis.png")
-    if 'Period_Type' in data.columns:
+    if reporter.time_analyzer.has_periods:
         print("  - period_comparison.png")
+    if args.monte_carlo:
+        print("  - cost_uncertainty.csv")
 
 if __name__ == "__main__":
-    main()
+    main()
\ No newline at end of file
@@ -13,6 +13,42 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 
 
+def match_times(manual_times, ml_times, tolerance):
+    """
+    One-to-one matching of two sets of event times within a tolerance
+
+    Both arrays are sorted once and walked with two pointers: the earliest
+    unmatched events are paired when they are within the tolerance,
+    otherwise the earlier of the two can no longer match anything and is
+    skipped. In one dimension this finds the largest possible set of pairs
+    in O(n + m) after sorting.
+
+    Returns (manual_idx, ml_idx): positions into the input arrays of the matched pairs.
+    """
+    manual_times = np.asarray(manual_times, dtype=float)
+    ml_times = np.asarray(ml_times, dtype=float)
+
+    manual_order = np.argsort(manual_times, kind='stable')
+    ml_order = np.argsort(ml_times, kind='stable')
+    a = manual_times[manual_order].tolist()
+    b = ml_times[ml_order].tolist()
+
+    matched_a, matched_b = [], []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i] + tolerance < b[j]:
+            i += 1
+        elif b[j] + tolerance < a[i]:
+            j += 1
+        else:
+            matched_a.append(i)
+            matched_b.append(j)
+            i += 1
+            j += 1
+
+    return manual_order[np.array(matched_a, dtype=int)], ml_order[np.array(matched_b, dtype=int)]
+
+
 class MLValidator:
     """Validates ML detection results against manual annotations"""
 
@@ -32,10 +68,75 @@ class MLValidator:
         self.manual = pd.read_csv(manual_csv)
         self.ml = pd.read_csv(ml_csv)
 
+        # Match table shared by every report method (built on first use)
+        self._match_table = None
+        self._match_tolerance = None
+
         print(f"  Manual annotations: {len(self.manual)} entries")
         print(f"  ML detections: {len(self.ml)} entries")
         print(f"  Time tolerance: ±{time_tolerance}s\n")
 
+    def match_events(self):
+        """
+        Match manual and ML events one-to-one per entity type (cached)
+
+        Returns a DataFrame with one row per event: matched pairs have both
+        Manual_* and ML_* columns, missed manual events have no ML_* values
+        and false positives have no Manual_* values.
+        """
+        if self._match_table is not None and self._match_tolerance == self.time_tolerance:
+            return self._match_table
+
+        rows = []
+        entities = sorted(set(self.manual['Entity'].unique()) | set(self.ml['Entity'].unique()))
+
+        for entity in entities:
+            manual_entity = self.manual[self.manual['Entity'] == entity]
+            ml_entity = self.ml[self.ml['Entity'] == entity]
+
+            manual_times = manual_entity['Time (s)'].to_numpy(dtype=float)
+            ml_times = ml_entity['Time (s)'].to_numpy(dtype=float)
+            manual_ids = manual_entity['ID'].to_numpy()
+            ml_ids = ml_entity['ID'].to_numpy()
+
+            manual_idx, ml_idx = match_times(manual_times, ml_times, self.time_tolerance)
+
+            unmatched_manual = np.setdiff1d(np.arange(len(manual_times)), manual_idx)
+            unmatched_ml = np.setdiff1d(np.arange(len(ml_times)), ml_idx)
+
+            rows.append(pd.DataFrame({
+                'Entity': entity,
+                'Manual_ID': manual_ids[manual_idx],
+                'Manual_Time': manual_times[manual_idx],
+                'ML_ID': ml_ids[ml_idx],
+                'ML_Time': ml_times[ml_idx]
+            }))
+            rows.append(pd.DataFrame({
+                'Entity': entity,
+                'Manual_ID': manual_ids[unmatched_manual],
+                'Manual_Time': manual_times[unmatched_manual]
+            }))
+            rows.append(pd.DataFrame({
+                'Entity': entity,
+                'ML_ID': ml_ids[unmatched_ml],
+                'ML_Time': ml_times[unmatched_ml]
+            }))
+
+        columns = ['Entity', 'Manual_ID', 'Manual_Time', 'ML_ID', 'ML_Time']
+        rows = [r for r in rows if len(r) > 0]
+        table = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=columns)
+        table = table.reindex(columns=columns)
+        table['Error'] = table['ML_Time'] - table['Manual_Time']
+
+        self._match_table = table
+        self._match_tolerance = self.time_tolerance
+        return table
+
+    def _matched(self):
+        """Rows of the match table that are matched pairs"""
+        table = self.match_events()
+        return table[table['Manual_Time'].notna() & table['ML_Time'].notna()]
+
     def compare_counts(self):
         """Compare total counts by entity type"""
         print("="*70)
@@ -79,51 +180,28 @@ class MLValidator:
         print("\n" + "="*70)
         print("TEMPORAL PRECISION & RECALL")
         print("="*70)
-        print(f"Matching criterion: Events within ±{self.time_tolerance}s of same entity type")
+        print(f"Matching criterion: Events within ±{self.time_tolerance}s of same entity type "
+              f"(one-to-one)")
         print()
 
         results = {}
 
-        for entity in self.manual['Entity'].unique():
-            manual_entity = self.manual[self.manual['Entity'] == entity]
-            ml_entity = self.ml[self.ml['Entity'] == entity]
-
-            # Calculate matches
-            matched_manual = 0
-            matched_ml = 0
-            matched_pairs = []
-
-            # For each manual entry, find ML match
-            for _, manual_row in manual_entity.iterrows():
-                manual_time = manual_row['Time (s)']
-
-                # Find ML detections within tolerance
-                matches = ml_entity[
-                    abs(ml_entity['Time (s)'] - manual_time) <= self.time_tolerance
-                ]
-
-                if len(matches) > 0:
-                    matched_manual += 1
-                    # Take closest match
-                    closest_match = matches.iloc[
-                        (matches['Time (s)'] - manual_time).abs().argmin()
-                    ]
-                    matched_pairs.append((manual_time, closest_match['Time (s)']))
-
-            # For each ML entry, check if it has a manual match
-            for _, ml_row in ml_entity.iterrows():
-                ml_time = ml_row['Time (s)']
+        matched = self._matched()
+        manual_counts = self.manual['Entity'].value_counts()
+        ml_counts = self.ml['Entity'].value_counts()
+        matched_counts = matched['Entity'].value_counts()
 
-                matches = manual_entity[
-                    abs(manual_entity['Time (s)'] - ml_time) <= self.time_tolerance
-                ]
+        for entity in self.manual['Entity'].unique():
+            manual_count = int(manual_counts.get(entity, 0))
+            ml_count = int(ml_counts.get(entity, 0))
+            matched_count = int(matched_counts.get(entity, 0))
 
-                if len(matches) > 0:
-                    matched_ml += 1
+            entity_pairs = matched[matched['Entity'] == entity].sort_values('Manual_Time')
+            matched_pairs = list(zip(entity_pairs['Manual_Time'], entity_pairs['ML_Time']))
 
             # Calculate metrics
-            recall = (matched_manual / len(manual_entity) * 100) if len(manual_entity) > 0 else 0
-            precision = (matched_ml / len(ml_entity) * 100) if len(ml_entity) > 0 else 0
+            recall = (matched_count / manual_count * 100) if manual_count > 0 else 0
+            precision = (matched_count / ml_count * 100) if ml_count > 0 else 0
 
             if precision + recall > 0:
                 f1_score = 2 * (precision * recall) / (precision + recall)
@@ -131,10 +209,10 @@ class MLValidator:
                 f1_score = 0
 
             results[entity] = {
-                'manual_count': len(manual_entity),
-                'ml_count': len(ml_entity),
-                'matched_manual': matched_manual,
-                'matched_ml': matched_ml,
+                'manual_count': manual_count,
+                'ml_count': ml_count,
+                'matched_manual': matched_count,
+                'matched_ml': matched_count,
                 'recall': recall,
                 'precision': precision,
                 'f1_score': f1_score,
@@ -182,31 +260,12 @@ class MLValidator:
         print("TIMING ERROR ANALYSIS")
         print("="*70)
 
-        all_errors = []
+        matched = self._matched()
 
         for entity in self.manual['Entity'].unique():
-            manual_entity = self.manual[self.manual['Entity'] == entity]
-            ml_entity = self.ml[self.ml['Entity'] == entity]
-
-            entity_errors = []
+            entity_errors = matched.loc[matched['Entity'] == entity, 'Error'].to_numpy()
 
-            for _, manual_row in manual_entity.iterrows():
-                manual_time = manual_row['Time (s)']
-
-                # Find closest ML match
-                matches = ml_entity[
-                    abs(ml_entity['Time (s)'] - manual_time) <= self.time_tolerance
-                ]
-
-                if len(matches) > 0:
-                    closest_match = matches.iloc[
-                        (matches['Time (s)'] - manual_time).abs().argmin()
-                    ]
-                    error = closest_match['Time (s)'] - manual_time
-                    entity_errors.append(error)
-                    all_errors.append(error)
-
-            if entity_errors:
+            if len(entity_errors) > 0:
                 mean_error = np.mean(entity_errors)
                 std_error = np.std(entity_errors)
                 abs_mean_error = np.mean(np.abs(entity_errors))
@@ -217,6 +276,9 @@ class MLValidator:
                 print(f"  Mean absolute error: {abs_mean_error:.3f}s")
                 print(f"  Samples:             {len(entity_errors)}")
 
+        all_errors = matched.loc[matched['Entity'].isin(self.manual['Entity'].unique()),
+                                 'Error'].tolist()
+
         if all_errors:
             print(f"\nOverall:")
             print(f"  Mean error:          {np.mean(all_errors):+.3f}s")
@@ -234,26 +296,13 @@ class MLValidator:
         print("MISSING DETECTIONS (Manual events not detected by ML)")
         print("="*70)
 
-        missing = []
-
-        for entity in self.manual['Entity'].unique():
-            manual_entity = self.manual[self.manual['Entity'] == entity]
-            ml_entity = self.ml[self.ml['Entity'] == entity]
-
-            for _, manual_row in manual_entity.iterrows():
-                manual_time = manual_row['Time (s)']
-
-                # Check if ML detected this
-                matches = ml_entity[
-                    abs(ml_entity['Time (s)'] - manual_time) <= self.time_tolerance
-                ]
-
-                if len(matches) == 0:
-                    missing.append({
-                        'Entity': entity,
-                        'Time (s)': manual_time,
-                        'ID': manual_row['ID']
-                    })
+        table = self.match_events()
+        missing_rows = table[table['Manual_Time'].notna() & table['ML_Time'].isna()]
+        missing = [
+            {'Entity': entity, 'Time (s)': time_s, 'ID': event_id}
+            for entity, time_s, event_id in zip(missing_rows['Entity'], missing_rows['Manual_Time'],
+                                                missing_rows['Manual_ID'])
+        ]
 
         if missing:
             print(f"\nFound {len(missing)} missing detections:\n")
@@ -272,26 +321,13 @@ class MLValidator:
         print("FALSE POSITIVES (ML detections with no manual match)")
         print("="*70)
 
-        false_positives = []
-
-        for entity in self.ml['Entity'].unique():
-            ml_entity = self.ml[self.ml['Entity'] == entity]
-            manual_entity = self.manual[self.manual['Entity'] == entity]
-
-            for _, ml_row in ml_entity.iterrows():
-                ml_time = ml_row['Time (s)']
-
-                # Check if manual has this
-                matches = manual_entity[
-                    abs(manual_entity['Time (s)'] - ml_time) <= self.time_tolerance
-                ]
-
-                if len(matches) == 0:
-                    false_positives.append({
-                        'Entity': entity,
-                        'Time (s)': ml_time,
-                        'ID': ml_row['ID']
-                    })
+        table = self.match_events()
+        fp_rows = table[table['ML_Time'].notna() & table['Manual_Time'].isna()]
+        false_positives = [
+            {'Entity': entity, 'Time (s)': time_s, 'ID': event_id}
+            for entity, time_s, event_id in zip(fp_rows['Entity'], fp_rows['ML_Time'],
+                                                fp_rows['ML_ID'])
+        ]
 
         if false_positives:
             print(f"\nFound {len(false_positives)} false positives:\n")
@@ -304,6 +340,83 @@ class MLValidator:
 
         return false_positives
 
+    def tolerance_sweep(self, tolerances):
+        """
+        Precision, recall and F1 over a grid of tolerances in one pass
+
+        Closest-first matching at tolerance t accepts exactly the pairs that
+        matching at the largest tolerance accepts with distance <= t, so one
+        matching plus a sorted array of matched distances gives every grid
+        point with a single searchsorted.
+
+        Returns a tidy DataFrame (one row per entity and tolerance, plus OVERALL).
+        """
+        tolerances = np.sort(np.asarray(tolerances, dtype=float))
+        max_tolerance = tolerances[-1]
+
+        rows = []
+        all_distances = []
+        entities = sorted(self.manual['Entity'].unique())
+
+        for entity in entities:
+            manual_times = self.manual.loc[self.manual['Entity'] == entity, 'Time (s)'].to_numpy(dtype=float)
+            ml_times = self.ml.loc[self.ml['Entity'] == entity, 'Time (s)'].to_numpy(dtype=float)
+
+            manual_idx, ml_idx = match_times(manual_times, ml_times, max_tolerance)
+            distances = np.sort(np.abs(ml_times[ml_idx] - manual_times[manual_idx]))
+            all_distances.append(distances)
+
+            rows.append(self._sweep_rows(entity, tolerances, distances,
+                                         len(manual_times), len(ml_times)))
+
+        total_ml = int(self.ml['Entity'].isin(entities).sum())
+        rows.append(self._sweep_rows('OVERALL', tolerances, np.sort(np.concatenate(all_distances)),
+                                     len(self.manual), total_ml))
+
+        return pd.concat(rows, ignore_index=True)
+
+    @staticmethod
+    def _sweep_rows(entity, tolerances, sorted_distances, manual_count, ml_count):
+        """Curve rows for one entity from its sorted matched distances"""
+        matched = np.searchsorted(sorted_distances, tolerances, side='right')
+        recall = matched / manual_count * 100 if manual_count > 0 else np.zeros(len(tolerances))
+        precision = matched / ml_count * 100 if ml_count > 0 else np.zeros(len(tolerances))
+        denom = precision + recall
+        f1 = np.divide(2 * precision * recall, denom, out=np.zeros(len(tolerances)), where=denom > 0)
+
+        return pd.DataFrame({
+            'Entity': entity,
+            'Tolerance (s)': tolerances,
+            'Manual': manual_count,
+            'ML': ml_count,
+            'Matched': matched,
+            'Precision': precision,
+            'Recall': recall,
+            'F1': f1
+        })
+
+    @staticmethod
+    def plot_tolerance_sweep(sweep_df, output_path):
+        """Plot precision, recall and F1 curves per entity"""
+        fig, axes = plt.subplots(1, 3, figsize=(18, 5), sharey=True)
+        fig.suptitle('Precision / Recall vs Matching Tolerance', fontsize=14, fontweight='bold')
+
+        for ax, metric in zip(axes, ['Precision', 'Recall', 'F1']):
+            for entity, curve in sweep_df.groupby('Entity', sort=False):
+                style = 'k--' if entity == 'OVERALL' else '-'
+                ax.plot(curve['Tolerance (s)'], curve[metric], style, label=entity, linewidth=2)
+            ax.set_title(metric)
+            ax.set_xlabel('Tolerance (s)')
+            ax.grid(True, alpha=0.3)
+
+        axes[0].set_ylabel('Percent')
+        axes[0].set_ylim([0, 105])
+        axes[-1].legend()
+
+        plt.tight_layout()
+        plt.savefig(output_path, dpi=150, bbox_inches='tight')
+        plt.close()
+
     def generate_report(self, output_path=None):
         """Generate complete validation report"""
         print("\n" + "="*70)
@@ -375,6 +488,9 @@ Examples:
 
   # Save report to file
   python validate_ml.py manual.csv ml_results.csv --output report.txt
+
+  # Precision/recall curves for tolerances 0.1s to 5.0s in 0.1s steps
+  python validate_ml.py manual.csv ml_results.csv --sweep 0.1 5.0 0.1
         """
     )
 
@@ -384,6 +500,11 @@ Examples:
                        help='Time tolerance in seconds for matching (default: 1.0)')
     parser.add_argument('--output', '-o', type=str, default=None,
                        help='Output file path for report')
+    parser.add_argument('--sweep', type=float, nargs=3, default=None,
+                       metavar=('START', 'STOP', 'STEP'),
+                       help='Compute precision/recall curves over a tolerance grid')
+    parser.add_argument('--sweep-output', type=str, default='tolerance_sweep',
+                       help='Output prefix for sweep CSV and plot (default: tolerance_sweep)')
 
     args = parser.parse_args()
 
@@ -402,7 +523,23 @@ Examples:
     try:
         # Run validation
         validator = MLValidator(manual_path, ml_path, time_tolerance=args.tolerance)
-        validator.generate_report(output_path=args.output)
+
+        if args.sweep:
+            start, stop, step = args.sweep
+            tolerances = np.round(np.arange(start, stop + step / 2, step), 6)
+            sweep_df = validator.tolerance_sweep(tolerances)
+
+            csv_path = f"{args.sweep_output}.csv"
+            plot_path = f"{args.sweep_output}.png"
+            sweep_df.to_csv(csv_path, index=False)
+            MLValidator.plot_tolerance_sweep(sweep_df, plot_path)
+
+            best = sweep_df[sweep_df['Entity'] == 'OVERALL'].sort_values('F1').iloc[-1]
+            print(f"Tolerance sweep: {len(tolerances)} points from {tolerances[0]}s to {tolerances[-1]}s")
+            print(f"  Best overall F1: {best['F1']:.1f}% at ±{best['Tolerance (s)']}s")
+            print(f"✓ Curves saved to: {csv_path}, {plot_path}")
+        else:
+            validator.generate_report(output_path=args.output)
 
     except Exception as e:
         print(f"\nError during validation: {e}")
@@ -5,12 +5,15 @@ Incorporates distribution fitting, advanced queueing models, and variability pro
 
 import numpy as np
 import pandas as pd
+from figure_renderer import FigureJob, render_figures  # selects the headless backend before pyplot
 import matplotlib.pyplot as plt
 from scipy import stats
 from scipy.optimize import minimize
 import sys
 import io
 
+from event_store import load_events
+
 # UTF-8 encoding for Windows
 if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
@@ -254,8 +257,35 @@ def fit_distributions(data, data_name="Data"):
     return results, best_dist, data
 
 
-def plot_distribution_fit(data, fit_results, data_name="Data", filename=None):
-    """Create comprehensive visualization of distribution fits"""
+def print_render_status(status):
+    """Report which figures were rendered and which were unchanged"""
+    for filename, state in status.items():
+        if state == 'cached':
+            print(f"✓ Plot unchanged, kept '{filename}'")
+        else:
+            print(f"✓ Plot saved to '{filename}'")
+
+
+def plot_distribution_fit(data, fit_results, data_name="Data", filename=None, jobs=None):
+    """
+    Create comprehensive visualization of distribution fits
+
+    With a `jobs` list the figure is queued there for render_figures()
+    instead of being rendered now.
+    """
+    if not filename:
+        return
+
+    job = FigureJob(draw_distribution_fit, filename, (data, fit_results, data_name), dpi=150)
+    if jobs is not None:
+        jobs.append(job)
+        return
+    print()
+    print_render_status(render_figures([job]))
+
+
+def draw_distribution_fit(data, fit_results, data_name="Data"):
+    """Histogram/PDF, CDF, Q-Q and AIC panels for one set of fits"""
 
     fig, axes = plt.subplots(2, 2, figsize=(14, 10))
     fig.suptitle(f'Distribution Fitting: {data_name}', fontsize=14, fontweight='bold')
@@ -347,12 +377,7 @@ def plot_distribution_fit(data, fit_results, data_name="Data", filename=None):
         ax.text(i, aic + max(aics)*0.02, f'{aic:.0f}', ha='center', fontsize=9)
 
     plt.tight_layout()
-
-    if filename:
-        plt.savefig(filename, dpi=150, bbox_inches='tight')
-        print(f"\n✓ Plot saved to '{filename}'")
-
-    plt.close()
+    return fig
 
 
 # ============================================================================
@@ -517,10 +542,13 @@ def advanced_queueing_analysis(arrival_dist, service_dist, num_servers, name="Sy
 # PART 3: TIME-VARYING VARIABILITY ANALYSIS
 # ============================================================================
 
-def time_varying_variability(df, entity_type, window_minutes=5):
+def time_varying_variability(df, entity_type, window_minutes=5, jobs=None):
     """
     Analyze how variability changes over time
     Shows periods of high/low variability
+
+    With a `jobs` list the plot is queued there for render_figures()
+    instead of being rendered now.
     """
     print(f"\n{'='*70}")
     print(f"TIME-VARYING VARIABILITY ANALYSIS: {entity_type}")
@@ -607,7 +635,21 @@ def time_varying_variability(df, entity_type, window_minutes=5):
         print("  None")
 
     # Plot
-    plt.figure(figsize=(12, 6))
+    filename = f'time_varying_variability_{entity_type.replace(" ", "_")}.png'
+    job = FigureJob(draw_time_varying_variability, filename,
+                    (stats_df, entity_type, window_minutes, median_cv), dpi=150, bbox_inches=None)
+    if jobs is not None:
+        jobs.append(job)
+    else:
+        print()
+        print_render_status(render_figures([job]))
+
+    return stats_df
+
+
+def draw_time_varying_variability(stats_df, entity_type, window_minutes, median_cv):
+    """CV over time and arrivals per window for one entity type"""
+    fig = plt.figure(figsize=(12, 6))
 
     plt.subplot(2, 1, 1)
     plt.plot(stats_df['start_min'], stats_df['cv_ia'], 'bo-', label='CV (Inter-Arrival)')
@@ -629,12 +671,7 @@ def time_varying_variability(df, entity_type, window_minutes=5):
     plt.grid(True, alpha=0.3, axis='y')
 
     plt.tight_layout()
-    filename = f'time_varying_variability_{entity_type.replace(" ", "_")}.png'
-    plt.savefig(filename, dpi=150)
-    print(f"\n✓ Plot saved to '{filename}'")
-    plt.close()
-
-    return stats_df
+    return fig
 
 
 # ============================================================================
@@ -643,15 +680,9 @@ def time_varying_variability(df, entity_type, window_minutes=5):
 
 def load_data(filepath='combined_results.csv'):
     """Load traffic data"""
-    try:
-        df = pd.read_csv(filepath)
-    except:
-        df = pd.read_excel(filepath)
-
-    if 'Time (s)' in df.columns:
-        df = df.rename(columns={'Time (s)': 'Arrival_Time', 'Entity': 'Entity_Type'})
-
-    return df
+    # Arrival-side analysis only; service times are fitted elsewhere
+    return load_events(filepath, columns=['ID', 'Arrival_Time', 'Entity_Type',
+                                          'Direction', 'Inter_Arrival_Time'])
 
 
 def main():
@@ -667,6 +698,7 @@ def main():
     print(f"✓ Loaded {len(df)} entities")
 
     # Analyze each entity type
+    figure_jobs = []
     for entity_type in ['WB Vehicles', 'EB Vehicles', 'Crossers', 'Posers']:
         entity_df = df[df['Entity_Type'] == entity_type]
 
@@ -689,7 +721,8 @@ def main():
         # Plot fits
         plot_distribution_fit(ia_data, ia_results,
                             f"{entity_type} - Inter-Arrival Times",
-                            f"distribution_fit_{entity_type.replace(' ', '_')}_arrivals.png")
+                            f"distribution_fit_{entity_type.replace(' ', '_')}_arrivals.png",
+                            jobs=figure_jobs)
 
         # Fit distributions to service times (if available)
         if 'Service_Time' in entity_df.columns:
@@ -700,7 +733,8 @@ def main():
 
                 plot_distribution_fit(st_data, st_results,
                                     f"{entity_type} - Service Times",
-                                    f"distribution_fit_{entity_type.replace(' ', '_')}_service.png")
+                                    f"distribution_fit_{entity_type.replace(' ', '_')}_service.png",
+                                    jobs=figure_jobs)
             else:
                 st_best = {'distribution': 'Exponential', 'mean': 1.0, 'cv': 1.0}
         else:
@@ -711,7 +745,11 @@ def main():
         queue_results = advanced_queueing_analysis(ia_best, st_best, num_servers, entity_type)
 
         # Time-varying variability
-        time_var_stats = time_varying_variability(df, entity_type, window_minutes=5)
+        time_var_stats = time_varying_variability(df, entity_type, window_minutes=5, jobs=figure_jobs)
+
+    # All figures at once: rendered in parallel, unchanged ones skipped
+    print(f"\nRendering {len(figure_jobs)} figures...")
+    print_render_status(render_figures(figure_jobs))
 
     print(f"\n{'='*70}")
     print("ANALYSIS COMPLETE")
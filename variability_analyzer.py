@@ -8,12 +8,143 @@ to inform queueing theory-based resource planning.
 import pandas as pd
 import numpy as np
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import json
-from scipy import stats
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from scipy import optimize, special, stats
+from figure_renderer import FigureJob, render_figures  # selects the headless backend before pyplot
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from event_store import event_groups, is_dataset, load_events
+from result_cache import ResultCache, default_cache
+
+# Candidate inter-arrival distributions (loc fixed at 0: gaps start at zero)
+FIT_DISTRIBUTIONS = {
+    'Exponential': stats.expon,
+    'Gamma': stats.gamma,
+    'Lognormal': stats.lognorm,
+    'Weibull': stats.weibull_min
+}
+MIN_FIT_SAMPLES = 10
+PARALLEL_MIN_SAMPLES = 50_000  # Smaller workloads fit faster than a process pool starts
+
+
+def fit_candidate(name: str, data: np.ndarray) -> Tuple[tuple, float]:
+    """
+    Maximum-likelihood fit of one candidate with loc=0, plus its KS statistic
+
+    data must be sorted and positive. Exponential and lognormal MLEs are
+    closed form; gamma solves log(k) - digamma(k) = log(mean) - mean(log x)
+    by Newton's method from Minka's approximation; Weibull solves its
+    profile-likelihood equation for the shape, bracketed around the
+    moment estimate (CV ** -1.086). Returns (scipy params, KS statistic);
+    raises ValueError when the sample cannot be fitted.
+    """
+    log_x = np.log(data)
+    mean = data.mean()
+    if data[0] == data[-1]:
+        raise ValueError("all values equal")
+
+    if name == 'Exponential':
+        params = (0.0, mean)
+
+    elif name == 'Lognormal':
+        params = (log_x.std(), 0.0, np.exp(log_x.mean()))
+
+    elif name == 'Gamma':
+        s = np.log(mean) - log_x.mean()
+        k = (3 - s + np.sqrt((s - 3) ** 2 + 24 * s)) / (12 * s)
+        for _ in range(50):
+            step = (np.log(k) - special.digamma(k) - s) / (1 / k - special.polygamma(1, k))
+            k = k - step if k - step > 0 else k / 2
+            if abs(step) < 1e-12 * k:
+                break
+        params = (k, 0.0, mean / k)
+
+    elif name == 'Weibull':
+        def score(k):
+            weights = np.exp(k * log_x - (k * log_x).max())
+            return (weights * log_x).sum() / weights.sum() - 1 / k - log_x.mean()
+
+        low = high = (data.std() / mean) ** -1.086
+        while score(low) > 0 and low > 1e-3:
+            low /= 2
+        while score(high) < 0 and high < 1e3:
+            high *= 2
+        if not score(low) <= 0 <= score(high):
+            raise ValueError("no Weibull shape in [0.001, 1000]")
+        k = optimize.brentq(score, low, high, xtol=1e-12)
+        log_scale = (np.log(np.mean(np.exp(k * log_x - (k * log_x).max()))) + (k * log_x).max()) / k
+        params = (k, 0.0, np.exp(log_scale))
+
+    else:
+        raise ValueError(f"unknown distribution {name}")
+
+    if not np.all(np.isfinite(params)):
+        raise ValueError(f"non-finite parameters {params}")
+
+    cdf = FIT_DISTRIBUTIONS[name].cdf(data, *params)
+    n = len(data)
+    ks_stat = max((np.arange(1, n + 1) / n - cdf).max(), (cdf - np.arange(n) / n).max())
+    if not np.isfinite(ks_stat):
+        raise ValueError("KS statistic is not finite")
+    return tuple(float(p) for p in params), float(ks_stat)
+
+
+def _fit_task(task: Tuple[str, str, np.ndarray]) -> Tuple[str, str, Optional[tuple], object]:
+    """(group, candidate) fit for the worker pool: failures come back as messages"""
+    key, name, data = task
+    try:
+        params, ks_stat = fit_candidate(name, data)
+        return key, name, params, ks_stat
+    except (ValueError, ArithmeticError, RuntimeError) as e:
+        return key, name, None, str(e)
+
+
+def fit_groups(samples: Dict[str, np.ndarray], workers: Optional[int] = None) -> Dict[str, Tuple[str, Dict]]:
+    """
+    Best-fitting distribution (lowest KS statistic) for every sample
+
+    Every (sample, candidate) pair is one task; large workloads run on a
+    process pool. Zero gaps are dropped (they have no density with loc=0).
+    Returns {key: (best name, {'params', 'ks_stat', 'failed'})}, where
+    failed maps each candidate that could not be fitted to the reason.
+    """
+    results, tasks = {}, []
+    for key, data in samples.items():
+        data = np.sort(data[data > 0])
+        if len(data) < MIN_FIT_SAMPLES:
+            results[key] = ("Insufficient data", {})
+            continue
+        tasks.extend((key, name, data) for name in FIT_DISTRIBUTIONS)
+
+    workers = workers or os.cpu_count() or 1
+    total = sum(len(data) for _, _, data in tasks)
+    if workers > 1 and total >= PARALLEL_MIN_SAMPLES:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(_fit_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    else:
+        outcomes = [_fit_task(task) for task in tasks]
+
+    fits = {}
+    for key, name, params, outcome in outcomes:
+        fit = fits.setdefault(key, {'best': None, 'ks_stat': np.inf, 'params': None, 'failed': {}})
+        if params is None:
+            fit['failed'][name] = outcome
+        elif outcome < fit['ks_stat']:
+            fit.update(best=name, ks_stat=outcome, params=params)
+
+    for key, fit in fits.items():
+        details = {'params': fit['params'], 'ks_stat': fit['ks_stat']} if fit['best'] else {}
+        if fit['failed']:
+            details['failed'] = fit['failed']
+        results[key] = (fit['best'] or "Unknown", details)
+    return results
+
+
 @dataclass
 class VariabilityMetrics:
     """Metrics describing arrival pattern variability"""
@@ -45,38 +176,59 @@ class VariabilityMetrics:
 class VariabilityAnalyzer:
     """Analyzes variability in traffic arrival and service patterns"""
 
-    def __init__(self, data: pd.DataFrame):
+    def __init__(self, data: pd.DataFrame, cache: Optional[ResultCache] = None, workers: Optional[int] = None):
         self.data = data
+        self.cache = cache or default_cache()
+        self.workers = workers
         self.results = {}
 
     def analyze_all(self) -> Dict[str, List[VariabilityMetrics]]:
-        """Analyze variability for all entity types and periods"""
+        """Analyze variability for all entity types and periods
+
+        Results are memoized on the data content (a dataset directory by its
+        files), so an unchanged input is not re-fitted; set METRICS_CACHE_DIR
+        to keep them across runs.
+        """
+        source = self.data if isinstance(self.data, pd.DataFrame) else Path(self.data)
+        self.results = self.cache.get_or_compute('variability.results', self._analyze_groups, source)
+        return self.results
+
+    def _analyze_groups(self, source) -> Dict[str, VariabilityMetrics]:
+        """Analyze every period/entity group of a DataFrame or dataset directory
+
+        Group statistics are computed as groups are read; distribution fits
+        for all groups then run together (in parallel when large).
+        """
         results = {}
+        samples = {}
 
         # Group by period type and entity type
-        if 'Period_Type' in self.data.columns:
-            groups = self.data.groupby(['Period_Type', 'Entity_Type'])
-        else:
-            groups = self.data.groupby('Entity_Type')
-
-        for group_key, group_data in groups:
+        # self.data may also be a partitioned dataset directory (read group by group)
+        for group_key, group_data in event_groups(source, columns=['Arrival_Time', 'Wait_Time']):
             if isinstance(group_key, tuple):
                 period_type, entity_type = group_key
             else:
                 period_type = 'All'
                 entity_type = group_key
 
-            metrics = self._analyze_group(group_data, entity_type, period_type)
+            metrics, inter_arrivals = self._analyze_group(group_data, entity_type, period_type)
 
             key = f"{period_type}_{entity_type}"
             results[key] = metrics
+            samples[key] = inter_arrivals
+
+        for key, (best_fit, params) in fit_groups(samples, self.workers).items():
+            results[key].best_fit_distribution = best_fit
+            results[key].distribution_params = params
 
-        self.results = results
         return results
 
     def _analyze_group(self, data: pd.DataFrame, entity_type: str,
-                       period_type: str) -> VariabilityMetrics:
-        """Analyze a single group of data"""
+                       period_type: str) -> Tuple[VariabilityMetrics, np.ndarray]:
+        """Analyze a single group of data (distribution fit left to fit_groups)
+
+        Returns the metrics and the group's inter-arrival times.
+        """
 
         # Calculate inter-arrival times
         data_sorted = data.sort_values('Arrival_Time')
@@ -103,9 +255,6 @@ class VariabilityAnalyzer:
         # Classify variability
         variability_class = self._classify_variability(cv_ia)
 
-        # Fit distribution
-        best_fit, params = self._fit_distribution(inter_arrivals.values)
-
         return VariabilityMetrics(
             entity_type=entity_type,
             period_type=period_type,
@@ -118,9 +267,9 @@ class VariabilityAnalyzer:
             std_service_time=std_service,
             cv_service_time=cv_service,
             variability_class=variability_class,
-            best_fit_distribution=best_fit,
-            distribution_params=params
-        )
+            best_fit_distribution="Not fitted",
+            distribution_params={}
+        ), inter_arrivals.to_numpy(dtype=float)
 
     def _classify_variability(self, cv: float) -> str:
         """Classify variability level based on CV"""
@@ -131,36 +280,6 @@ class VariabilityAnalyzer:
         else:
             return "High (Bursty arrivals)"
 
-    def _fit_distribution(self, data: np.ndarray) -> Tuple[str, Dict]:
-        """Fit common distributions and return best fit"""
-        if len(data) < 10:
-            return "Insufficient data", {}
-
-        distributions = {
-            'Exponential': stats.expon,
-            'Gamma': stats.gamma,
-            'Lognormal': stats.lognorm,
-            'Weibull': stats.weibull_min
-        }
-
-        best_fit = None
-        best_ks_stat = np.inf
-        best_params = {}
-
-        for name, dist in distributions.items():
-            try:
-                params = dist.fit(data)
-                ks_stat, _ = stats.kstest(data, lambda x: dist.cdf(x, *params))
-
-                if ks_stat < best_ks_stat:
-                    best_ks_stat = ks_stat
-                    best_fit = name
-                    best_params = {'params': params, 'ks_stat': ks_stat}
-            except:
-                continue
-
-        return best_fit or "Unknown", best_params
-
     def generate_text_report(self) -> str:
         """Generate detailed text report"""
         report = []
@@ -182,6 +301,8 @@ class VariabilityAnalyzer:
             report.append(f"  Coefficient of Variation (CV): {metrics.cv_inter_arrival:.3f}")
             report.append(f"  Variability Classification: {metrics.variability_class}")
             report.append(f"  Best Fit Distribution: {metrics.best_fit_distribution}")
+            for name, reason in metrics.distribution_params.get('failed', {}).items():
+                report.append(f"  ⚠ {name} fit failed: {reason}")
 
             if metrics.mean_service_time > 0:
                 report.append(f"\nSERVICE PATTERN:")
@@ -248,8 +369,8 @@ class VariabilityAnalyzer:
 
         print(f"Metrics exported to {filename}")
 
-    def create_visualizations(self, output_dir: str = '.'):
-        """Create variability visualization charts"""
+    def create_visualizations(self, output_dir: str = '.', preview: Optional[bool] = None):
+        """Create variability visualization charts (skipped when the inputs are unchanged)"""
 
         # Prepare data for plotting
         plot_data = []
@@ -264,66 +385,74 @@ class VariabilityAnalyzer:
             })
 
         df_plot = pd.DataFrame(plot_data)
-
-        # Create figure with subplots
-        fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-        fig.suptitle('Traffic Variability Analysis', fontsize=16, fontweight='bold')
-
-        # 1. CV by group
-        ax = axes[0, 0]
-        x = np.arange(len(df_plot))
-        width = 0.35
-        ax.bar(x - width/2, df_plot['CV_Arrival'], width, label='CV Arrivals', alpha=0.8)
-        ax.bar(x + width/2, df_plot['CV_Service'], width, label='CV Service', alpha=0.8)
-        ax.set_xlabel('Group')
-        ax.set_ylabel('Coefficient of Variation')
-        ax.set_title('Variability by Group')
-        ax.set_xticks(x)
-        ax.set_xticklabels(df_plot['Group'], rotation=45, ha='right', fontsize=8)
-        ax.axhline(y=1.0, color='r', linestyle='--', label='CV=1 (Exponential)')
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-
-        # 2. Arrival rate by period
-        ax = axes[0, 1]
-        period_rates = df_plot.groupby('Period')['Arrival_Rate'].mean().sort_values()
-        period_rates.plot(kind='barh', ax=ax, color='steelblue', alpha=0.8)
-        ax.set_xlabel('Mean Arrival Rate (entities/hour)')
-        ax.set_title('Average Arrival Rate by Period')
-        ax.grid(True, alpha=0.3, axis='x')
-
-        # 3. Variability classification
-        ax = axes[1, 0]
         var_classes = [m.variability_class.split()[0] for m in self.results.values()]
-        var_counts = pd.Series(var_classes).value_counts()
-        colors = {'Low': 'green', 'Medium': 'orange', 'High': 'red'}
-        var_counts.plot(kind='pie', ax=ax, autopct='%1.1f%%',
-                       colors=[colors.get(x, 'gray') for x in var_counts.index])
-        ax.set_ylabel('')
-        ax.set_title('Variability Classification Distribution')
-
-        # 4. CV vs Arrival Rate scatter
-        ax = axes[1, 1]
-        scatter = ax.scatter(df_plot['Arrival_Rate'], df_plot['CV_Arrival'],
-                           s=100, alpha=0.6, c=range(len(df_plot)), cmap='viridis')
-        ax.set_xlabel('Arrival Rate (entities/hour)')
-        ax.set_ylabel('CV of Inter-Arrival Times')
-        ax.set_title('Variability vs Arrival Rate')
-        ax.axhline(y=1.0, color='r', linestyle='--', alpha=0.5, label='CV=1')
-        ax.grid(True, alpha=0.3)
-        ax.legend()
-
-        # Add labels for each point
-        for idx, row in df_plot.iterrows():
-            ax.annotate(row['Entity'],
-                       (row['Arrival_Rate'], row['CV_Arrival']),
-                       fontsize=7, alpha=0.7)
-
-        plt.tight_layout()
+
         output_file = f'{output_dir}/variability_analysis.png'
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        print(f"Visualization saved to {output_file}")
-        plt.close()
+        job = FigureJob(draw_variability_analysis, output_file, (df_plot, var_classes), dpi=300)
+        if render_figures([job], preview=preview)[output_file] == 'cached':
+            print(f"Visualization unchanged, kept {output_file}")
+        else:
+            print(f"Visualization saved to {output_file}")
+
+
+def draw_variability_analysis(df_plot: pd.DataFrame, var_classes: List[str]):
+    """Variability charts: CV by group, rates by period, classes, CV vs rate"""
+
+    # Create figure with subplots
+    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+    fig.suptitle('Traffic Variability Analysis', fontsize=16, fontweight='bold')
+
+    # 1. CV by group
+    ax = axes[0, 0]
+    x = np.arange(len(df_plot))
+    width = 0.35
+    ax.bar(x - width/2, df_plot['CV_Arrival'], width, label='CV Arrivals', alpha=0.8)
+    ax.bar(x + width/2, df_plot['CV_Service'], width, label='CV Service', alpha=0.8)
+    ax.set_xlabel('Group')
+    ax.set_ylabel('Coefficient of Variation')
+    ax.set_title('Variability by Group')
+    ax.set_xticks(x)
+    ax.set_xticklabels(df_plot['Group'], rotation=45, ha='right', fontsize=8)
+    ax.axhline(y=1.0, color='r', linestyle='--', label='CV=1 (Exponential)')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+    # 2. Arrival rate by period
+    ax = axes[0, 1]
+    period_rates = df_plot.groupby('Period')['Arrival_Rate'].mean().sort_values()
+    period_rates.plot(kind='barh', ax=ax, color='steelblue', alpha=0.8)
+    ax.set_xlabel('Mean Arrival Rate (entities/hour)')
+    ax.set_title('Average Arrival Rate by Period')
+    ax.grid(True, alpha=0.3, axis='x')
+
+    # 3. Variability classification
+    ax = axes[1, 0]
+    var_counts = pd.Series(var_classes).value_counts()
+    colors = {'Low': 'green', 'Medium': 'orange', 'High': 'red'}
+    var_counts.plot(kind='pie', ax=ax, autopct='%1.1f%%',
+                   colors=[colors.get(x, 'gray') for x in var_counts.index])
+    ax.set_ylabel('')
+    ax.set_title('Variability Classification Distribution')
+
+    # 4. CV vs Arrival Rate scatter
+    ax = axes[1, 1]
+    scatter = ax.scatter(df_plot['Arrival_Rate'], df_plot['CV_Arrival'],
+                       s=100, alpha=0.6, c=range(len(df_plot)), cmap='viridis')
+    ax.set_xlabel('Arrival Rate (entities/hour)')
+    ax.set_ylabel('CV of Inter-Arrival Times')
+    ax.set_title('Variability vs Arrival Rate')
+    ax.axhline(y=1.0, color='r', linestyle='--', alpha=0.5, label='CV=1')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+
+    # Add labels for each point
+    for idx, row in df_plot.iterrows():
+        ax.annotate(row['Entity'],
+                   (row['Arrival_Rate'], row['CV_Arrival']),
+                   fontsize=7, alpha=0.7)
+
+    plt.tight_layout()
+    return fig
 
 
 class DataLoader:
@@ -333,25 +462,11 @@ class DataLoader:
     def load_data(filename: str) -> pd.DataFrame:
         """Load CSV data and preprocess"""
         print(f"Loading data from {filename}...")
-        df = pd.read_csv(filename)
+        df = load_events(filename)
 
         print(f"Loaded {len(df)} records")
         print(f"Columns: {', '.join(df.columns)}")
 
-        # Map column names to standard format
-        column_mapping = {
-            'Time (s)': 'Arrival_Time',
-            'Entity': 'Entity_Type',
-            'Inter-Arrival (s)': 'Inter_Arrival_Time',
-            'Service Time (s)': 'Service_Time'
-        }
-
-        # Apply mapping for columns that exist
-        for old_col, new_col in column_mapping.items():
-            if old_col in df.columns:
-                df = df.rename(columns={old_col: new_col})
-                print(f"  Mapped '{old_col}' to '{new_col}'")
-
         # Ensure required columns exist
         required_cols = ['Arrival_Time', 'Entity_Type']
         missing = [col for col in required_cols if col not in df.columns]
@@ -369,13 +484,18 @@ def main():
         print("Usage: python variability_analyzer.py <data_file.csv>")
         print("\nExample:")
         print("  python variability_analyzer.py all_sessions_combined.csv")
+        print("\nSet METRICS_CACHE_DIR to reuse results while the data is unchanged.")
         sys.exit(1)
 
     input_file = sys.argv[1]
 
     try:
-        # Load data
-        data = DataLoader.load_data(input_file)
+        # Load data (a partitioned dataset directory is read per group instead)
+        if is_dataset(input_file):
+            print(f"Using partitioned dataset {input_file}")
+            data = input_file
+        else:
+            data = DataLoader.load_data(input_file)
 
         # Analyze variability
         print("\nAnalyzing variability patterns...")
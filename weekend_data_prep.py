@@ -21,38 +21,22 @@ import pandas as pd
 import sys
 import os
 
+from event_store import load_events
+from session_comparison import compare_sessions, print_comparison
+
 def load_and_standardize(filepath, entity_type):
     """Load a CSV/Excel file and standardize column names"""
     print(f"\nLoading {os.path.basename(filepath)}...")
 
-    # Try reading as CSV first, then Excel if that fails
     try:
-        if filepath.endswith('.csv'):
-            df = pd.read_csv(filepath)
-        elif filepath.endswith('.xlsx') or filepath.endswith('.xls'):
-            df = pd.read_excel(filepath)
-        else:
-            df = pd.read_csv(filepath)  # Try CSV as default
+        df = load_events(filepath)
     except Exception as e:
         print(f"Error loading {filepath}: {e}")
         return None
 
-    # Standardize column names
-    column_mapping = {
-        'Time (s)': 'Arrival_Time',
-        'Entity': 'Entity_Type',
-        'Type/Dir': 'Direction',
-        'Inter-Arrival (s)': 'Inter_Arrival_Time',
-        'Service Time (s)': 'Service_Time'
-    }
-
-    for old_col, new_col in column_mapping.items():
-        if old_col in df.columns:
-            df = df.rename(columns={old_col: new_col})
-
     # Ensure Entity_Type is set
     if 'Entity_Type' not in df.columns:
-        df['Entity_Type'] = entity_type
+        df['Entity_Type'] = pd.Categorical([entity_type] * len(df))
 
     print(f"  ✓ Loaded {len(df)} entities")
     print(f"  Duration: {df['Arrival_Time'].max():.1f}s ({df['Arrival_Time'].max()/60:.1f} min)")
@@ -72,7 +56,7 @@ def analyze_session(df, session_name):
 
     # Entity counts
     print("\nEntity Breakdown:")
-    entity_counts = df.groupby('Entity_Type').size().sort_values(ascending=False)
+    entity_counts = df.groupby('Entity_Type', observed=True).size().sort_values(ascending=False)
     for entity, count in entity_counts.items():
         pct = (count / len(df)) * 100
         print(f"  {entity}: {count} ({pct:.1f}%)")
@@ -97,37 +81,6 @@ def analyze_session(df, session_name):
         'entity_counts': entity_counts.to_dict()
     }
 
-def compare_sessions(session1_stats, session2_stats, name1, name2):
-    """Compare two sessions"""
-    print(f"\n{'='*70}")
-    print(f"Comparison: {name1} vs {name2}")
-    print('='*70)
-
-    print(f"\nDuration:")
-    print(f"  {name1}: {session1_stats['duration_hours']:.2f} hours")
-    print(f"  {name2}: {session2_stats['duration_hours']:.2f} hours")
-    print(f"  Difference: {abs(session1_stats['duration_hours'] - session2_stats['duration_hours']):.2f} hours")
-
-    print(f"\nThroughput:")
-    print(f"  {name1}: {session1_stats['throughput']:.1f} entities/hour")
-    print(f"  {name2}: {session2_stats['throughput']:.1f} entities/hour")
-    throughput_diff = ((session2_stats['throughput'] - session1_stats['throughput']) / session1_stats['throughput']) * 100
-    print(f"  Difference: {throughput_diff:+.1f}%")
-
-    print(f"\nEntity Counts:")
-    all_entities = set(list(session1_stats['entity_counts'].keys()) + list(session2_stats['entity_counts'].keys()))
-    for entity in sorted(all_entities):
-        count1 = session1_stats['entity_counts'].get(entity, 0)
-        count2 = session2_stats['entity_counts'].get(entity, 0)
-        rate1 = count1 / session1_stats['duration_hours']
-        rate2 = count2 / session2_stats['duration_hours']
-        print(f"  {entity}:")
-        print(f"    {name1}: {count1} ({rate1:.1f}/hour)")
-        print(f"    {name2}: {count2} ({rate2:.1f}/hour)")
-        if rate1 > 0:
-            rate_diff = ((rate2 - rate1) / rate1) * 100
-            print(f"    Difference: {rate_diff:+.1f}%")
-
 def main():
     if len(sys.argv) < 5:
         print("Usage: python weekend_data_prep.py <eb_file> <wb_file> <crossers_file> <posers_file>")
@@ -166,7 +119,7 @@ def main():
     print(f"✓ Saved combined weekend data to {output_file}")
 
     # Analyze weekend session
-    weekend_stats = analyze_session(weekend_df, "Weekend Session (2.5 hours)")
+    analyze_session(weekend_df, "Weekend Session (2.5 hours)")
 
     # Load and analyze existing 90-minute session
     print("\n" + "="*70)
@@ -174,27 +127,9 @@ def main():
     print("="*70)
 
     try:
-        existing_df = pd.read_csv('combined_results.csv')
-        # Standardize column names
-        column_mapping = {
-            'Time (s)': 'Arrival_Time',
-            'Entity': 'Entity_Type',
-            'Inter-Arrival (s)': 'Inter_Arrival_Time',
-            'Service Time (s)': 'Service_Time'
-        }
-        for old_col, new_col in column_mapping.items():
-            if old_col in existing_df.columns:
-                existing_df = existing_df.rename(columns={old_col: new_col})
-
-        existing_stats = analyze_session(existing_df, "Existing Session (90 minutes)")
+        existing_df = load_events('combined_results.csv')
 
-        # Compare sessions
-        compare_sessions(existing_stats, weekend_stats, "90-min Session", "Weekend Session")
-
-        # Create multi-session combined file
-        print(f"\n{'='*70}")
-        print("Creating multi-session combined dataset...")
-        print('='*70)
+        analyze_session(existing_df, "Existing Session (90 minutes)")
 
         # Add session identifier
         existing_df['Session'] = 'Session 1 (90 min)'
@@ -202,6 +137,15 @@ def main():
 
         # Combine both sessions
         multi_session_df = pd.concat([existing_df, weekend_df], ignore_index=True)
+
+        # Compare sessions
+        print_comparison(compare_sessions(multi_session_df, by='Session'))
+
+        # Create multi-session combined file
+        print(f"\n{'='*70}")
+        print("Creating multi-session combined dataset...")
+        print('='*70)
+
         multi_session_df.to_csv('multi_session_combined.csv', index=False, encoding='utf-8')
         print(f"✓ Saved multi-session data to multi_session_combined.csv")
         print(f"  Total entities: {len(multi_session_df)}")